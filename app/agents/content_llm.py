@@ -1,27 +1,52 @@
 import inspect
-import json
+import logging
+import time
+import types
+from dataclasses import dataclass
+from functools import lru_cache
 from pathlib import Path
 from typing import Any, List
 
-from pydantic_ai import Agent
+from pydantic import ValidationError
+from pydantic_ai import Agent, NativeOutput
+from pydantic_ai.exceptions import UnexpectedModelBehavior
+from pydantic_ai.messages import TextPart
 
+from app.core import config, metrics, tracing
 from app.core.config import MODEL
+from app.core.llm_usage import current_llm_usage
 from app.models.agents import PlannedSection, GeneratedSection, ContentBlock
-from app.agents.content_llm_models import LLMLessonModel
+from app.agents.content_llm_models import LLMBlockModel, LLMLessonModel
+from app.agents.llm_cassette import LLMCassette
+from app.agents.streaming_parser import StreamingLessonParser
+from app.agents.validator import ValidatorAgent
+from app.services.llm_limiter import LLMLimiter, get_llm_limiter
+
+logger = logging.getLogger(__name__)
 
 PROMPT_PATH = Path(__file__).resolve().parent / "prompts" / "content_llm_system.txt"
 USER_PROMPT_PATH = Path(__file__).resolve().parent / "prompts" / "content_llm_user.txt"
 
 
+@lru_cache(maxsize=None)
+def _load_prompt(path: Path) -> str:
+    """Read a prompt file once per process."""
+    return path.read_text(encoding="utf-8")
+
+
 class ContentAgentLLM:
     """
     LLM-backed content agent.
 
     Responsibilities:
     - Call the LLM with a strict prompt
-    - Parse JSON output
-    - Validate against LLMLessonModel
+    - Request schema-constrained output (LLM_OUTPUT_MODE=native)
+    - Validate raw JSON against LLMLessonModel
     - Convert to internal GeneratedSection dataclasses
+    - Admit each call through the shared LLM limiter
+    - Record/replay completions from disk (LLM_CASSETTE_MODE)
+    - Stream completions and abort on the first block/section the
+      validator would reject (LLM_STREAMING_ENABLED)
 
     This agent does NOT:
     - Normalize shapes
@@ -29,12 +54,19 @@ class ContentAgentLLM:
     - Repair malformed outputs
     """
 
-    def __init__(self) -> None:
-        system_prompt = PROMPT_PATH.read_text(encoding="utf-8").strip()
-        self.agent = Agent(
-            model=MODEL,
+    def __init__(self, limiter: LLMLimiter | None = None) -> None:
+        system_prompt = _load_prompt(PROMPT_PATH).strip()
+        # Replay never reaches the provider, so it needs no model credentials
+        self.agent = None if config.LLM_CASSETTE_MODE == "replay" else Agent(
+            model=_model(),
             system_prompt=system_prompt,
+            output_type=_output_type(),
+            # Schema failures surface to lesson_service, which owns the repair retry
+            output_retries=0,
         )
+        self._system_prompt_chars = len(system_prompt)
+        self._limiter = limiter or get_llm_limiter()
+        self._stream_validator = ValidatorAgent()
 
     async def generate(
         self,
@@ -70,12 +102,19 @@ class ContentAgentLLM:
         return self._to_generated_sections(lesson)
 
     def _build_prompt(self, topic: str, level: str, planned_sections: List[PlannedSection]) -> str:
+        """
+        Fill the user template.
+
+        The template keeps every static instruction first and the request
+        fields (topic, level, sections) last, so the system prompt plus the
+        rules form a byte-identical prefix the provider can cache.
+        """
         sections_desc = "\n".join(
             f"- id: {s.id}, title: {s.title}, minutes: {s.minutes}"
             for s in planned_sections
         )
 
-        template = USER_PROMPT_PATH.read_text(encoding="utf-8")
+        template = _load_prompt(USER_PROMPT_PATH)
         return template.format(
             topic=topic,
             level=level,
@@ -96,17 +135,132 @@ class ContentAgentLLM:
         if isinstance(data, LLMLessonModel):
             return data
 
-        if isinstance(data, str):
-            data = json.loads(self._strip_code_fences(data))
-
         # Hard boundary: must match the declared schema
+        if isinstance(data, (str, bytes)):
+            # Only free-text completions may wrap their JSON in a fence;
+            # schema-constrained (native) output is validated as returned
+            if isinstance(data, str) and config.LLM_OUTPUT_MODE == "text":
+                data = self._strip_code_fences(data)
+            return LLMLessonModel.model_validate_json(data)
         return LLMLessonModel.model_validate(data)
 
     async def _run_prompt(self, prompt: str) -> LLMLessonModel:
-        result = self.agent.run(prompt)
-        if inspect.isawaitable(result):
-            result = await result
-        return self._parse_llm_result(result)
+        cassette = LLMCassette.from_config()
+        cassette_key = (
+            LLMCassette.key(
+                prompt,
+                model=MODEL,
+                output_mode=config.LLM_OUTPUT_MODE,
+                system_prompt=_load_prompt(PROMPT_PATH),
+            )
+            if cassette is not None
+            else ""
+        )
+
+        async def _call() -> Any:
+            if cassette is not None and cassette.mode == "replay":
+                entry = await cassette.replay(cassette_key)
+                usage = types.SimpleNamespace(**entry.usage) if entry.usage else None
+                return StreamedCompletion(output=entry.output, usage=usage)
+            started = time.perf_counter()
+            result = await _call_provider()
+            if cassette is not None:
+                await cassette.record(
+                    cassette_key,
+                    model=MODEL,
+                    output=_raw_output(result),
+                    latency_seconds=time.perf_counter() - started,
+                    usage=_usage_dict(_result_usage(result)),
+                )
+            return result
+
+        async def _call_provider() -> Any:
+            if config.LLM_STREAMING_ENABLED:
+                return await self._stream_prompt(prompt)
+            try:
+                result = self.agent.run(prompt)
+                if inspect.isawaitable(result):
+                    result = await result
+            except UnexpectedModelBehavior as exc:
+                # Native mode: the provider output failed schema validation
+                raise ValueError(
+                    f"Model output did not match the lesson schema: {exc.__cause__ or exc}"
+                ) from exc
+            return result
+
+        metrics.increment("llm_output.completions")
+        with tracing.span(
+            "llm.completion",
+            model=MODEL,
+            output_mode=config.LLM_OUTPUT_MODE,
+            streaming=config.LLM_STREAMING_ENABLED,
+            cassette=cassette.mode if cassette is not None else "off",
+        ) as span:
+            try:
+                result = await self._limiter.run(
+                    _call,
+                    estimated_tokens=self._estimate_tokens(prompt),
+                    actual_tokens=_usage_tokens,
+                )
+                _record_usage(result)
+                span.set_attributes(**(_usage_dict(_result_usage(result)) or {}))
+                started = time.perf_counter()
+                try:
+                    return self._parse_llm_result(result)
+                finally:
+                    metrics.observe("llm_output.parse_seconds", time.perf_counter() - started)
+            except ValidationError:
+                metrics.increment("llm_output.schema_failures")
+                raise
+            except ValueError as exc:
+                if isinstance(exc.__cause__, UnexpectedModelBehavior):
+                    metrics.increment("llm_output.schema_failures")
+                raise
+
+    async def _stream_prompt(self, prompt: str) -> "StreamedCompletion":
+        """
+        Stream the completion and check each block/section as it closes.
+
+        The first violation raises ValueError inside the stream context,
+        which cancels the provider request so the repair attempt starts
+        without waiting for the rest of the output.
+        """
+        validator = getattr(self, "_stream_validator", None) or ValidatorAgent()
+        seen_ids: set[str] = set()
+
+        def _on_block(_section_index: int, payload: dict) -> None:
+            block = LLMBlockModel.model_validate(payload)
+            validator.validate_streamed_block(ContentBlock(type=block.type, content=block.content))
+
+        def _on_section(index: int, payload: dict) -> None:
+            lesson = LLMLessonModel.model_validate({"sections": [payload]})
+            section = self._to_generated_sections(lesson)[0]
+            validator.validate_streamed_section(section, index, seen_ids)
+            seen_ids.add(section.id)
+
+        parser = StreamingLessonParser(on_block=_on_block, on_section=_on_section)
+        async with self.agent.run_stream(prompt) as stream:
+            try:
+                # Raw response snapshots work for both text and native output modes
+                async for response, _last in stream.stream_responses(debounce_by=None):
+                    text = "".join(
+                        part.content for part in response.parts if isinstance(part, TextPart)
+                    )
+                    parser.feed(text[len(parser.text):])
+            except ValueError as exc:
+                metrics.increment("llm_stream.early_aborts")
+                logger.info(
+                    "llm_stream_aborted",
+                    extra={"chars_received": len(parser.text), "reason": str(exc)},
+                )
+                raise
+            usage = stream.usage()
+        return StreamedCompletion(output=parser.text, usage=usage)
+
+    def _estimate_tokens(self, prompt: str) -> int:
+        """Rough TPM reservation: ~4 chars per input token plus expected output."""
+        input_chars = len(prompt) + getattr(self, "_system_prompt_chars", 0)
+        return input_chars // 4 + config.LLM_OUTPUT_TOKEN_ESTIMATE
 
     def _to_generated_sections(
         self,
@@ -141,3 +295,73 @@ class ContentAgentLLM:
                 lines = lines[:-1]
             stripped = "\n".join(lines).strip()
         return stripped
+
+
+def _model() -> Any:
+    """Model name, or an OpenAI-compatible endpoint when LLM_BASE_URL is set."""
+    if not config.LLM_BASE_URL:
+        return MODEL
+    from pydantic_ai.models.openai import OpenAIChatModel
+    from pydantic_ai.providers.openai import OpenAIProvider
+
+    return OpenAIChatModel(MODEL, provider=OpenAIProvider(base_url=config.LLM_BASE_URL))
+
+
+def _output_type() -> Any:
+    """Provider JSON-schema mode for LLMLessonModel, or plain text to parse."""
+    if config.LLM_OUTPUT_MODE == "native":
+        return NativeOutput(LLMLessonModel, name="lesson", strict=True)
+    return str
+
+
+@dataclass(frozen=True)
+class StreamedCompletion:
+    """Full text and usage of a streamed completion (parsed like a run result)."""
+
+    output: str
+    usage: Any = None
+
+
+def _result_usage(result: Any) -> Any:
+    usage = getattr(result, "usage", None)
+    if callable(usage):
+        usage = usage()
+    return usage
+
+
+def _raw_output(result: Any) -> str:
+    """Provider output as JSON text (native mode returns a parsed model)."""
+    output = getattr(result, "output", result)
+    if isinstance(output, LLMLessonModel):
+        return output.model_dump_json()
+    return output if isinstance(output, str) else str(output)
+
+
+def _usage_dict(usage: Any) -> dict[str, int] | None:
+    if usage is None:
+        return None
+    return {
+        "requests": getattr(usage, "requests", 1) or 1,
+        "input_tokens": getattr(usage, "input_tokens", 0) or 0,
+        "output_tokens": getattr(usage, "output_tokens", 0) or 0,
+        "cache_read_tokens": getattr(usage, "cache_read_tokens", 0) or 0,
+    }
+
+
+def _record_usage(result: Any) -> None:
+    """Add provider usage (incl. cached prompt tokens) to the request totals."""
+    usage = _result_usage(result)
+    tracker = current_llm_usage()
+    if usage is not None and tracker is not None:
+        tracker.add(usage)
+
+
+def _usage_tokens(result: Any) -> int | None:
+    """Total tokens reported by the provider, when available."""
+    usage = _result_usage(result)
+    if usage is None:
+        return None
+    total = getattr(usage, "total_tokens", None)
+    if total is None:
+        total = (getattr(usage, "input_tokens", 0) or 0) + (getattr(usage, "output_tokens", 0) or 0)
+    return total or None
@@ -0,0 +1,155 @@
+"""Record-and-replay cassettes for LLM completions.
+
+In `record` mode every successful completion made by `ContentAgentLLM` is
+stored on disk as `<prompt-hash>.json` (raw output, latency, usage). In
+`replay` mode the same prompts are served from disk after sleeping for the
+recorded latency (or a synthetic one), so the full pipeline can be load
+tested offline with realistic payloads and without provider credentials.
+
+The key hashes the model, output mode, system prompt, and user prompt, so
+editing any of them invalidates the recording instead of replaying stale
+output.
+
+`record()` and `replay()` are the entry points used on the request path;
+they run the file I/O in a worker thread so the event loop never waits on
+disk.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Awaitable, Callable
+
+from app.core import config, metrics
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when no recording exists for a prompt."""
+
+    def __init__(self, key: str, directory: Path) -> None:
+        super().__init__(f"No LLM cassette for prompt {key[:12]} in {directory}.")
+        self.key = key
+
+
+@dataclass(frozen=True)
+class CassetteEntry:
+    key: str
+    model: str
+    output: str
+    latency_seconds: float
+    usage: dict[str, int] | None
+    recorded_at: str
+
+
+class LLMCassette:
+    """Prompt-hash keyed store of raw LLM outputs."""
+
+    def __init__(
+        self,
+        directory: str | Path,
+        *,
+        mode: str,
+        latency: str = "recorded",
+        latency_scale: float = 1.0,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ) -> None:
+        self.directory = Path(directory)
+        self.mode = mode
+        self.latency = latency
+        self.latency_scale = latency_scale
+        self._sleep = sleep
+
+    @classmethod
+    def from_config(cls) -> "LLMCassette | None":
+        """Cassette for the configured mode, or None when disabled."""
+        if config.LLM_CASSETTE_MODE == "off":
+            return None
+        return cls(
+            config.LLM_CASSETTE_DIR,
+            mode=config.LLM_CASSETTE_MODE,
+            latency=config.LLM_CASSETTE_LATENCY,
+            latency_scale=config.LLM_CASSETTE_LATENCY_SCALE,
+        )
+
+    @staticmethod
+    def key(prompt: str, *, model: str, output_mode: str, system_prompt: str) -> str:
+        digest = hashlib.sha256()
+        for part in (model, output_mode, system_prompt, prompt):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def load(self, key: str) -> CassetteEntry:
+        path = self.path_for(key)
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            metrics.increment("llm_cassette.misses")
+            raise CassetteMiss(key, self.directory) from None
+        return CassetteEntry(**data)
+
+    def save(
+        self,
+        key: str,
+        *,
+        model: str,
+        output: str,
+        latency_seconds: float,
+        usage: dict[str, int] | None,
+    ) -> CassetteEntry:
+        """Write a recording atomically (concurrent recorders never see partial files)."""
+        entry = CassetteEntry(
+            key=key,
+            model=model,
+            output=output,
+            latency_seconds=round(latency_seconds, 4),
+            usage=usage,
+            recorded_at=datetime.now(timezone.utc).isoformat(),
+        )
+        self.directory.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(asdict(entry), handle, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.path_for(key))
+        metrics.increment("llm_cassette.recorded")
+        return entry
+
+    async def record(
+        self,
+        key: str,
+        *,
+        model: str,
+        output: str,
+        latency_seconds: float,
+        usage: dict[str, int] | None,
+    ) -> CassetteEntry:
+        """`save()` off the event loop."""
+        return await asyncio.to_thread(
+            self.save, key, model=model, output=output, latency_seconds=latency_seconds, usage=usage
+        )
+
+    def latency_for(self, entry: CassetteEntry) -> float:
+        if self.latency == "recorded":
+            base = entry.latency_seconds
+        else:
+            base = float(self.latency)
+        return max(0.0, base * self.latency_scale)
+
+    async def replay(self, key: str) -> CassetteEntry:
+        """Load a recording and wait out its (recorded or synthetic) latency."""
+        entry = await asyncio.to_thread(self.load, key)
+        delay = self.latency_for(entry)
+        if delay > 0:
+            await self._sleep(delay)
+        metrics.increment("llm_cassette.replayed")
+        return entry
@@ -4,6 +4,8 @@ from __future__ import annotations
 
 from typing import Any, Callable, Dict
 
+from app.core import tracing
+
 ToolHandler = Callable[[dict[str, Any]], Any]
 
 _TOOLS: Dict[str, ToolHandler] = {}
@@ -19,4 +21,5 @@ def invoke_tool(name: str, payload: dict[str, Any]) -> Any:
     handler = _TOOLS.get(name)
     if handler is None:
         raise KeyError(f"Tool not registered: {name}")
-    return handler(payload)
+    with tracing.span("mcp.tool", tool=name):
+        return handler(payload)
@@ -0,0 +1,124 @@
+"""Incremental JSON parsing for streamed LLM lessons.
+
+`StreamingLessonParser` consumes text deltas and reports every block and
+section object as soon as its closing brace arrives, so `ContentAgentLLM`
+can cancel a streamed completion the moment the output breaks a rule that
+`ValidatorAgent` would reject. The scanner tracks only string/escape state
+and nesting, so each character is visited once; closed objects are decoded
+with `json.loads` on their slice. Deltas are kept as a list of chunks (no
+per-delta string concatenation) and joined for the final, strict parse.
+
+Expected shape: {"sections": [{"id", "title", "minutes", "blocks": [{...}]}]}.
+Text before the root object (e.g. a ```json fence) and after it is ignored.
+"""
+
+from __future__ import annotations
+
+import json
+from bisect import bisect_right
+from typing import Any, Callable
+
+BlockCallback = Callable[[int, dict[str, Any]], None]
+SectionCallback = Callable[[int, dict[str, Any]], None]
+
+
+class StreamingLessonParser:
+    """Feed text deltas; callbacks fire for each closed block and section."""
+
+    def __init__(
+        self,
+        *,
+        on_block: BlockCallback | None = None,
+        on_section: SectionCallback | None = None,
+    ) -> None:
+        self._on_block = on_block
+        self._on_section = on_section
+        self._chunks: list[str] = []
+        # Absolute offset of each chunk's first character
+        self._offsets: list[int] = []
+        self._length = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        # (start, end) offsets of the last closed string, decoded only when used as a key
+        self._last_string: tuple[int, int] | None = None
+        self._key: str | None = None
+        # (opener, start offset, key under which the container was opened)
+        self._stack: list[tuple[str, int, str | None]] = []
+        self._done = False
+        self.sections_closed = 0
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+            self._offsets = [0]
+        return self._chunks[0] if self._chunks else ""
+
+    def feed(self, delta: str) -> None:
+        """Scan `delta`; callbacks may raise to abort the stream."""
+        if not delta:
+            return
+        base = self._length
+        self._chunks.append(delta)
+        self._offsets.append(base)
+        self._length += len(delta)
+        stack = self._stack
+        for index, char in enumerate(delta, base):
+            if self._done:
+                break
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    self._last_string = (self._string_start, index + 1)
+                continue
+            if char == '"':
+                if stack:
+                    self._in_string = True
+                    self._string_start = index
+            elif char in "{[":
+                if not stack and char == "[":
+                    continue
+                key = self._key if stack and stack[-1][0] == "{" else None
+                stack.append((char, index, key))
+                self._key = None
+            elif char in "}]":
+                if not stack:
+                    continue
+                _opener, start, key = stack.pop()
+                self._key = None
+                if char == "}":
+                    self._closed_object(start, index)
+                if not stack:
+                    self._done = True
+            elif char == ":":
+                if stack and stack[-1][0] == "{" and self._last_string is not None:
+                    self._key = json.loads(self._slice(*self._last_string))
+            elif char == ",":
+                self._key = None
+
+    def _slice(self, start: int, end: int) -> str:
+        """Text in [start, end), joined from only the chunks it spans."""
+        first = bisect_right(self._offsets, start) - 1
+        last = bisect_right(self._offsets, end - 1)
+        text = "".join(self._chunks[first:last])
+        offset = self._offsets[first]
+        return text[start - offset : end - offset]
+
+    def _closed_object(self, start: int, end: int) -> None:
+        stack = self._stack
+        if len(stack) < 2 or stack[1][2] != "sections":
+            return
+        if len(stack) == 2 and self._on_section is not None:
+            section = json.loads(self._slice(start, end + 1))
+            self._on_section(self.sections_closed, section)
+        if len(stack) == 2:
+            self.sections_closed += 1
+        elif len(stack) == 4 and stack[3][2] == "blocks" and self._on_block is not None:
+            block = json.loads(self._slice(start, end + 1))
+            self._on_block(self.sections_closed, block)
@@ -5,7 +5,8 @@ import signal
 import threading
 from typing import Dict, List
 
-from app.core import config
+from app.core import config, tracing
+from app.core.deadline import current_deadline
 from app.models.agents import GeneratedSection, ContentBlock
 from app.agents.validator_rules import RuleEngine, RuleOutcome
 
@@ -164,6 +165,37 @@ class ValidatorAgent:
                 if not block.get("content"):
                     raise ValueError("Block content must be non-empty.")
 
+    def validate_streamed_block(self, block: ContentBlock) -> None:
+        """Check one block as soon as it is streamed (same rules as `validate`)."""
+        self._validate_block(block)
+
+    def validate_streamed_section(
+        self,
+        section: GeneratedSection,
+        index: int,
+        seen_ids: set[str],
+    ) -> None:
+        """Check section-level rules `validate` would reject, before the lesson completes.
+
+        Blocks are expected to have been checked via `validate_streamed_block`.
+        """
+        if index >= self.MAX_SECTION_COUNT:
+            raise ValueError(
+                f"Lesson must include {self.MIN_SECTION_COUNT}-{self.MAX_SECTION_COUNT} sections."
+            )
+        if section.id not in self.ALLOWED_SECTION_IDS:
+            raise ValueError(
+                f"Section IDs must be one of {sorted(self.ALLOWED_SECTION_IDS)}."
+            )
+        if section.id in seen_ids:
+            raise ValueError("Section IDs must be unique.")
+        if section.minutes < self.MIN_SECTION_MINUTES:
+            raise ValueError(
+                f"Section '{section.id}' must be at least {self.MIN_SECTION_MINUTES} minutes."
+            )
+        if not section.blocks:
+            raise ValueError(f"Section '{section.id}' must include at least one block.")
+
     def _validate_block(self, block: ContentBlock) -> None:
         if block.type not in self.ALLOWED_BLOCK_TYPES:
             raise ValueError(
@@ -185,13 +217,22 @@ class ValidatorAgent:
 
     def collect_rule_outcomes(self, sections: List[GeneratedSection]) -> list[dict]:
         outcomes: list[dict] = []
+        deadline = current_deadline()
         for section in sections:
             for index, block in enumerate(section.blocks):
                 if block.type != "python":
                     continue
-                rule_outcomes = self._rule_engine.run(block.content)
-                if self._runtime_smoke_test_enabled:
-                    rule_outcomes.extend(self._runtime_smoke_test(block.content))
+                # Advisory only: stop once the request budget is spent
+                if deadline is not None and deadline.expired:
+                    deadline.record_miss("rule_outcomes", "truncated")
+                    return outcomes
+                with tracing.span(
+                    "rule_engine.block", section_id=section.id, block_index=index
+                ) as span:
+                    rule_outcomes = self._rule_engine.run(block.content)
+                    if self._runtime_smoke_test_enabled:
+                        rule_outcomes.extend(self._runtime_smoke_test(block.content))
+                    span.set_attribute("outcomes", len(rule_outcomes))
                 if not rule_outcomes:
                     continue
                 outcomes.append(
@@ -210,6 +251,19 @@ class ValidatorAgent:
         if threading.current_thread() is not threading.main_thread():
             return []
 
+        deadline = current_deadline()
+        if deadline is not None:
+            budget = deadline.timeout_for(
+                timeout_seconds or deadline.remaining(),
+                reserve=config.DEADLINE_RESERVE_SECONDS,
+            )
+            if budget <= 0:
+                deadline.record_miss("smoke_test", "skipped")
+                return []
+            if 0 < budget < timeout_seconds:
+                deadline.record_miss("smoke_test", "shortened")
+            timeout_seconds = budget
+
         try:
             tree = ast.parse(code)
         except SyntaxError:
@@ -0,0 +1,34 @@
+"""Debug routes for locally recorded traces.
+
+Span attributes carry session ids, topics, usage and error strings, so
+these routes need the same `X-Admin-Token` as the `/telemetry` routes.
+"""
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from app.api.telemetry import require_admin_token
+from app.core import config
+from app.core.tracing import trace_store
+
+router = APIRouter(prefix="/debug", tags=["debug"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/traces")
+async def list_traces(
+    limit: int = Query(default=50, ge=1, le=1000),
+    min_ms: float = Query(default=0.0, ge=0.0),
+) -> dict:
+    """Newest-first trace summaries; `min_ms` keeps only slow requests."""
+    return {
+        "enabled": config.TRACING_ENABLED,
+        "traces": trace_store.traces(limit=limit, min_ms=min_ms),
+    }
+
+
+@router.get("/traces/{trace_id}")
+async def get_trace(trace_id: str) -> dict:
+    """All recorded spans of one trace, ordered by start time."""
+    spans = trace_store.get(trace_id)
+    if spans is None:
+        raise HTTPException(status_code=404, detail="Trace not found.")
+    return {"trace_id": trace_id, "spans": spans}
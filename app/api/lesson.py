@@ -1,7 +1,10 @@
 """API routes for lesson generation."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Header, Response
 
+from app.core import config
+from app.core.deadline import Deadline
+from app.core.profiling import should_profile
 from app.models.api import LessonRequest, LessonResponse
 from app.services.lesson_service import generate_lesson
 
@@ -9,6 +12,29 @@ router = APIRouter(prefix="/lesson", tags=["Lessons"])
 
 
 @router.post("", response_model=LessonResponse)
-async def create_lesson(request: LessonRequest) -> LessonResponse:
-    """Generate a lesson response for the given request."""
-    return await generate_lesson(request)
+async def create_lesson(
+    request: LessonRequest,
+    response: Response,
+    x_request_timeout_ms: str | None = Header(default=None),
+    x_profile: str | None = Header(default=None),
+) -> LessonResponse:
+    """Generate a lesson response for the given request.
+
+    `X-Request-Timeout-Ms` overrides the default time budget (clamped to the
+    configured maximum). With SERVER_TIMING_ENABLED, per-stage wall times
+    are returned in a `Server-Timing` header. `X-Profile: <admin token>`
+    captures the run with cProfile (see PROFILING_ADMIN_TOKEN).
+    """
+    deadline = Deadline.from_header(x_request_timeout_ms)
+    profile = should_profile(x_profile)
+    if not config.SERVER_TIMING_ENABLED:
+        return await generate_lesson(request, deadline=deadline, profile=profile)
+
+    timings: dict[str, float] = {}
+    lesson = await generate_lesson(
+        request, deadline=deadline, stage_timings=timings, profile=profile
+    )
+    response.headers["Server-Timing"] = ", ".join(
+        f"{name};dur={ms:g}" for name, ms in timings.items()
+    )
+    return lesson
@@ -0,0 +1,13 @@
+"""API routes for process metrics."""
+
+from fastapi import APIRouter
+
+from app.core import metrics
+
+router = APIRouter(prefix="/metrics", tags=["metrics"])
+
+
+@router.get("")
+async def get_metrics() -> dict:
+    """Return a JSON snapshot of in-process counters, gauges, and histograms."""
+    return metrics.snapshot()
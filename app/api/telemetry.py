@@ -0,0 +1,88 @@
+"""Read-only telemetry routes: demo-mode stats and streaming exports.
+
+These are operator routes: every request must carry
+`X-Admin-Token: <TELEMETRY_ADMIN_TOKEN>`. With the token unset (the
+default) they answer 403.
+"""
+
+import hmac
+import importlib.util
+import time
+from datetime import datetime
+from typing import Literal
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.core import config
+from app.services import telemetry_export, telemetry_rollups
+from app.services.telemetry_columns import columnar_store
+
+
+def require_admin_token(x_admin_token: str | None = Header(default=None)) -> None:
+    token = config.TELEMETRY_ADMIN_TOKEN
+    if not token:
+        raise HTTPException(status_code=403, detail="Operator routes are disabled (TELEMETRY_ADMIN_TOKEN is unset).")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), token.encode()):
+        raise HTTPException(status_code=403, detail="Invalid or missing X-Admin-Token.")
+
+
+router = APIRouter(prefix="/telemetry", tags=["telemetry"], dependencies=[Depends(require_admin_token)])
+
+
+@router.get("/stats")
+def telemetry_stats(
+    window_seconds: float = Query(default=3600.0, gt=0),
+    top: int = Query(default=10, ge=1, le=100),
+) -> dict:
+    """Run counts by topic and level, latency percentiles, and hint-code frequencies.
+
+    Served from the columnar store, which is only fed by the `memory`
+    telemetry backend. A plain `def` route, so large scans run in the
+    threadpool rather than on the event loop.
+    """
+    until = time.time()
+    since = until - window_seconds
+    return {
+        "enabled": config.TELEMETRY_BACKEND == "memory",
+        "window": {"since": since, "until": until},
+        **columnar_store.stats(since=since, top=top),
+    }
+
+
+@router.get("/rollups")
+def telemetry_rollup_buckets(
+    granularity: Literal["hour", "day"] = Query(default="hour"),
+    since: datetime | None = Query(default=None),
+    until: datetime | None = Query(default=None),
+) -> dict:
+    """Hourly or daily rollups maintained by the incremental rollup job."""
+    return {
+        "granularity": granularity,
+        "buckets": telemetry_rollups.query_rollups(granularity, since=since, until=until),
+    }
+
+
+@router.get("/export/{kind}")
+def export_telemetry(
+    kind: Literal["runs", "failures"],
+    format: Literal["parquet", "jsonl"] = Query(default="jsonl"),
+    since: datetime | None = Query(default=None),
+    until: datetime | None = Query(default=None),
+) -> StreamingResponse:
+    """Stream a telemetry collection as Parquet or gzip JSONL (flattened columns)."""
+    if format == "parquet" and importlib.util.find_spec("pyarrow") is None:
+        raise HTTPException(status_code=501, detail="Parquet export requires pyarrow.")
+
+    docs = telemetry_export.iter_documents(kind, since=since, until=until)
+    if format == "parquet":
+        chunks = telemetry_export.iter_parquet(kind, docs)
+        media_type, filename = "application/vnd.apache.parquet", f"{kind}.parquet"
+    else:
+        chunks = telemetry_export.iter_jsonl_gz(kind, docs)
+        media_type, filename = "application/gzip", f"{kind}.jsonl.gz"
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
@@ -6,6 +6,20 @@ Runtime behavior is controlled exclusively via environment variables.
 
 import os
 
+
+def _int_env(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        return default
+
+
+def _float_env(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except (TypeError, ValueError):
+        return default
+
 # ---------------------------
 # Database configuration
 # ---------------------------
@@ -15,21 +29,132 @@ MONGO_COLLECTION = os.getenv("MONGO_COLLECTION", "lesson_runs")
 MONGO_FAILURE_COLLECTION = os.getenv(
     "MONGO_FAILURE_COLLECTION", "lesson_failures"
 )
+MONGO_ROLLUP_COLLECTION = os.getenv("MONGO_ROLLUP_COLLECTION", "telemetry_rollups")
 
 # ---------------------------
 # Model / execution settings
 # ---------------------------
 MODEL = os.getenv("MODEL", "gpt-4.1-mini")
+# OpenAI-compatible endpoint (e.g. the bench stub server); empty uses the provider default
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", "")
 USE_LLM_CONTENT = os.getenv("USE_LLM_CONTENT", "false").lower() == "true"
 CONTEXT7_API_KEY = os.getenv("CONTEXT7_API_KEY", "")
 
+# LLM admission control (AIMD concurrency + RPM/TPM token buckets)
+LLM_CONCURRENCY_INITIAL = _int_env("LLM_CONCURRENCY_INITIAL", 4)
+LLM_CONCURRENCY_MIN = _int_env("LLM_CONCURRENCY_MIN", 1)
+LLM_CONCURRENCY_MAX = _int_env("LLM_CONCURRENCY_MAX", 32)
+LLM_LATENCY_TARGET_SECONDS = _float_env("LLM_LATENCY_TARGET_SECONDS", 30.0)
+LLM_RPM_LIMIT = _float_env("LLM_RPM_LIMIT", 0.0)
+LLM_TPM_LIMIT = _float_env("LLM_TPM_LIMIT", 0.0)
+LLM_OUTPUT_TOKEN_ESTIMATE = _int_env("LLM_OUTPUT_TOKEN_ESTIMATE", 1500)
+LLM_QUEUE_MAX = _int_env("LLM_QUEUE_MAX", 32)
+LLM_QUEUE_TIMEOUT_SECONDS = _float_env("LLM_QUEUE_TIMEOUT_SECONDS", 10.0)
+# Stream completions and cancel on the first block/section the validator rejects (opt-in)
+LLM_STREAMING_ENABLED = os.getenv("LLM_STREAMING_ENABLED", "false").lower() == "true"
+# "text": prompt-only JSON (works with any model); "native": provider JSON-schema
+# output for LLMLessonModel, for providers and models that support it
+LLM_OUTPUT_MODE = os.getenv("LLM_OUTPUT_MODE", "text").lower()
+
+# LLM record/replay cassettes (off | record | replay)
+LLM_CASSETTE_MODE = os.getenv("LLM_CASSETTE_MODE", "off").lower()
+LLM_CASSETTE_DIR = os.getenv("LLM_CASSETTE_DIR", "cassettes")
+# "recorded" replays the recorded latency; a number replays a fixed latency (seconds)
+LLM_CASSETTE_LATENCY = os.getenv("LLM_CASSETTE_LATENCY", "recorded").lower()
+LLM_CASSETTE_LATENCY_SCALE = _float_env("LLM_CASSETTE_LATENCY_SCALE", 1.0)
+
+# Request deadlines (overridable per request via X-Request-Timeout-Ms)
+REQUEST_DEADLINE_SECONDS = _float_env("REQUEST_DEADLINE_SECONDS", 60.0)
+REQUEST_DEADLINE_MAX_SECONDS = _float_env("REQUEST_DEADLINE_MAX_SECONDS", 120.0)
+# Budget kept back for rendering and returning the response
+DEADLINE_RESERVE_SECONDS = _float_env("DEADLINE_RESERVE_SECONDS", 0.5)
+# Minimum remaining budget to start a (repair) LLM attempt / a Context7 lookup
+DEADLINE_MIN_LLM_ATTEMPT_SECONDS = _float_env("DEADLINE_MIN_LLM_ATTEMPT_SECONDS", 5.0)
+DEADLINE_MIN_CONTEXT7_SECONDS = _float_env("DEADLINE_MIN_CONTEXT7_SECONDS", 1.0)
+# Floor for the telemetry write timeout, even when the budget is spent
+TELEMETRY_MIN_WRITE_SECONDS = _float_env("TELEMETRY_MIN_WRITE_SECONDS", 0.5)
+# Timeout for telemetry writes made outside a request (background pool, workers)
+TELEMETRY_WRITE_TIMEOUT_SECONDS = _float_env("TELEMETRY_WRITE_TIMEOUT_SECONDS", 5.0)
+
+# Expose per-stage timings on POST /lesson as a Server-Timing header (load tests)
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() == "true"
+
+# Opt-in per-request cProfile (X-Profile: <token> header, or a sampled fraction)
+PROFILING_SAMPLE_RATE = _float_env("PROFILING_SAMPLE_RATE", 0.0)
+PROFILING_ADMIN_TOKEN = os.getenv("PROFILING_ADMIN_TOKEN", "")
+PROFILING_DIR = os.getenv("PROFILING_DIR", "profiles")
+
+# Logging (queued writer; json or text lines; per-event sampling like "mcp_hint=0.01")
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+LOG_QUEUE_MAX = _int_env("LOG_QUEUE_MAX", 10000)
+
+# Local tracing spans (in-memory ring at /debug/traces, optional JSONL file)
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACING_RING_SIZE = _int_env("TRACING_RING_SIZE", 200)
+TRACING_JSONL_PATH = os.getenv("TRACING_JSONL_PATH", "")
+# Spans waiting for the JSONL writer before new ones are dropped from the file
+TRACING_QUEUE_MAX = _int_env("TRACING_QUEUE_MAX", 10000)
+
+# Background pool for post-response work (MCP hints, telemetry writes)
+BACKGROUND_TASKS_ENABLED = os.getenv("BACKGROUND_TASKS_ENABLED", "true").lower() == "true"
+BACKGROUND_MAX_WORKERS = _int_env("BACKGROUND_MAX_WORKERS", 4)
+BACKGROUND_MAX_PENDING = _int_env("BACKGROUND_MAX_PENDING", 256)
+BACKGROUND_DRAIN_TIMEOUT_SECONDS = _float_env("BACKGROUND_DRAIN_TIMEOUT_SECONDS", 10.0)
+
+# Overload shedding (degrade to static/stub lessons past thresholds)
+OVERLOAD_SHEDDING_ENABLED = os.getenv("OVERLOAD_SHEDDING_ENABLED", "true").lower() == "true"
+OVERLOAD_FALLBACK = os.getenv("OVERLOAD_FALLBACK", "static").lower()
+OVERLOAD_LOOP_LAG_SECONDS = _float_env("OVERLOAD_LOOP_LAG_SECONDS", 0.5)
+OVERLOAD_LLM_IN_FLIGHT = _int_env("OVERLOAD_LLM_IN_FLIGHT", 24)
+OVERLOAD_LLM_LATENCY_SECONDS = _float_env("OVERLOAD_LLM_LATENCY_SECONDS", 40.0)
+OVERLOAD_LATENCY_WINDOW_SECONDS = _float_env("OVERLOAD_LATENCY_WINDOW_SECONDS", 60.0)
+OVERLOAD_RECOVERY_RATIO = _float_env("OVERLOAD_RECOVERY_RATIO", 0.7)
+OVERLOAD_RECOVERY_SECONDS = _float_env("OVERLOAD_RECOVERY_SECONDS", 15.0)
+LOOP_LAG_SAMPLE_INTERVAL_SECONDS = _float_env("LOOP_LAG_SAMPLE_INTERVAL_SECONDS", 0.25)
+# Capture the loop thread's stack when a callback blocks longer than this (0 disables)
+LOOP_BLOCK_THRESHOLD_SECONDS = _float_env("LOOP_BLOCK_THRESHOLD_SECONDS", 0.1)
+LOOP_BLOCK_STACK_DEPTH = _int_env("LOOP_BLOCK_STACK_DEPTH", 20)
+LOOP_BLOCK_HISTORY = _int_env("LOOP_BLOCK_HISTORY", 50)
+
 # Telemetry configuration
 TELEMETRY_BACKEND = os.getenv("TELEMETRY_BACKEND", "mongo").lower()
 try:
     TELEMETRY_MEMORY_CAP = int(os.getenv("TELEMETRY_MEMORY_CAP", "1000"))
 except (TypeError, ValueError):
     TELEMETRY_MEMORY_CAP = 1000
+# Approximate payload budget for the memory backend (0 = count cap only)
+TELEMETRY_MEMORY_MAX_BYTES = _int_env("TELEMETRY_MEMORY_MAX_BYTES", 64 * 1024 * 1024)
+# Runs kept in the columnar stats store (memory backend); oldest half dropped past this
+TELEMETRY_COLUMNS_MAX_RECORDS = _int_env("TELEMETRY_COLUMNS_MAX_RECORDS", 1_000_000)
+# X-Admin-Token value for the /telemetry routes (empty disables them)
+TELEMETRY_ADMIN_TOKEN = os.getenv("TELEMETRY_ADMIN_TOKEN", "")
+# Local write-ahead log for Mongo telemetry that fails to insert (empty = disabled)
+TELEMETRY_WAL_DIR = os.getenv("TELEMETRY_WAL_DIR", "")
+TELEMETRY_WAL_SEGMENT_BYTES = _int_env("TELEMETRY_WAL_SEGMENT_BYTES", 8 * 1024 * 1024)
+TELEMETRY_WAL_REPLAY_INTERVAL_SECONDS = _float_env("TELEMETRY_WAL_REPLAY_INTERVAL_SECONDS", 5.0)
+TELEMETRY_WAL_REPLAY_BATCH = _int_env("TELEMETRY_WAL_REPLAY_BATCH", 500)
+# Mongo indexes and retention (TTL days; 0 keeps documents/details forever)
+TELEMETRY_INDEXES_ENABLED = os.getenv("TELEMETRY_INDEXES_ENABLED", "true").lower() == "true"
+TELEMETRY_RUN_TTL_DAYS = _float_env("TELEMETRY_RUN_TTL_DAYS", 0.0)
+TELEMETRY_FAILURE_TTL_DAYS = _float_env("TELEMETRY_FAILURE_TTL_DAYS", 0.0)
+TELEMETRY_DETAIL_TTL_DAYS = _float_env("TELEMETRY_DETAIL_TTL_DAYS", 0.0)
+TELEMETRY_RETENTION_INTERVAL_SECONDS = _float_env("TELEMETRY_RETENTION_INTERVAL_SECONDS", 3600.0)
+# Coalesce identical failures within a window (0 = write every failure)
+TELEMETRY_FAILURE_WINDOW_SECONDS = _float_env("TELEMETRY_FAILURE_WINDOW_SECONDS", 10.0)
+TELEMETRY_FAILURE_SAMPLE_SESSIONS = _int_env("TELEMETRY_FAILURE_SAMPLE_SESSIONS", 5)
+TELEMETRY_FAILURE_MAX_GROUPS = _int_env("TELEMETRY_FAILURE_MAX_GROUPS", 1000)
+# Incremental hourly/daily rollups
+TELEMETRY_ROLLUPS_ENABLED = os.getenv("TELEMETRY_ROLLUPS_ENABLED", "true").lower() == "true"
+TELEMETRY_ROLLUP_INTERVAL_SECONDS = _float_env("TELEMETRY_ROLLUP_INTERVAL_SECONDS", 60.0)
+TELEMETRY_ROLLUP_LAG_SECONDS = _float_env("TELEMETRY_ROLLUP_LAG_SECONDS", 30.0)
 TELEMETRY_INCLUDE_HINT_DETAILS = os.getenv("TELEMETRY_INCLUDE_HINT_DETAILS", "true").lower() == "true"
+# Payload tiers: hint arrays for a sampled fraction of runs, plus runs matching a trigger
+TELEMETRY_DETAIL_SAMPLE_RATE = _float_env("TELEMETRY_DETAIL_SAMPLE_RATE", 1.0)
+TELEMETRY_DETAIL_TRIGGERS = os.getenv("TELEMETRY_DETAIL_TRIGGERS", "retry,runtime_error,degraded")
+# Schema-check telemetry records on construction (production may turn this off)
+TELEMETRY_VALIDATION_ENABLED = os.getenv("TELEMETRY_VALIDATION_ENABLED", "true").lower() == "true"
 
 # Lesson execution modes
 STATIC_LESSON_MODE = os.getenv("STATIC_LESSON_MODE", "false").lower() == "true"
@@ -49,6 +174,11 @@ if DEMO_MODE:
 # Validation
 # ---------------------------
 VALID_TELEMETRY_BACKENDS = {"mongo", "memory"}
+VALID_OVERLOAD_FALLBACKS = {"static", "stub"}
+VALID_LLM_OUTPUT_MODES = {"native", "text"}
+VALID_LOG_FORMATS = {"json", "text"}
+VALID_LLM_CASSETTE_MODES = {"off", "record", "replay"}
+VALID_TELEMETRY_DETAIL_TRIGGERS = {"retry", "runtime_error", "degraded"}
 
 # Runtime smoke test (advisory only)
 RUNTIME_SMOKE_TEST_ENABLED = os.getenv("RUNTIME_SMOKE_TEST_ENABLED", "false").lower() == "true"
@@ -65,6 +195,48 @@ if TELEMETRY_BACKEND not in VALID_TELEMETRY_BACKENDS:
         f"Valid values: {sorted(VALID_TELEMETRY_BACKENDS)}"
     )
 
+if OVERLOAD_FALLBACK not in VALID_OVERLOAD_FALLBACKS:
+    raise ValueError(
+        f"Invalid OVERLOAD_FALLBACK '{OVERLOAD_FALLBACK}'. "
+        f"Valid values: {sorted(VALID_OVERLOAD_FALLBACKS)}"
+    )
+
+if LOG_FORMAT not in VALID_LOG_FORMATS:
+    raise ValueError(
+        f"Invalid LOG_FORMAT '{LOG_FORMAT}'. "
+        f"Valid values: {sorted(VALID_LOG_FORMATS)}"
+    )
+
+if LLM_OUTPUT_MODE not in VALID_LLM_OUTPUT_MODES:
+    raise ValueError(
+        f"Invalid LLM_OUTPUT_MODE '{LLM_OUTPUT_MODE}'. "
+        f"Valid values: {sorted(VALID_LLM_OUTPUT_MODES)}"
+    )
+
+_unknown_triggers = {
+    name.strip() for name in TELEMETRY_DETAIL_TRIGGERS.split(",") if name.strip()
+} - VALID_TELEMETRY_DETAIL_TRIGGERS
+if _unknown_triggers:
+    raise ValueError(
+        f"Invalid TELEMETRY_DETAIL_TRIGGERS {sorted(_unknown_triggers)}. "
+        f"Valid values: {sorted(VALID_TELEMETRY_DETAIL_TRIGGERS)}"
+    )
+
+if LLM_CASSETTE_MODE not in VALID_LLM_CASSETTE_MODES:
+    raise ValueError(
+        f"Invalid LLM_CASSETTE_MODE '{LLM_CASSETTE_MODE}'. "
+        f"Valid values: {sorted(VALID_LLM_CASSETTE_MODES)}"
+    )
+
+if LLM_CASSETTE_LATENCY != "recorded":
+    try:
+        float(LLM_CASSETTE_LATENCY)
+    except ValueError as exc:
+        raise ValueError(
+            f"Invalid LLM_CASSETTE_LATENCY '{LLM_CASSETTE_LATENCY}'. "
+            "Use 'recorded' or a number of seconds."
+        ) from exc
+
 # ---------------------------
 # Optional runtime summary (useful for /health or logs)
 # ---------------------------
@@ -0,0 +1,104 @@
+"""Per-request time budgets for the lesson pipeline.
+
+A `Deadline` is created at the API boundary (from the `X-Request-Timeout-Ms`
+header or `REQUEST_DEADLINE_SECONDS`) and bound to the current context, so
+downstream stages (LLM limiter, validator smoke test, MCP tools, Context7,
+telemetry) can read it via `current_deadline()` without widening every
+signature. Stages that skip or cut work short record a miss on the deadline;
+misses are persisted with the telemetry record.
+"""
+
+from __future__ import annotations
+
+import math
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+from app.core import config, metrics
+
+_current: ContextVar["Deadline | None"] = ContextVar("lesson_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when a required stage cannot finish within the request budget."""
+
+    def __init__(self, stage: str, budget: float) -> None:
+        super().__init__(f"Request deadline of {budget:.1f}s exceeded during '{stage}'.")
+        self.stage = stage
+        self.budget = budget
+
+
+class Deadline:
+    """Monotonic request deadline with per-stage miss tracking."""
+
+    def __init__(self, budget: float, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self.budget = max(0.0, budget)
+        self._clock = clock
+        self.expires_at = clock() + self.budget
+        self.misses: list[dict[str, Any]] = []
+
+    @classmethod
+    def from_header(cls, value: str | None) -> "Deadline":
+        """Build a deadline from a millisecond header, clamped to the configured max."""
+        budget = config.REQUEST_DEADLINE_SECONDS
+        if value:
+            try:
+                budget = float(value) / 1000.0
+            except ValueError:
+                pass
+        if not math.isfinite(budget) or budget <= 0:
+            budget = config.REQUEST_DEADLINE_SECONDS
+        return cls(min(budget, config.REQUEST_DEADLINE_MAX_SECONDS))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - self._clock())
+
+    @property
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def allows(self, stage: str, min_seconds: float) -> bool:
+        """Return True if at least `min_seconds` remain, else record a skip."""
+        if self.remaining() >= min_seconds:
+            return True
+        self.record_miss(stage, "skipped")
+        return False
+
+    def timeout_for(self, default: float, *, reserve: float = 0.0) -> float:
+        """Shorten a stage timeout so it ends before the deadline minus `reserve`."""
+        return max(0.0, min(default, self.remaining() - reserve))
+
+    def record_miss(self, stage: str, action: str) -> None:
+        """Record that `stage` was skipped, shortened, or timed out."""
+        self.misses.append(
+            {
+                "stage": stage,
+                "action": action,
+                "remaining_ms": int(self.remaining() * 1000),
+            }
+        )
+        metrics.increment(f"deadline.misses.{stage}")
+
+    def to_summary(self) -> dict[str, Any]:
+        return {
+            "budget_ms": int(self.budget * 1000),
+            "remaining_ms": int(self.remaining() * 1000),
+            "misses": list(self.misses),
+        }
+
+
+def current_deadline() -> Deadline | None:
+    """Return the deadline bound to the current request, if any."""
+    return _current.get()
+
+
+@contextmanager
+def use_deadline(deadline: Deadline | None) -> Iterator[Deadline | None]:
+    """Bind `deadline` to the current context for the duration of the block."""
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
@@ -0,0 +1,71 @@
+"""Per-request LLM token usage, including provider prompt-cache hits.
+
+`generate_lesson` binds an `LLMUsage` accumulator to the current context;
+`ContentAgentLLM` adds the provider-reported usage of every completion
+(initial and repair attempts) without widening any signatures. The totals
+are persisted with the run telemetry, so cached-token ratios can be
+compared across prompt layouts.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Iterator
+
+from app.core import metrics
+
+_current: ContextVar["LLMUsage | None"] = ContextVar("llm_usage", default=None)
+
+
+@dataclass
+class LLMUsage:
+    """Token totals across all LLM requests made for one lesson."""
+
+    requests: int = 0
+    input_tokens: int = 0
+    output_tokens: int = 0
+    cache_read_tokens: int = 0
+
+    def add(self, usage: Any) -> None:
+        """Add a provider usage object (pydantic-ai `RunUsage` or similar)."""
+        input_tokens = getattr(usage, "input_tokens", 0) or 0
+        output_tokens = getattr(usage, "output_tokens", 0) or 0
+        cached = getattr(usage, "cache_read_tokens", 0) or 0
+        self.requests += getattr(usage, "requests", 1) or 1
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+        self.cache_read_tokens += cached
+        metrics.increment("llm_usage.input_tokens", input_tokens)
+        metrics.increment("llm_usage.output_tokens", output_tokens)
+        metrics.increment("llm_usage.cache_read_tokens", cached)
+
+    @property
+    def cached_ratio(self) -> float:
+        return self.cache_read_tokens / self.input_tokens if self.input_tokens else 0.0
+
+    def to_summary(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "cache_read_tokens": self.cache_read_tokens,
+            "cached_ratio": round(self.cached_ratio, 4),
+        }
+
+
+def current_llm_usage() -> LLMUsage | None:
+    """Return the usage accumulator bound to the current request, if any."""
+    return _current.get()
+
+
+@contextmanager
+def track_llm_usage(usage: LLMUsage | None = None) -> Iterator[LLMUsage]:
+    """Bind a usage accumulator to the current context for the block."""
+    usage = usage or LLMUsage()
+    token = _current.set(usage)
+    try:
+        yield usage
+    finally:
+        _current.reset(token)
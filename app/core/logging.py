@@ -1,11 +1,146 @@
-"""Application logging configuration."""
+"""Application logging configuration.
 
+Records are handed to a `QueueHandler`, so a log call on the request path
+(or the event loop) costs little more than an enqueue; a `QueueListener`
+thread formats and writes them. With `LOG_FORMAT=json` every line is one
+JSON object whose keys include the `extra` fields passed to the logger:
+
+    logger.info("mcp_hint", extra={"session_id": ..., "hint_code": ...})
+    -> {"ts": ..., "level": "INFO", "logger": ..., "event": "mcp_hint", "session_id": ..., ...}
+
+High-volume events can be sampled per event name with `LOG_SAMPLE_RATES`
+(e.g. `mcp_hint=0.01`); warnings and errors are never sampled out. When
+the queue is full, records are dropped and counted rather than blocking.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
+import sys
+from datetime import datetime, timezone
+from typing import Any
+
+from app.core import config, metrics
+
+# Attributes every LogRecord has; anything else came from `extra`
+_RECORD_ATTRS = frozenset(
+    vars(logging.LogRecord("", 0, "", 0, "", None, None)).keys()
+    | {"message", "asctime", "taskName"}
+)
+
+_listener: logging.handlers.QueueListener | None = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record, with `extra` fields as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload: dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "event": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                payload[key] = value
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        if record.stack_info:
+            payload["stack_info"] = self.formatStack(record.stack_info)
+        return json.dumps(payload, default=str, ensure_ascii=False)
+
+
+class EventSampler(logging.Filter):
+    """Keep only a fraction of INFO/DEBUG records per event name."""
+
+    def __init__(self, rates: dict[str, float]) -> None:
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or not self.rates:
+            return True
+        rate = self.rates.get(record.msg) if isinstance(record.msg, str) else None
+        if rate is None or rate >= 1.0 or random.random() < rate:
+            return True
+        metrics.increment("logging.sampled_out")
+        return False
+
+
+class _EnqueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that defers formatting to the listener and never blocks."""
+
+    def __init__(self, log_queue: queue.SimpleQueue, maxsize: int = 0) -> None:
+        super().__init__(log_queue)
+        self.maxsize = maxsize
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve %-args now (they may change later); rendering happens on the listener
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        # SimpleQueue (C, lock-free put) with a soft bound instead of Queue's Condition
+        if self.maxsize and self.queue.qsize() >= self.maxsize:
+            metrics.increment("logging.dropped")
+            return
+        self.queue.put_nowait(record)
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """Parse `event=rate,event=rate` (invalid entries are ignored)."""
+    rates: dict[str, float] = {}
+    for item in spec.split(","):
+        event, _, rate = item.partition("=")
+        try:
+            rates[event.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+
+def build_formatter() -> logging.Formatter:
+    if config.LOG_FORMAT == "json":
+        return JsonFormatter()
+    return logging.Formatter("%(asctime)s %(levelname)s %(name)s %(message)s")
 
 
 def setup_logging() -> None:
-    """Configure default logging for the app."""
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s %(levelname)s %(name)s %(message)s",
-    )
+    """Route root logging through a queue to a background writer (idempotent)."""
+    global _listener
+    if _listener is not None:
+        return
+
+    # Skip per-record work the formatters never use (stdlib logging "Optimization" notes).
+    # Caller lookup (funcName/lineno) stays on: other handlers and libraries may rely on it
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    output = logging.StreamHandler(sys.stderr)
+    output.setFormatter(build_formatter())
+    log_queue: queue.SimpleQueue[logging.LogRecord] = queue.SimpleQueue()
+    handler = _EnqueueHandler(log_queue, maxsize=config.LOG_QUEUE_MAX)
+    handler.addFilter(EventSampler(parse_sample_rates(config.LOG_SAMPLE_RATES)))
+
+    root = logging.getLogger()
+    root.handlers = [handler]
+    root.setLevel(config.LOG_LEVEL)
+
+    _listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(shutdown_logging)
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread."""
+    global _listener
+    listener, _listener = _listener, None
+    if listener is not None:
+        listener.stop()
@@ -0,0 +1,179 @@
+"""Event-loop lag sampling and blocking-call detection.
+
+A background task sleeps for a fixed interval and measures how late it
+wakes up. The overshoot is the scheduling lag every other coroutine on
+the loop is experiencing at that moment; every sample also feeds the
+`event_loop.lag_seconds` histogram.
+
+A watchdog thread checks the same wake-up deadline from outside the loop.
+When the loop has been stuck for longer than
+`LOOP_BLOCK_THRESHOLD_SECONDS`, the loop thread's current stack is
+captured, so the offending synchronous call (a pymongo insert, a urllib
+request, `exec`, a logging fan-out, ...) is logged with its call site
+while it is still blocking.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from pathlib import Path
+from typing import Any
+
+from app.core import config, metrics
+
+logger = logging.getLogger(__name__)
+
+# Histogram buckets (seconds) for scheduling lag and blocked durations
+LAG_BUCKETS: tuple[float, ...] = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+# Frames under this directory are preferred as the reported call site
+_PROJECT_ROOT = str(Path(__file__).resolve().parents[2])
+
+
+class LoopLagMonitor:
+    """Samples event-loop scheduling lag while the app is running."""
+
+    def __init__(
+        self,
+        interval: float | None = None,
+        history: int = 10,
+        block_threshold: float | None = None,
+    ) -> None:
+        self._interval = interval
+        self._block_threshold = block_threshold
+        self._samples: deque[float] = deque(maxlen=history)
+        self._task: asyncio.Task[None] | None = None
+        self._loop_thread_id: int | None = None
+        self._expected_wake: float | None = None
+        self._watchdog: threading.Thread | None = None
+        self._watchdog_stop = threading.Event()
+        self.offenders: deque[dict[str, Any]] = deque(maxlen=config.LOOP_BLOCK_HISTORY)
+
+    @property
+    def interval(self) -> float:
+        return self._interval if self._interval is not None else config.LOOP_LAG_SAMPLE_INTERVAL_SECONDS
+
+    @property
+    def block_threshold(self) -> float:
+        if self._block_threshold is not None:
+            return self._block_threshold
+        return config.LOOP_BLOCK_THRESHOLD_SECONDS
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def current_lag(self) -> float:
+        """Worst lag among the recent samples (0 when not running)."""
+        if not self.running or not self._samples:
+            return 0.0
+        return max(self._samples)
+
+    def start(self) -> None:
+        """Start sampling on the running loop (idempotent)."""
+        if self.running:
+            return
+        self._samples.clear()
+        self._loop_thread_id = threading.get_ident()
+        self._expected_wake = None
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="loop-lag-monitor")
+        if self.block_threshold > 0:
+            self._watchdog_stop.clear()
+            self._watchdog = threading.Thread(
+                target=self._watch, name="loop-block-watchdog", daemon=True
+            )
+            self._watchdog.start()
+
+    async def stop(self) -> None:
+        """Stop sampling and wait for the task and watchdog to exit."""
+        watchdog, self._watchdog = self._watchdog, None
+        if watchdog is not None:
+            self._watchdog_stop.set()
+            await asyncio.to_thread(watchdog.join, 1.0)
+        task, self._task = self._task, None
+        if task is None:
+            return
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+    def record(self, lag: float) -> None:
+        self._samples.append(lag)
+        metrics.set_gauge("event_loop.lag_seconds", lag)
+        metrics.observe("event_loop.lag_seconds", lag, buckets=LAG_BUCKETS)
+
+    async def _run(self) -> None:
+        while True:
+            interval = self.interval
+            started = time.perf_counter()
+            self._expected_wake = started + interval
+            await asyncio.sleep(interval)
+            self.record(max(0.0, time.perf_counter() - started - interval))
+
+    # ---------------------------
+    # Blocking-call watchdog (runs in its own thread)
+    # ---------------------------
+    def _watch(self) -> None:
+        threshold = self.block_threshold
+        reported_wake: float | None = None
+        stall_started: float | None = None
+        while not self._watchdog_stop.wait(threshold / 2):
+            expected = self._expected_wake
+            if expected is None:
+                continue
+            if stall_started is not None and expected != reported_wake:
+                # The loop woke up again: record how long the stall lasted
+                metrics.observe(
+                    "event_loop.blocked_seconds",
+                    max(0.0, expected - self.interval - stall_started),
+                    buckets=LAG_BUCKETS,
+                )
+                stall_started = None
+            overdue = time.perf_counter() - expected
+            if overdue > threshold and expected != reported_wake:
+                reported_wake = expected
+                stall_started = expected
+                self._report_block(overdue)
+
+    def _report_block(self, blocked_seconds: float) -> None:
+        frame = sys._current_frames().get(self._loop_thread_id or -1)
+        if frame is None:
+            return
+        stack = traceback.extract_stack(frame, limit=config.LOOP_BLOCK_STACK_DEPTH)
+        site = _call_site(stack)
+        offender = {
+            "blocked_seconds": round(blocked_seconds, 4),
+            "call_site": f"{site.filename}:{site.lineno} in {site.name}" if site else None,
+            "stack": [f"{f.filename}:{f.lineno} in {f.name}" for f in stack],
+        }
+        self.offenders.append(offender)
+        metrics.increment("event_loop.blocked")
+        logger.warning(
+            "event_loop_blocked",
+            extra={
+                "blocked_seconds": offender["blocked_seconds"],
+                "call_site": offender["call_site"],
+                "stack": offender["stack"],
+            },
+        )
+
+
+def _call_site(stack: traceback.StackSummary) -> traceback.FrameSummary | None:
+    """Innermost project frame (falls back to the innermost frame)."""
+    for frame in reversed(stack):
+        if frame.filename.startswith(_PROJECT_ROOT) and "site-packages" not in frame.filename:
+            return frame
+    return stack[-1] if stack else None
+
+
+loop_monitor = LoopLagMonitor()
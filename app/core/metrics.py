@@ -0,0 +1,82 @@
+"""In-process metrics registry for counters, gauges, and histograms.
+
+Metrics are process-local and exposed as JSON via `/metrics`.
+All helpers are thread-safe and cheap enough to call on the request path.
+"""
+
+from __future__ import annotations
+
+import bisect
+import threading
+from typing import Sequence
+
+# Default histogram buckets (seconds), tuned for request/LLM latencies
+DEFAULT_BUCKETS: tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+_lock = threading.Lock()
+_counters: dict[str, float] = {}
+_gauges: dict[str, float] = {}
+_histograms: dict[str, "_Histogram"] = {}
+
+
+class _Histogram:
+    """Cumulative histogram with fixed upper bounds."""
+
+    __slots__ = ("bounds", "counts", "count", "total")
+
+    def __init__(self, bounds: Sequence[float]) -> None:
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def to_dict(self) -> dict[str, object]:
+        buckets = {f"le_{bound:g}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets["le_inf"] = self.counts[-1]
+        return {"count": self.count, "sum": self.total, "buckets": buckets}
+
+
+def increment(name: str, value: float = 1.0) -> None:
+    """Increment a monotonic counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0.0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    """Set a gauge to the latest observed value."""
+    with _lock:
+        _gauges[name] = value
+
+
+def observe(name: str, value: float, buckets: Sequence[float] = DEFAULT_BUCKETS) -> None:
+    """Record a histogram observation (buckets are fixed on first use)."""
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = _Histogram(buckets)
+        histogram.observe(value)
+
+
+def snapshot() -> dict[str, object]:
+    """Return a point-in-time copy of all metrics."""
+    with _lock:
+        return {
+            "counters": dict(_counters),
+            "gauges": dict(_gauges),
+            "histograms": {name: h.to_dict() for name, h in _histograms.items()},
+        }
+
+
+def reset_metrics() -> None:
+    """Clear all metrics (test helper)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
+        _histograms.clear()
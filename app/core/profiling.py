@@ -0,0 +1,81 @@
+"""Opt-in per-request cProfile capture.
+
+A request is profiled when it carries `X-Profile: <PROFILING_ADMIN_TOKEN>`
+or is picked by `PROFILING_SAMPLE_RATE`. The profile is written to
+`PROFILING_DIR/<run_id>.prof` (open with `python -m pstats` or snakeviz)
+and its path is stored on the run's telemetry record.
+
+cProfile follows the event-loop thread, so a profile also contains any
+other coroutines that ran while the request was in flight, and only one
+request is profiled at a time (a second candidate is skipped, not
+queued). When profiling is off the only cost is the `should_profile`
+check.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import hmac
+import logging
+import random
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+from app.core import config, metrics
+
+logger = logging.getLogger(__name__)
+
+# cProfile allows one active profiler per thread; the loop runs on one thread
+_active = threading.Lock()
+
+
+def should_profile(header: str | None = None) -> bool:
+    """True for an admin `X-Profile` header or a sampled request."""
+    token = config.PROFILING_ADMIN_TOKEN
+    if header and token and hmac.compare_digest(header.encode(), token.encode()):
+        return True
+    rate = config.PROFILING_SAMPLE_RATE
+    return rate > 0 and random.random() < rate
+
+
+def profile_path(run_id: str) -> Path:
+    return Path(config.PROFILING_DIR) / f"{run_id}.prof"
+
+
+@contextmanager
+def profile_request(run_id: str, *, enabled: bool) -> Iterator[str | None]:
+    """Profile the block when enabled; yield the profile path (None if not profiled)."""
+    if not enabled:
+        yield None
+        return
+    if not _active.acquire(blocking=False):
+        metrics.increment("profiling.skipped_busy")
+        yield None
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+    except ValueError:
+        # Another profiler or debugger owns the thread
+        _active.release()
+        metrics.increment("profiling.skipped_busy")
+        yield None
+        return
+
+    path = profile_path(run_id)
+    try:
+        yield str(path)
+    finally:
+        profiler.disable()
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(path)
+            metrics.increment("profiling.profiles")
+            logger.info("request_profiled", extra={"run_id": run_id, "profile_path": str(path)})
+        except OSError as exc:
+            logger.warning("Profile write failed run_id=%s", run_id, exc_info=exc)
+        finally:
+            _active.release()
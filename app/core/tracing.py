@@ -0,0 +1,292 @@
+"""Local request tracing: nested spans with in-memory and JSONL exporters.
+
+Spans follow the current context (`span()` nests under whatever span is
+active), so a lesson request yields one trace: the root request span,
+each pipeline stage attempt, LLM completions, rule-engine blocks, MCP
+tools, Context7 HTTP calls, and the telemetry write. Finished spans are
+kept in a bounded in-memory ring (served at `/debug/traces`) and, when
+`TRACING_JSONL_PATH` is set, appended to a JSONL file, one span per line.
+File output goes through a queue to a writer thread that keeps the file
+open, so finishing a span on the event loop never touches the disk; when
+more than `TRACING_QUEUE_MAX` spans are waiting, new ones are dropped
+from the file (counted in `tracing.dropped`) but still kept in the ring.
+
+With `TRACING_ENABLED=false` (the default) `span()` yields a no-op span
+and nothing is recorded.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import queue
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, Iterator
+from uuid import uuid4
+
+from app.core import config, metrics
+
+_current: ContextVar["Span | None"] = ContextVar("trace_span", default=None)
+
+
+@dataclass
+class Span:
+    """One timed operation within a trace."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    start_time: float
+    attributes: dict[str, Any] = field(default_factory=dict)
+    duration_ms: float | None = None
+    status: str = "ok"
+    error: str | None = None
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def set_attributes(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_time": self.start_time,
+            "duration_ms": self.duration_ms,
+            "status": self.status,
+            "error": self.error,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Returned by `span()` when tracing is disabled."""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def set_attributes(self, **attributes: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+_STOP = object()
+
+
+class JsonlSpanWriter:
+    """Writer thread appending queued span records to a JSONL file it keeps open."""
+
+    def __init__(self) -> None:
+        self._queue: queue.SimpleQueue[Any] = queue.SimpleQueue()
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+        self._handle: IO[str] | None = None
+        self._path: str | None = None
+
+    def write(self, path: str, record: dict[str, Any]) -> None:
+        """Enqueue one record; never blocks (drops when the queue is full)."""
+        maxsize = config.TRACING_QUEUE_MAX
+        if maxsize and self._queue.qsize() >= maxsize:
+            metrics.increment("tracing.dropped")
+            return
+        self._start()
+        self._queue.put_nowait((path, record))
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait until every record queued so far is written. Returns False on timeout."""
+        if self._thread is None:
+            return True
+        written = threading.Event()
+        self._queue.put_nowait(written)
+        return written.wait(timeout)
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Write queued records, close the file and stop the thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put_nowait(_STOP)
+            thread.join(timeout)
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="trace-jsonl-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            if isinstance(item, threading.Event):
+                self._flush_file()
+                item.set()
+                continue
+            path, record = item
+            try:
+                handle = self._open(path)
+                handle.write(json.dumps(record, default=str) + "\n")
+                if self._queue.empty():
+                    handle.flush()
+            except OSError:
+                metrics.increment("tracing.export_errors")
+        self._close()
+
+    def _open(self, path: str) -> IO[str]:
+        if self._handle is None or self._path != path:
+            self._close()
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._handle = open(path, "a", encoding="utf-8")
+            self._path = path
+        return self._handle
+
+    def _flush_file(self) -> None:
+        if self._handle is not None:
+            try:
+                self._handle.flush()
+            except OSError:
+                metrics.increment("tracing.export_errors")
+
+    def _close(self) -> None:
+        handle, self._handle, self._path = self._handle, None, None
+        if handle is not None:
+            try:
+                handle.close()
+            except OSError:
+                metrics.increment("tracing.export_errors")
+
+
+class TraceStore:
+    """Bounded ring of recent traces plus the optional JSONL exporter."""
+
+    def __init__(self) -> None:
+        self._traces: OrderedDict[str, list[dict[str, Any]]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._writer = JsonlSpanWriter()
+
+    def export(self, span: Span) -> None:
+        record = span.to_dict()
+        with self._lock:
+            spans = self._traces.get(span.trace_id)
+            if spans is None:
+                spans = self._traces[span.trace_id] = []
+                while len(self._traces) > max(1, config.TRACING_RING_SIZE):
+                    self._traces.popitem(last=False)
+            spans.append(record)
+        metrics.increment("tracing.spans")
+
+        path = config.TRACING_JSONL_PATH
+        if path:
+            self._writer.write(path, record)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait for spans queued for the JSONL file to be written."""
+        return self._writer.flush(timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Write queued spans and close the JSONL file."""
+        self._writer.stop(timeout)
+
+    def traces(self, *, limit: int = 50, min_ms: float = 0.0) -> list[dict[str, Any]]:
+        """Newest-first summaries of traces whose root took at least `min_ms`."""
+        with self._lock:
+            snapshot = [(trace_id, list(spans)) for trace_id, spans in self._traces.items()]
+
+        summaries: list[dict[str, Any]] = []
+        for trace_id, spans in reversed(snapshot):
+            root = next((s for s in spans if s["parent_id"] is None), None)
+            if root is None or (root["duration_ms"] or 0.0) < min_ms:
+                continue
+            summaries.append(
+                {
+                    "trace_id": trace_id,
+                    "name": root["name"],
+                    "start_time": root["start_time"],
+                    "duration_ms": root["duration_ms"],
+                    "status": root["status"],
+                    "attributes": root["attributes"],
+                    "span_count": len(spans),
+                }
+            )
+            if len(summaries) >= limit:
+                break
+        return summaries
+
+    def get(self, trace_id: str) -> list[dict[str, Any]] | None:
+        with self._lock:
+            spans = self._traces.get(trace_id)
+            return sorted(spans, key=lambda s: s["start_time"]) if spans is not None else None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._traces.clear()
+
+
+trace_store = TraceStore()
+atexit.register(trace_store.close, 1.0)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span | _NoopSpan]:
+    """Time the block as a span nested under the current one (a new trace at the root)."""
+    if not config.TRACING_ENABLED:
+        yield _NOOP_SPAN
+        return
+
+    parent = _current.get()
+    current = Span(
+        name=name,
+        trace_id=parent.trace_id if parent is not None else uuid4().hex,
+        span_id=uuid4().hex[:16],
+        parent_id=parent.span_id if parent is not None else None,
+        start_time=time.time(),
+        attributes=attributes,
+    )
+    token = _current.set(current)
+    try:
+        yield current
+    except BaseException as exc:
+        current.status = "error"
+        current.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        current.duration_ms = round((time.perf_counter() - current._started) * 1000, 3)
+        _current.reset(token)
+        trace_store.export(current)
+
+
+def current_span() -> Span | None:
+    return _current.get()
+
+
+def set_attributes(**attributes: Any) -> None:
+    """Add attributes to the current span (no-op without one)."""
+    current = _current.get()
+    if current is not None:
+        current.set_attributes(**attributes)
+
+
+@contextmanager
+def use_span(parent: Span | None) -> Iterator[None]:
+    """Re-attach a span captured elsewhere (e.g. for background threads)."""
+    token = _current.set(parent)
+    try:
+        yield
+    finally:
+        _current.reset(token)
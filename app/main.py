@@ -1,22 +1,55 @@
 """FastAPI application entrypoint."""
 
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 
-from app.api import lesson
+from app.api import debug, lesson, metrics, telemetry
 from app.mcp import python_code_hints  # noqa: F401
 from app.core import config
+from app.core.deadline import DeadlineExceeded
 from app.core.logging import setup_logging
+from app.core.tracing import trace_store
+from app.core.loop_monitor import loop_monitor
+from app.services import mongo, telemetry_failures, telemetry_rollups
+from app.services.background import background_pool
+from app.services.llm_limiter import LLMCapacityError
 
 # Initialize logging as early as possible
 setup_logging()
 
+
+@asynccontextmanager
+async def lifespan(_app: FastAPI):
+    """Start and stop process-level background monitors and workers."""
+    loop_monitor.start()
+    mongo.start_wal_replayer()
+    mongo.start_retention_worker()
+    telemetry_rollups.start_worker()
+    telemetry_failures.start_worker()
+    try:
+        yield
+    finally:
+        await loop_monitor.stop()
+        # Let post-response work (telemetry, MCP hints) finish before exit
+        await asyncio.to_thread(background_pool.shutdown, config.BACKGROUND_DRAIN_TIMEOUT_SECONDS)
+        # Pending coalesced failures are written before the WAL is sealed
+        await asyncio.to_thread(telemetry_failures.stop_worker)
+        await asyncio.to_thread(mongo.stop_wal_replayer)
+        await asyncio.to_thread(mongo.stop_retention_worker)
+        await asyncio.to_thread(telemetry_rollups.stop_worker)
+        await asyncio.to_thread(trace_store.close, 1.0)
+
+
 app = FastAPI(
     title="uLearn API",
     version="0.6.5",
     description="Backend API for the uLearn micro-learning platform",
+    lifespan=lifespan,
 )
 
 # ---------------------------
@@ -51,7 +84,27 @@ async def health_check():
         **config.runtime_mode(),
     }
 
+# ---------------------------
+# Error mapping
+# ---------------------------
+@app.exception_handler(LLMCapacityError)
+async def llm_capacity_handler(_request: Request, exc: LLMCapacityError) -> JSONResponse:
+    """Shed load with a fast 503 instead of queueing indefinitely."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc)},
+        headers={"Retry-After": exc.retry_after_header},
+    )
+
+@app.exception_handler(DeadlineExceeded)
+async def deadline_exceeded_handler(_request: Request, exc: DeadlineExceeded) -> JSONResponse:
+    """Report an exhausted request budget as a gateway timeout."""
+    return JSONResponse(status_code=504, content={"detail": str(exc)})
+
 # ---------------------------
 # API routes
 # ---------------------------
 app.include_router(lesson.router)
+app.include_router(metrics.router)
+app.include_router(debug.router)
+app.include_router(telemetry.router)
@@ -10,6 +10,7 @@ from typing import Any
 
 from app.agents.mcp_tools import register_tool
 from app.core import config
+from app.core.deadline import current_deadline
 from app.services.context7_client import fetch_context_snippets
 from app.services.mcp_hints import (
     collect_hints_from_generated_sections,
@@ -56,8 +57,14 @@ def _append_context7_hints(
 
     context_hints: list[dict[str, str]] = []
     cache: dict[str, dict[str, Any] | None] = {}
+    deadline = current_deadline()
     for library in sorted(libraries):
         if library not in cache:
+            # Advisory lookups never hold the response past its budget
+            if deadline is not None and not deadline.allows(
+                "context7", config.DEADLINE_MIN_CONTEXT7_SECONDS
+            ):
+                break
             cache[library] = _fetch_context_snippet(api_key, library)
             snippet = cache[library]
             logger.debug(
@@ -26,3 +26,4 @@ class LessonResponse(BaseModel):
     objective: str
     total_minutes: int
     sections: list[LessonSection]
+    degraded: bool = Field(default=False, description="True when served in degraded (static/stub) mode under overload")
@@ -4,7 +4,9 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Any, List, Literal, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter
+
+from app.core import config
 
 
 # -----------------------------
@@ -29,6 +31,12 @@ class LessonRunModel(BaseModel):
     mcp_summary: Optional[dict[str, Any]] = None
     rule_summary: Optional[dict[str, Any]] = None
     system_observations: Optional[dict[str, Any]] = None
+    degraded_reason: Optional[str] = None
+    deadline: Optional[dict[str, Any]] = None
+    llm_usage: Optional[dict[str, Any]] = None
+    profile_path: Optional[str] = None
+    timings: Optional[dict[str, float | dict[str, float]]] = None
+    telemetry_sample: Optional[dict[str, Any]] = None
 
 
 class LessonFailureModel(BaseModel):
@@ -42,13 +50,24 @@ class LessonFailureModel(BaseModel):
     error_type: str
     error_message: str
     error_details: Optional[List[dict[str, Any]]] = None
+    deadline: Optional[dict[str, Any]] = None
+    profile_path: Optional[str] = None
+    count: Optional[int] = None
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
+    session_ids: Optional[List[str]] = None
+
+
+# Built once; validating straight from the record's attributes avoids a kwargs copy
+_RUN_ADAPTER = TypeAdapter(LessonRunModel)
+_FAILURE_ADAPTER = TypeAdapter(LessonFailureModel)
 
 
 # -----------------------------
 # Internal telemetry model
 # -----------------------------
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LessonRun:
     """Validated telemetry record for a lesson generation run."""
     run_id: str
@@ -67,28 +86,17 @@ class LessonRun:
     mcp_summary: Optional[dict[str, Any]] = None
     rule_summary: Optional[dict[str, Any]] = None
     system_observations: Optional[dict[str, Any]] = None
+    degraded_reason: Optional[str] = None
+    deadline: Optional[dict[str, Any]] = None
+    llm_usage: Optional[dict[str, Any]] = None
+    profile_path: Optional[str] = None
+    timings: Optional[dict[str, float | dict[str, float]]] = None
+    telemetry_sample: Optional[dict[str, Any]] = None
 
     def __post_init__(self) -> None:
         """Validate fields once at construction time."""
-        # Validate once at construction time
-        LessonRunModel(
-            run_id=self.run_id,
-            session_id=self.session_id,
-            topic=self.topic,
-            level=self.level,
-            created_at=self.created_at,
-            attempt_count=self.attempt_count,
-            total_minutes=self.total_minutes,
-            objective=self.objective,
-            section_ids=self.section_ids,
-            hint_summary=self.hint_summary,
-            rule_hints=self.rule_hints,
-            runtime_hints=self.runtime_hints,
-            mcp_hints=self.mcp_hints,
-            mcp_summary=self.mcp_summary,
-            rule_summary=self.rule_summary,
-            system_observations=self.system_observations,
-        )
+        if config.TELEMETRY_VALIDATION_ENABLED:
+            _RUN_ADAPTER.validate_python(self, from_attributes=True)
 
     def to_mongo(self) -> dict:
         """Convert the telemetry record to a MongoDB-ready document."""
@@ -117,10 +125,23 @@ class LessonRun:
             doc["rule_summary"] = self.rule_summary
         if self.system_observations is not None:
             doc["system_observations"] = self.system_observations
+        if self.degraded_reason is not None:
+            doc["degraded"] = True
+            doc["degraded_reason"] = self.degraded_reason
+        if self.deadline is not None:
+            doc["deadline"] = self.deadline
+        if self.llm_usage is not None:
+            doc["llm_usage"] = self.llm_usage
+        if self.profile_path is not None:
+            doc["profile_path"] = self.profile_path
+        if self.timings is not None:
+            doc["timings"] = self.timings
+        if self.telemetry_sample is not None:
+            doc["telemetry_sample"] = self.telemetry_sample
         return doc
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class LessonFailure:
     """Validated telemetry record for a lesson generation failure."""
     run_id: str
@@ -132,24 +153,22 @@ class LessonFailure:
     error_message: str
     error_details: Optional[List[dict[str, Any]]] = None
     attempt_count: Optional[int] = None
+    deadline: Optional[dict[str, Any]] = None
+    profile_path: Optional[str] = None
+    # Set on coalesced records standing for `count` identical failures
+    count: Optional[int] = None
+    first_seen: Optional[datetime] = None
+    last_seen: Optional[datetime] = None
+    session_ids: Optional[List[str]] = None
 
     def __post_init__(self) -> None:
         """Validate fields once at construction time."""
-        LessonFailureModel(
-            run_id=self.run_id,
-            session_id=self.session_id,
-            topic=self.topic,
-            level=self.level,
-            created_at=self.created_at,
-            attempt_count=self.attempt_count,
-            error_type=self.error_type,
-            error_message=self.error_message,
-            error_details=self.error_details,
-        )
+        if config.TELEMETRY_VALIDATION_ENABLED:
+            _FAILURE_ADAPTER.validate_python(self, from_attributes=True)
 
     def to_mongo(self) -> dict:
         """Convert the failure record to a MongoDB-ready document."""
-        return {
+        doc = {
             "run_id": self.run_id,
             "session_id": self.session_id,
             "topic": self.topic,
@@ -160,3 +179,13 @@ class LessonFailure:
             "error_message": self.error_message,
             "error_details": self.error_details,
         }
+        if self.deadline is not None:
+            doc["deadline"] = self.deadline
+        if self.profile_path is not None:
+            doc["profile_path"] = self.profile_path
+        if self.count is not None:
+            doc["count"] = self.count
+            doc["first_seen"] = self.first_seen
+            doc["last_seen"] = self.last_seen
+            doc["session_ids"] = self.session_ids
+        return doc
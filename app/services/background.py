@@ -0,0 +1,203 @@
+"""Supervised background pool for best-effort, post-response work.
+
+Work that never changes the lesson returned to the user (MCP hints,
+Context7 lookups, telemetry inserts) is handed to this pool so the
+response can be returned as soon as sections are rendered.
+
+- Concurrency is bounded by a fixed number of worker threads (the work is
+  blocking: urllib, pymongo, AST walks).
+- Pending work is bounded. Work the pool cannot take (saturated,
+  disabled or shut down) runs inline only for callers outside an event
+  loop. On the loop, saturation sheds the work (counted in
+  `background.dropped_saturated`) unless it was submitted with
+  `durable=True` (telemetry writes), and a disabled or shut-down pool
+  hands it to the loop's default executor, so a request never blocks on
+  it. Durable work shed by a saturated pool takes the same path (counted
+  in `background.overflow`): it may wait, but it is never dropped.
+- Failures are logged and counted, never propagated.
+- `drain()` waits for in-flight work (used on shutdown and in tests).
+
+`PeriodicWorker` covers the other shape of background work: a
+maintenance job (WAL replay, retention) run every few seconds on its own
+daemon thread, with the same failure supervision.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.core import config, metrics
+
+logger = logging.getLogger(__name__)
+
+
+class BackgroundTaskPool:
+    """Bounded thread pool with supervision and drain-on-shutdown."""
+
+    def __init__(self, *, max_workers: int | None = None, max_pending: int | None = None) -> None:
+        self._max_workers = max_workers
+        self._max_pending = max_pending
+        self._executor: ThreadPoolExecutor | None = None
+        self._pending = 0
+        self._condition = threading.Condition()
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def submit(self, name: str, fn: Callable[..., Any], *args: Any, durable: bool = False, **kwargs: Any) -> None:
+        """Schedule `fn` in the background (see `_fallback` when the pool cannot take it).
+
+        `durable` work is never shed when the pool is saturated.
+        """
+        max_pending = self._max_pending if self._max_pending is not None else config.BACKGROUND_MAX_PENDING
+        with self._condition:
+            saturated = self._pending >= max_pending
+            if config.BACKGROUND_TASKS_ENABLED and not saturated:
+                self._pending += 1
+                metrics.set_gauge("background.pending", self._pending)
+                executor = self._get_executor()
+            else:
+                executor = None
+
+        if executor is None:
+            self._fallback(name, fn, args, kwargs, saturated=saturated, durable=durable)
+            return
+
+        try:
+            executor.submit(self._run, name, fn, args, kwargs)
+        except RuntimeError:
+            # Executor already shut down (process exiting)
+            self._done()
+            self._fallback(name, fn, args, kwargs, saturated=False, durable=durable)
+
+    def _fallback(
+        self,
+        name: str,
+        fn: Callable[..., Any],
+        args: tuple,
+        kwargs: dict,
+        *,
+        saturated: bool,
+        durable: bool,
+    ) -> None:
+        """Handle work the pool cannot take without ever running it on an event loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+
+        if loop is None:
+            if saturated:
+                metrics.increment("background.inline_saturated")
+            self._supervise(name, fn, args, kwargs)
+            return
+        if saturated and not durable:
+            metrics.increment("background.dropped_saturated")
+            logger.warning("Background pool saturated, dropping task=%s", name)
+            return
+        if saturated:
+            metrics.increment("background.overflow")
+
+        with self._condition:
+            self._pending += 1
+            metrics.set_gauge("background.pending", self._pending)
+        try:
+            loop.run_in_executor(None, self._run, name, fn, args, kwargs)
+        except RuntimeError:
+            self._done()
+            metrics.increment("background.dropped")
+            logger.warning("Background executor unavailable, dropping task=%s", name)
+
+    def drain(self, timeout: float | None = None) -> bool:
+        """Wait until no work is pending. Returns False on timeout."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def shutdown(self, timeout: float | None = None) -> bool:
+        """Drain pending work, then stop the worker threads."""
+        drained = self.drain(timeout)
+        if not drained:
+            logger.warning("background_drain_timeout", extra={"pending": self._pending})
+        with self._condition:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=drained, cancel_futures=not drained)
+        return drained
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            max_workers = self._max_workers or config.BACKGROUND_MAX_WORKERS
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, max_workers),
+                thread_name_prefix="lesson-background",
+            )
+        return self._executor
+
+    def _run(self, name: str, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        try:
+            self._supervise(name, fn, args, kwargs)
+        finally:
+            self._done()
+
+    def _supervise(self, name: str, fn: Callable[..., Any], args: tuple, kwargs: dict) -> None:
+        started = time.perf_counter()
+        try:
+            fn(*args, **kwargs)
+        except Exception as exc:  # noqa: BLE001 - background work is best-effort
+            metrics.increment("background.failed")
+            logger.warning("Background task failed task=%s", name, exc_info=exc)
+        finally:
+            metrics.observe(f"background.{name}_seconds", time.perf_counter() - started)
+
+    def _done(self) -> None:
+        with self._condition:
+            self._pending -= 1
+            metrics.set_gauge("background.pending", self._pending)
+            self._condition.notify_all()
+
+
+background_pool = BackgroundTaskPool()
+
+
+class PeriodicWorker:
+    """Daemon thread that runs `fn` every `interval` seconds until stopped."""
+
+    def __init__(self, name: str, fn: Callable[[], Any], *, interval: float) -> None:
+        self.name = name
+        self._fn = fn
+        self._interval = interval
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float | None = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self._interval):
+            try:
+                self._fn()
+            except Exception as exc:  # noqa: BLE001 - keep the worker alive
+                metrics.increment("background.failed")
+                logger.warning("Periodic task failed task=%s", self.name, exc_info=exc)
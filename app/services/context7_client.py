@@ -7,6 +7,9 @@ import urllib.parse
 import urllib.request
 from typing import Any
 
+from app.core import config, tracing
+from app.core.deadline import current_deadline
+
 _BASE_URL = "https://context7.com/api/v2"
 _TIMEOUT_SECONDS = 4
 
@@ -50,6 +53,21 @@ def _request_json(url: str, api_key: str) -> Any:
         url,
         headers={"Authorization": f"Bearer {api_key}"},
     )
-    with urllib.request.urlopen(request, timeout=_TIMEOUT_SECONDS) as response:
-        payload = response.read().decode("utf-8")
+    path = urllib.parse.urlsplit(url).path
+    with tracing.span("context7.http", path=path) as span:
+        with urllib.request.urlopen(request, timeout=_request_timeout()) as response:
+            payload = response.read().decode("utf-8")
+            span.set_attributes(status=response.status, bytes=len(payload))
     return json.loads(payload)
+
+
+def _request_timeout() -> float:
+    """HTTP timeout, shortened to fit the current request deadline."""
+    deadline = current_deadline()
+    if deadline is None:
+        return _TIMEOUT_SECONDS
+    timeout = deadline.timeout_for(_TIMEOUT_SECONDS, reserve=config.DEADLINE_RESERVE_SECONDS)
+    if timeout < _TIMEOUT_SECONDS:
+        deadline.record_miss("context7", "shortened")
+    # urllib treats 0 as non-blocking; keep a small positive floor
+    return max(timeout, 0.1)
@@ -1,19 +1,35 @@
 """Lesson service orchestration and telemetry logging."""
 
 import logging
+import time
 from datetime import datetime, timezone
+from functools import partial
 from typing import Mapping, Sequence
 from uuid import uuid4
 
 from pydantic import ValidationError
 
-from app.core import config
+from app.core import config, metrics, tracing
+from app.core.deadline import Deadline, DeadlineExceeded, current_deadline, use_deadline
+from app.core.llm_usage import current_llm_usage, track_llm_usage
+from app.core.profiling import profile_request
 from app.models.api import LessonRequest, LessonResponse, LessonSection
 from app.models.db import LessonRun, LessonFailure
 from app.services.mongo import insert_lesson_run, insert_lesson_failure
+from app.services import telemetry_sampling
+from app.services.background import background_pool
 from app.services.static_lessons import build_static_lesson
+from app.services.telemetry_failures import failure_aggregator
 from app.services.markdown_renderer import render_blocks_to_markdown
 from app.services.mcp_hints import summarize_rule_outcomes
+from app.services.overload import overload_controller
+from app.services.pipeline import (
+    PipelineContext,
+    RetryPolicy,
+    Stage,
+    StageGraph,
+    StageTimeoutError,
+)
 from app.agents.mcp_tools import invoke_tool
 from app.agents.planner import PlannerAgent
 from app.agents.content import ContentAgent
@@ -36,193 +52,332 @@ content_agent = (
     ContentAgentLLM() if config.USE_LLM_CONTENT else ContentAgent()
 )
 validator_agent = ValidatorAgent()
+# Cheap stand-in used when shedding load in "stub" fallback mode
+stub_content_agent = ContentAgent()
 
 
-async def generate_lesson(request: LessonRequest) -> LessonResponse:
-    """Generate a lesson and record telemetry (best-effort)."""
+async def generate_lesson(
+    request: LessonRequest,
+    deadline: Deadline | None = None,
+    stage_timings: dict[str, float] | None = None,
+    profile: bool = False,
+) -> LessonResponse:
+    """Generate a lesson within the request deadline.
+
+    Telemetry and MCP hints are recorded in the background (best-effort).
+    When `stage_timings` is given, it is filled with the foreground stage
+    wall times and the total response time (milliseconds). With `profile`,
+    the run is captured with cProfile and the profile path is stored on
+    its telemetry record.
+    """
+
+    deadline = deadline or Deadline(config.REQUEST_DEADLINE_SECONDS)
+    run_id = str(uuid4())
+    with (
+        use_deadline(deadline),
+        track_llm_usage(),
+        profile_request(run_id, enabled=profile) as profile_path,
+        tracing.span("lesson.request", run_id=run_id, topic=request.topic, level=request.level),
+    ):
+        return await _generate_lesson(
+            request,
+            deadline,
+            stage_timings,
+            run_id=run_id,
+            profile_path=profile_path,
+        )
 
-    session_id = str(request.session_id) if request.session_id else str(uuid4())
-    attempt_count = 1
-    rule_outcomes: list[dict] | None = None
-    rule_summary: dict[str, object] | None = None
-    rule_hints: list[dict] | None = None
-    runtime_hints: list[dict] | None = None
-    hint_summary: dict[str, int] | None = None
 
-    def _summarize_schema_errors(errors: Sequence[Mapping[str, object]]) -> str:
-        if not errors:
-            return "Unknown schema validation error."
-        first = errors[0]
-        location = ".".join(str(part) for part in first.get("loc", [])) or "unknown"
-        message = first.get("msg", "invalid value")
-        return f"{location}: {message}"
+async def _generate_lesson(
+    request: LessonRequest,
+    deadline: Deadline,
+    stage_timings: dict[str, float] | None = None,
+    *,
+    run_id: str,
+    profile_path: str | None = None,
+) -> LessonResponse:
+    started = time.perf_counter()
+    session_id = str(request.session_id) if request.session_id else str(uuid4())
 
     # ---------------------------
-    # Static lesson mode (demo)
+    # Overload shedding (LLM mode only)
     # ---------------------------
-    if config.STATIC_LESSON_MODE:
-        response = build_static_lesson(request.topic, request.level)
+    degraded_reason: str | None = None
+    if config.USE_LLM_CONTENT and not config.STATIC_LESSON_MODE:
+        degraded_reason = overload_controller.evaluate()
+    use_llm = config.USE_LLM_CONTENT and degraded_reason is None
+    static_mode = config.STATIC_LESSON_MODE or (
+        degraded_reason is not None and config.OVERLOAD_FALLBACK == "static"
+    )
+    if degraded_reason is not None:
+        metrics.increment("overload.degraded_requests")
+        logger.info(
+            "serving_degraded_lesson",
+            extra={
+                "session_id": session_id,
+                "reason": degraded_reason,
+                "fallback": config.OVERLOAD_FALLBACK,
+            },
+        )
 
-    # ---------------------------
-    # Agentic pipeline (full mode)
-    # ---------------------------
-    else:
-        planned_sections = planner_agent.plan(
-            request.topic,
-            request.level,
+    ctx = PipelineContext(
+        state={
+            "run_id": run_id,
+            "profile_path": profile_path,
+            "session_id": session_id,
+            "request": request,
+            "use_llm": use_llm,
+            "static_mode": static_mode,
+            "content_agent": content_agent if degraded_reason is None else stub_content_agent,
+            "degraded_reason": degraded_reason,
+            "prior_error_summary": None,
+        }
+    )
+    graph = build_lesson_graph(static_mode=static_mode)
+
+    try:
+        await graph.run(ctx)
+    except StageTimeoutError as exc:
+        deadline.record_miss(exc.stage, "timed_out")
+        exceeded = DeadlineExceeded(exc.stage, deadline.budget)
+        _record_stage_failure(ctx, exceeded)
+        raise exceeded from exc
+    except Exception as exc:
+        _record_stage_failure(ctx, exc)
+        raise
+
+    response: LessonResponse = ctx.results["static_lesson" if static_mode else "render"]
+    if degraded_reason is not None:
+        response = response.model_copy(update={"degraded": True})
+    response_ms = (time.perf_counter() - started) * 1000
+    metrics.observe("lesson.response_seconds", response_ms / 1000)
+    if stage_timings is not None:
+        stage_timings.update(ctx.stage_ms())
+        stage_timings["total"] = round(response_ms, 3)
+
+    # Snapshot request-scoped values for the background stages
+    ctx.state["response"] = response
+    ctx.state["response_ms"] = response_ms
+    ctx.state["deadline_summary"] = deadline.to_summary()
+    usage = current_llm_usage()
+    ctx.state["llm_usage"] = usage.to_summary() if usage and usage.requests else None
+    tracing.set_attributes(
+        attempts=ctx.attempts.get("generate", 0),
+        degraded=degraded_reason is not None,
+        input_tokens=usage.input_tokens if usage else 0,
+        output_tokens=usage.output_tokens if usage else 0,
+    )
+    # The background stages end with the run telemetry write, which must not be shed
+    graph.submit_background(ctx, durable=True)
+    return response
+
+
+# ---------------------------
+# Stage graph
+# ---------------------------
+def build_lesson_graph(*, static_mode: bool) -> StageGraph:
+    """Build the stage graph for one request.
+
+    Full mode: plan -> generate -> validate -> render, then rule_outcomes ->
+    mcp_hints -> telemetry in the background. Static mode skips straight to
+    the canned lesson.
+    """
+
+    if static_mode:
+        return StageGraph(
+            [
+                Stage("static_lesson", _static_lesson_stage),
+                Stage("mcp_hints", _mcp_hints_stage, background=True),
+                Stage("telemetry", _telemetry_stage, after=("mcp_hints",), background=True),
+            ],
+            name="lesson_pipeline",
         )
 
-        max_attempts = 2 if config.USE_LLM_CONTENT else 1
-        attempt = 0
-        prior_error_summary: str | None = None
-
-        while True:
-            attempt += 1
-            try:
-                if (
-                    attempt > 1
-                    and config.USE_LLM_CONTENT
-                    and prior_error_summary
-                    and hasattr(content_agent, "generate_with_repair")
-                ):
-                    generated_sections = await content_agent.generate_with_repair(
-                        topic=request.topic,
-                        level=request.level,
-                        planned_sections=planned_sections,
-                        error_summary=prior_error_summary,
-                    )
-                else:
-                    generated_sections = await content_agent.generate(
-                        topic=request.topic,
-                        level=request.level,
-                        planned_sections=planned_sections,
-                    )
-
-                validated_sections = validator_agent.validate(generated_sections)
-                if hasattr(validator_agent, "collect_rule_outcomes"):
-                    rule_outcomes = validator_agent.collect_rule_outcomes(validated_sections)
-                rule_summary = summarize_rule_outcomes(rule_outcomes or [])
-                if rule_outcomes:
-                    rule_hints = []
-                    runtime_hints = []
-                    for entry in rule_outcomes:
-                        runtime_only = [
-                            outcome
-                            for outcome in entry.get("outcomes", [])
-                            if outcome.get("code") == "runtime_error"
-                        ]
-                        rule_only = [
-                            outcome
-                            for outcome in entry.get("outcomes", [])
-                            if outcome.get("code") != "runtime_error"
-                        ]
-                        if rule_only:
-                            rule_hints.append(
-                                {
-                                    "section_id": entry.get("section_id"),
-                                    "block_index": entry.get("block_index"),
-                                    "outcomes": rule_only,
-                                }
-                            )
-                        if runtime_only:
-                            runtime_hints.append(
-                                {
-                                    "section_id": entry.get("section_id"),
-                                    "block_index": entry.get("block_index"),
-                                    "outcomes": runtime_only,
-                                }
-                            )
-
-                response = LessonResponse(
-                    objective=f"Learn {request.topic} at a {request.level} level in 15 minutes.",
-                    total_minutes=15,
-                    sections=[
-                        LessonSection(
-                            id=s.id,
-                            title=s.title,
-                            minutes=s.minutes,
-                            content_markdown=render_blocks_to_markdown(s.blocks),
-                        )
-                        for s in validated_sections
-                    ],
+    max_attempts = 2
+    repair = RetryPolicy(
+        max_attempts=max_attempts,
+        retry_on=(ValueError,),
+        rewind_to="generate",
+        should_retry=_should_repair,
+        on_retry=partial(_log_repair, max_attempts=max_attempts),
+    )
+    return StageGraph(
+        [
+            Stage("plan", _plan_stage),
+            Stage(
+                "generate",
+                _generate_stage,
+                after=("plan",),
+                timeout=_generate_timeout,
+                retry=repair,
+            ),
+            Stage("validate", _validate_stage, after=("generate",), retry=repair),
+            Stage("render", _render_stage, after=("validate",)),
+            # Rule outcomes only feed mcp_hints and telemetry, so they run after
+            # the response, except with the runtime smoke test: it arms SIGALRM,
+            # which only works on the main thread, so it stays inline
+            Stage(
+                "rule_outcomes",
+                _rule_outcomes_stage,
+                after=("validate",),
+                background=not getattr(validator_agent, "_runtime_smoke_test_enabled", False),
+            ),
+            Stage("mcp_hints", _mcp_hints_stage, after=("rule_outcomes",), background=True),
+            Stage("telemetry", _telemetry_stage, after=("mcp_hints",), background=True),
+        ],
+        name="lesson_pipeline",
+    )
+
+
+def _static_lesson_stage(ctx: PipelineContext) -> LessonResponse:
+    request = ctx.state["request"]
+    return build_static_lesson(request.topic, request.level)
+
+
+def _plan_stage(ctx: PipelineContext):
+    request = ctx.state["request"]
+    return planner_agent.plan(request.topic, request.level)
+
+
+async def _generate_stage(ctx: PipelineContext):
+    request = ctx.state["request"]
+    agent = ctx.state["content_agent"]
+    error_summary = ctx.state["prior_error_summary"]
+    if (
+        ctx.attempts["generate"] > 1
+        and ctx.state["use_llm"]
+        and error_summary
+        and hasattr(agent, "generate_with_repair")
+    ):
+        return await agent.generate_with_repair(
+            topic=request.topic,
+            level=request.level,
+            planned_sections=ctx.results["plan"],
+            error_summary=error_summary,
+        )
+    return await agent.generate(
+        topic=request.topic,
+        level=request.level,
+        planned_sections=ctx.results["plan"],
+    )
+
+
+def _generate_timeout(ctx: PipelineContext) -> float | None:
+    deadline = current_deadline()
+    if deadline is None:
+        return None
+    return deadline.timeout_for(deadline.remaining(), reserve=config.DEADLINE_RESERVE_SECONDS)
+
+
+def _should_repair(ctx: PipelineContext, exc: BaseException) -> bool:
+    """Repair only in LLM mode and only with enough budget for another call."""
+    if not ctx.state["use_llm"]:
+        return False
+    deadline = current_deadline()
+    return deadline is None or _can_retry(deadline)
+
+
+def _log_repair(ctx: PipelineContext, exc: BaseException, attempt: int, *, max_attempts: int) -> None:
+    if isinstance(exc, ValidationError):
+        ctx.state["prior_error_summary"] = _summarize_schema_errors(exc.errors())
+        event = "retrying_llm_generation_schema"
+    else:
+        ctx.state["prior_error_summary"] = str(exc) or "Unknown content validation error."
+        event = "retrying_llm_generation_content"
+    request = ctx.state["request"]
+    logger.info(
+        event,
+        extra={
+            "session_id": ctx.state["session_id"],
+            "topic": request.topic,
+            "difficulty": request.level,
+            "attempt": attempt,
+            "max_attempts": max_attempts,
+        },
+    )
+
+
+def _validate_stage(ctx: PipelineContext):
+    return validator_agent.validate(ctx.results["generate"])
+
+
+def _render_stage(ctx: PipelineContext) -> LessonResponse:
+    request = ctx.state["request"]
+    return LessonResponse(
+        objective=f"Learn {request.topic} at a {request.level} level in 15 minutes.",
+        total_minutes=15,
+        sections=[
+            LessonSection(
+                id=s.id,
+                title=s.title,
+                minutes=s.minutes,
+                content_markdown=render_blocks_to_markdown(s.blocks),
+            )
+            for s in ctx.results["validate"]
+        ],
+    )
+
+
+def _rule_outcomes_stage(ctx: PipelineContext) -> dict[str, object]:
+    rule_outcomes = None
+    if hasattr(validator_agent, "collect_rule_outcomes"):
+        rule_outcomes = validator_agent.collect_rule_outcomes(ctx.results["validate"])
+    rule_hints: list[dict] | None = None
+    runtime_hints: list[dict] | None = None
+    if rule_outcomes:
+        rule_hints = []
+        runtime_hints = []
+        for entry in rule_outcomes:
+            runtime_only = [
+                outcome
+                for outcome in entry.get("outcomes", [])
+                if outcome.get("code") == "runtime_error"
+            ]
+            rule_only = [
+                outcome
+                for outcome in entry.get("outcomes", [])
+                if outcome.get("code") != "runtime_error"
+            ]
+            if rule_only:
+                rule_hints.append(
+                    {
+                        "section_id": entry.get("section_id"),
+                        "block_index": entry.get("block_index"),
+                        "outcomes": rule_only,
+                    }
                 )
-                attempt_count = attempt
-                break
-
-            except ValidationError as exc:
-                summary = _summarize_schema_errors(exc.errors())
-                if attempt >= max_attempts:
-                    _record_failure(
-                        session_id=session_id,
-                        request=request,
-                        error_type="schema_validation",
-                        error_message=summary,
-                        error_details=exc.errors(),
-                        attempt_count=attempt,
-                        exc=exc,
-                    )
-                    raise
-                prior_error_summary = summary
-                logger.info(
-                    "retrying_llm_generation_schema",
-                    extra={
-                        "session_id": session_id,
-                        "topic": request.topic,
-                        "difficulty": request.level,
-                        "attempt": attempt,
-                        "max_attempts": max_attempts,
-                    },
+            if runtime_only:
+                runtime_hints.append(
+                    {
+                        "section_id": entry.get("section_id"),
+                        "block_index": entry.get("block_index"),
+                        "outcomes": runtime_only,
+                    }
                 )
+    return {
+        "outcomes": rule_outcomes,
+        "summary": summarize_rule_outcomes(rule_outcomes or []),
+        "rule_hints": rule_hints,
+        "runtime_hints": runtime_hints,
+    }
 
-            except ValueError as exc:
-                summary = str(exc) or "Unknown content validation error."
-                if attempt >= max_attempts:
-                    _record_failure(
-                        session_id=session_id,
-                        request=request,
-                        error_type="content_validation",
-                        error_message=summary,
-                        attempt_count=attempt,
-                        exc=exc,
-                    )
-                    raise
-                prior_error_summary = summary
-                logger.info(
-                    "retrying_llm_generation_content",
-                    extra={
-                        "session_id": session_id,
-                        "topic": request.topic,
-                        "difficulty": request.level,
-                        "attempt": attempt,
-                        "max_attempts": max_attempts,
-                    },
-                )
 
-            except Exception as exc:
-                _record_failure(
-                    session_id=session_id,
-                    request=request,
-                    error_type=type(exc).__name__,
-                    error_message=str(exc) or "Unknown error.",
-                    attempt_count=attempt,
-                    exc=exc,
-                )
-                raise
+def _mcp_hints_stage(ctx: PipelineContext) -> dict[str, object]:
+    """Collect MCP advisory hints (best-effort, runs after the response)."""
 
-    # ---------------------------
-    # MCP advisory hints (best-effort, non-blocking)
-    # ---------------------------
+    session_id = ctx.state["session_id"]
+    rule_outcomes = (ctx.results.get("rule_outcomes") or {}).get("outcomes")
     mcp_hints = None
     mcp_summary = None
     system_observations: dict[str, object] | None = None
     try:
-        if config.STATIC_LESSON_MODE:
+        if ctx.state["static_mode"]:
             mcp_hints, mcp_summary = invoke_tool(
                 "python_code_hints",
-                {"mode": "static", "sections": response.sections},
+                {"mode": "static", "sections": ctx.state["response"].sections},
             )
         else:
-            payload = {"mode": "agentic", "sections": validated_sections}
+            payload = {"mode": "agentic", "sections": ctx.results["validate"]}
             if rule_outcomes:
                 payload["rule_outcomes"] = rule_outcomes
             mcp_hints, mcp_summary = invoke_tool(
@@ -276,15 +431,30 @@ async def generate_lesson(request: LessonRequest) -> LessonResponse:
     except Exception as exc:
         logger.warning("MCP hint collection failed session_id=%s", session_id, exc_info=exc)
 
-    # ---------------------------
-    # Telemetry (best-effort)
-    # ---------------------------
-    if hint_summary is None:
-        hint_summary = {
-            "rule_hints": sum(len(entry.get("outcomes", [])) for entry in rule_hints or []),
-            "runtime_errors": sum(len(entry.get("outcomes", [])) for entry in runtime_hints or []),
-            "mcp_explanations": _count_mcp_hints(mcp_hints),
-        }
+    return {
+        "hints": mcp_hints,
+        "summary": mcp_summary,
+        "system_observations": system_observations,
+    }
+
+
+def _telemetry_stage(ctx: PipelineContext) -> None:
+    """Write the lesson run record (best-effort, runs after the response)."""
+
+    session_id = ctx.state["session_id"]
+    request = ctx.state["request"]
+    response = ctx.state["response"]
+    rules = ctx.results.get("rule_outcomes") or {}
+    mcp = ctx.results["mcp_hints"]
+    rule_hints = rules.get("rule_hints")
+    runtime_hints = rules.get("runtime_hints")
+    mcp_hints = mcp["hints"]
+
+    hint_summary = {
+        "rule_hints": sum(len(entry.get("outcomes", [])) for entry in rule_hints or []),
+        "runtime_errors": sum(len(entry.get("outcomes", [])) for entry in runtime_hints or []),
+        "mcp_explanations": _count_mcp_hints(mcp_hints),
+    }
     logger.info(
         "hint_summary",
         extra={
@@ -295,8 +465,16 @@ async def generate_lesson(request: LessonRequest) -> LessonResponse:
         },
     )
 
+    attempt_count = ctx.attempts.get("generate", 1)
+    sample = telemetry_sampling.decide(
+        attempt_count=attempt_count,
+        runtime_errors=hint_summary["runtime_errors"],
+        degraded=ctx.state["degraded_reason"] is not None,
+    )
+    full = sample["tier"] == "full"
+
     telemetry = LessonRun(
-        run_id=str(uuid4()),
+        run_id=ctx.state["run_id"],
         session_id=session_id,
         topic=request.topic,
         level=request.level,
@@ -306,16 +484,26 @@ async def generate_lesson(request: LessonRequest) -> LessonResponse:
         objective=response.objective,
         section_ids=[s.id for s in response.sections],
         hint_summary=hint_summary,
-        rule_hints=rule_hints if config.TELEMETRY_INCLUDE_HINT_DETAILS else None,
-        runtime_hints=runtime_hints if config.TELEMETRY_INCLUDE_HINT_DETAILS else None,
-        mcp_hints=mcp_hints,
-        mcp_summary=_rebuild_mcp_summary(mcp_hints, mcp_summary),
-        rule_summary=rule_summary,
-        system_observations=system_observations,
+        rule_hints=rule_hints if full else None,
+        runtime_hints=runtime_hints if full else None,
+        mcp_hints=mcp_hints if full else None,
+        mcp_summary=_rebuild_mcp_summary(mcp_hints, mcp["summary"]),
+        rule_summary=rules.get("summary"),
+        system_observations=mcp["system_observations"],
+        degraded_reason=ctx.state["degraded_reason"],
+        deadline=ctx.state["deadline_summary"],
+        llm_usage=ctx.state["llm_usage"],
+        profile_path=ctx.state["profile_path"],
+        timings={
+            "response_ms": round(ctx.state["response_ms"], 3),
+            "stages": ctx.stage_ms(),
+        },
+        telemetry_sample=sample,
     )
 
     try:
-        insert_lesson_run(telemetry.to_mongo())
+        with tracing.span("telemetry.write", run_id=telemetry.run_id):
+            insert_lesson_run(telemetry.to_mongo())
         logger.info(
             "telemetry_written",
             extra={
@@ -333,7 +521,55 @@ async def generate_lesson(request: LessonRequest) -> LessonResponse:
             exc_info=exc,
         )
 
-    return response
+
+def _summarize_schema_errors(errors: Sequence[Mapping[str, object]]) -> str:
+    if not errors:
+        return "Unknown schema validation error."
+    first = errors[0]
+    location = ".".join(str(part) for part in first.get("loc", [])) or "unknown"
+    message = first.get("msg", "invalid value")
+    return f"{location}: {message}"
+
+
+def _record_stage_failure(ctx: PipelineContext, exc: Exception) -> None:
+    """Map a failed graph run to the existing failure telemetry shapes."""
+
+    if isinstance(exc, DeadlineExceeded):
+        error_type, message, details = "deadline_exceeded", str(exc), None
+    elif isinstance(exc, ValidationError):
+        error_type = "schema_validation"
+        message = _summarize_schema_errors(exc.errors())
+        details = exc.errors()
+    elif isinstance(exc, ValueError):
+        error_type = "content_validation"
+        message = str(exc) or "Unknown content validation error."
+        details = None
+    else:
+        error_type, message, details = type(exc).__name__, str(exc) or "Unknown error.", None
+    _record_failure(
+        session_id=ctx.state["session_id"],
+        request=ctx.state["request"],
+        error_type=error_type,
+        error_message=message,
+        error_details=details,
+        attempt_count=ctx.attempts.get("generate"),
+        exc=exc,
+        run_id=ctx.state["run_id"],
+        profile_path=ctx.state["profile_path"],
+    )
+
+
+def _write_failure(doc: dict, parent_span: tracing.Span | None = None) -> None:
+    try:
+        with tracing.use_span(parent_span), tracing.span("telemetry.write_failure", run_id=doc["run_id"]):
+            insert_lesson_failure(doc)
+    except Exception as insert_exc:
+        logger.warning(
+            "Failure insert failed run_id=%s session_id=%s",
+            doc["run_id"],
+            doc.get("session_id"),
+            exc_info=insert_exc,
+        )
 
 
 def _record_failure(
@@ -345,11 +581,14 @@ def _record_failure(
     error_details=None,
     attempt_count: int | None = None,
     exc: Exception | None = None,
+    run_id: str | None = None,
+    profile_path: str | None = None,
 ) -> None:
     """Best-effort failure telemetry."""
 
+    deadline = current_deadline()
     failure = LessonFailure(
-        run_id=str(uuid4()),
+        run_id=run_id or str(uuid4()),
         session_id=session_id,
         topic=request.topic,
         level=request.level,
@@ -358,16 +597,16 @@ def _record_failure(
         error_type=error_type,
         error_message=error_message,
         error_details=error_details,
+        deadline=deadline.to_summary() if deadline is not None else None,
+        profile_path=profile_path,
     )
 
-    try:
-        insert_lesson_failure(failure.to_mongo())
-    except Exception as insert_exc:
-        logger.warning(
-            "Failure insert failed run_id=%s session_id=%s",
-            failure.run_id,
-            session_id,
-            exc_info=insert_exc,
+    doc = failure.to_mongo()
+    # Identical failures inside the window are counted, not written
+    if failure_aggregator.admit(doc):
+        # The insert (Mongo or the WAL's fsync) never runs on the request path
+        background_pool.submit(
+            "telemetry_failure", _write_failure, doc, tracing.current_span(), durable=True
         )
 
     logger.error(
@@ -381,6 +620,11 @@ def _record_failure(
     )
 
 
+def _can_retry(deadline: Deadline) -> bool:
+    """Only start a repair attempt if enough budget is left for an LLM call."""
+    return deadline.allows("generate_repair", config.DEADLINE_MIN_LLM_ATTEMPT_SECONDS)
+
+
 def _filter_mcp_hints(
     hints: list[dict],
 ) -> tuple[list[dict], list[dict]]:
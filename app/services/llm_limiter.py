@@ -0,0 +1,354 @@
+"""Adaptive admission control for outbound LLM calls.
+
+Combines an AIMD concurrency limit with token-bucket budgets for
+requests-per-minute (RPM) and tokens-per-minute (TPM). Calls that cannot
+be admitted wait in a bounded queue; when the queue is full or the wait
+would exceed the configured timeout (or the request deadline), `LLMCapacityError` is raised so the
+API can answer with a fast 503 and a `Retry-After` hint.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import time
+from collections import deque
+from typing import Awaitable, Callable, TypeVar
+
+from app.core import config, metrics
+from app.core.deadline import current_deadline
+
+T = TypeVar("T")
+
+# Provider status codes treated as "back off" signals
+_OVERLOAD_STATUS_CODES = {429, 503}
+
+
+class LLMCapacityError(RuntimeError):
+    """Raised when an LLM call cannot be admitted in time."""
+
+    def __init__(self, message: str, *, retry_after: float, reason: str) -> None:
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.reason = reason
+
+    @property
+    def retry_after_header(self) -> str:
+        """Retry-After value in whole seconds (at least 1)."""
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """Continuously refilling token bucket with a per-minute rate.
+
+    A rate of zero (or less) disables the bucket.
+    """
+
+    def __init__(self, rate_per_minute: float, *, clock: Callable[[], float] = time.monotonic) -> None:
+        self.rate_per_minute = float(rate_per_minute)
+        self.capacity = max(self.rate_per_minute, 0.0)
+        self._tokens = self.capacity
+        self._clock = clock
+        self._updated_at = clock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate_per_minute > 0
+
+    @property
+    def available(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def time_until_available(self, amount: float) -> float:
+        """Seconds until `amount` tokens can be consumed (0 if now)."""
+        if not self.enabled:
+            return 0.0
+        self._refill()
+        # Oversized requests only need a full bucket, never more
+        amount = min(amount, self.capacity)
+        deficit = amount - self._tokens
+        if deficit <= 0:
+            return 0.0
+        return deficit * 60.0 / self.rate_per_minute
+
+    def consume(self, amount: float) -> None:
+        if not self.enabled:
+            return
+        self._refill()
+        self._tokens -= min(amount, self.capacity)
+
+    def adjust(self, delta: float) -> None:
+        """Credit (positive) or debit (negative) tokens after the fact."""
+        if not self.enabled:
+            return
+        self._refill()
+        self._tokens = min(self.capacity, self._tokens + delta)
+
+    def _refill(self) -> None:
+        now = self._clock()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_minute / 60.0)
+
+
+class AdaptiveConcurrencyLimit:
+    """Additive-increase / multiplicative-decrease concurrency limit."""
+
+    def __init__(
+        self,
+        *,
+        initial: float,
+        minimum: float,
+        maximum: float,
+        backoff: float,
+        latency_target: float,
+    ) -> None:
+        self.minimum = max(1.0, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(max(initial, self.minimum), self.maximum)
+        self.backoff = min(max(backoff, 0.1), 0.95)
+        self.latency_target = latency_target
+        self.in_flight = 0
+
+    @property
+    def has_capacity(self) -> bool:
+        return self.in_flight < int(self.limit)
+
+    def on_success(self, latency: float) -> None:
+        if self.latency_target > 0 and latency > self.latency_target:
+            self.on_overload()
+            return
+        # ~+1 per "window" of completions at the current limit (TCP-style)
+        self.limit = min(self.maximum, self.limit + 1.0 / self.limit)
+
+    def on_failure(self, latency: float) -> None:
+        """Failed calls never grow the limit, but slow ones still count as congestion."""
+        if self.latency_target > 0 and latency > self.latency_target:
+            self.on_overload()
+
+    def on_overload(self) -> None:
+        self.limit = max(self.minimum, self.limit * self.backoff)
+
+
+class LLMLimiter:
+    """Admission controller wrapping individual LLM calls."""
+
+    def __init__(
+        self,
+        *,
+        initial_concurrency: float = 4,
+        min_concurrency: float = 1,
+        max_concurrency: float = 32,
+        backoff: float = 0.5,
+        latency_target: float = 0.0,
+        rpm_limit: float = 0,
+        tpm_limit: float = 0,
+        max_queue: int = 32,
+        queue_timeout: float = 10.0,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.concurrency = AdaptiveConcurrencyLimit(
+            initial=initial_concurrency,
+            minimum=min_concurrency,
+            maximum=max_concurrency,
+            backoff=backoff,
+            latency_target=latency_target,
+        )
+        self.requests = TokenBucket(rpm_limit, clock=clock)
+        self.tokens = TokenBucket(tpm_limit, clock=clock)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = max(0.0, queue_timeout)
+        self.rejections = 0
+        self._clock = clock
+        # Queued calls in arrival order: (future resolved once a slot is handed over, tokens)
+        self._waiters: deque[tuple[asyncio.Future[None], int]] = deque()
+        self._queued = 0
+        self._avg_latency = 0.0
+        self._latencies: deque[tuple[float, float]] = deque(maxlen=256)
+        self._publish()
+
+    @property
+    def in_flight(self) -> int:
+        return self.concurrency.in_flight
+
+    @property
+    def queue_length(self) -> int:
+        return self._queued
+
+    def recent_latencies(self, window_seconds: float) -> list[float]:
+        """Latencies of calls that completed within the last `window_seconds`."""
+        cutoff = self._clock() - window_seconds
+        return [latency for finished_at, latency in self._latencies if finished_at >= cutoff]
+
+    async def run(
+        self,
+        call: Callable[[], Awaitable[T]],
+        *,
+        estimated_tokens: int = 0,
+        actual_tokens: Callable[[T], int | None] | None = None,
+    ) -> T:
+        """Run `call` once admitted, feeding the outcome back into AIMD."""
+        await self._acquire(estimated_tokens)
+        started = self._clock()
+        try:
+            result = await call()
+        except Exception as exc:
+            latency = self._record_latency(started)
+            if getattr(exc, "status_code", None) in _OVERLOAD_STATUS_CODES:
+                self.concurrency.on_overload()
+                metrics.increment("llm_limiter.provider_overload")
+            else:
+                self.concurrency.on_failure(latency)
+            self._release()
+            raise
+        except BaseException:
+            self._release()
+            raise
+
+        self.concurrency.on_success(self._record_latency(started))
+        if actual_tokens is not None:
+            used = actual_tokens(result)
+            if used is not None:
+                self.tokens.adjust(estimated_tokens - used)
+        self._release()
+        return result
+
+    def _record_latency(self, started: float) -> float:
+        finished = self._clock()
+        latency = finished - started
+        self._latencies.append((finished, latency))
+        self._avg_latency = latency if not self._avg_latency else 0.8 * self._avg_latency + 0.2 * latency
+        return latency
+
+    async def _acquire(self, estimated_tokens: int) -> None:
+        # New arrivals only take a free slot directly when nobody is queued (FIFO)
+        if not self._waiters and self._try_admit(estimated_tokens):
+            return
+        if self._queued >= self.max_queue:
+            self._reject("queue_full", self._estimate_wait(estimated_tokens))
+
+        wait_budget = self.queue_timeout
+        request_deadline = current_deadline()
+        if request_deadline is not None:
+            wait_budget = min(wait_budget, request_deadline.remaining())
+        deadline = self._clock() + wait_budget
+        entry = (asyncio.get_running_loop().create_future(), estimated_tokens)
+        waiter = entry[0]
+        self._waiters.append(entry)
+        self._queued += 1
+        self._publish()
+        admitted = False
+        try:
+            while True:
+                self._dispatch()
+                if waiter.done():
+                    admitted = True
+                    return
+                remaining = deadline - self._clock()
+                budget_wait = self._budget_wait(estimated_tokens)
+                if remaining <= 0 or budget_wait > remaining:
+                    self._reject("queue_timeout", max(budget_wait, self._estimate_wait(estimated_tokens)))
+                # Woken when a release hands this call a slot, or to re-check a refilling budget
+                await asyncio.wait({waiter}, timeout=budget_wait if budget_wait > 0 else remaining)
+        finally:
+            if not admitted:
+                if waiter.done() and not waiter.cancelled():
+                    # A slot was handed over just as this call gave up: return it to the queue
+                    self.requests.adjust(1)
+                    self.tokens.adjust(estimated_tokens)
+                    self._release()
+                else:
+                    waiter.cancel()
+                    try:
+                        self._waiters.remove(entry)
+                    except ValueError:
+                        pass
+                    self._dispatch()
+            self._queued -= 1
+            self._publish()
+
+    def _try_admit(self, estimated_tokens: int) -> bool:
+        if not self.concurrency.has_capacity:
+            return False
+        if self._budget_wait(estimated_tokens) > 0:
+            return False
+        self.requests.consume(1)
+        self.tokens.consume(estimated_tokens)
+        self.concurrency.in_flight += 1
+        self._publish()
+        return True
+
+    def _budget_wait(self, estimated_tokens: int) -> float:
+        return max(
+            self.requests.time_until_available(1),
+            self.tokens.time_until_available(estimated_tokens),
+        )
+
+    def _estimate_wait(self, estimated_tokens: int) -> float:
+        budget_wait = self._budget_wait(estimated_tokens)
+        if self.concurrency.has_capacity:
+            return budget_wait
+        # Rough drain time for the queue ahead of this call
+        per_slot = self._avg_latency or 1.0
+        slots = max(int(self.concurrency.limit), 1)
+        return max(budget_wait, per_slot * (self._queued + 1) / slots)
+
+    def _dispatch(self) -> None:
+        """Hand free slots to queued calls in arrival order."""
+        while self._waiters:
+            waiter, estimated_tokens = self._waiters[0]
+            if waiter.done() or waiter.get_loop().is_closed():
+                self._waiters.popleft()
+                continue
+            if not self._try_admit(estimated_tokens):
+                return
+            self._waiters.popleft()
+            waiter.set_result(None)
+
+    def _release(self) -> None:
+        self.concurrency.in_flight = max(0, self.concurrency.in_flight - 1)
+        self._publish()
+        self._dispatch()
+
+    def _reject(self, reason: str, retry_after: float) -> None:
+        self.rejections += 1
+        metrics.increment("llm_limiter.rejections")
+        metrics.increment(f"llm_limiter.rejections.{reason}")
+        raise LLMCapacityError(
+            f"LLM capacity exhausted ({reason}).",
+            retry_after=retry_after,
+            reason=reason,
+        )
+
+    def _publish(self) -> None:
+        metrics.set_gauge("llm_limiter.limit", self.concurrency.limit)
+        metrics.set_gauge("llm_limiter.in_flight", self.concurrency.in_flight)
+        metrics.set_gauge("llm_limiter.queue_length", self._queued)
+
+
+_limiter: LLMLimiter | None = None
+
+
+def get_llm_limiter() -> LLMLimiter:
+    """Return the process-wide LLM limiter, built from config on first use."""
+    global _limiter
+    if _limiter is None:
+        _limiter = LLMLimiter(
+            initial_concurrency=config.LLM_CONCURRENCY_INITIAL,
+            min_concurrency=config.LLM_CONCURRENCY_MIN,
+            max_concurrency=config.LLM_CONCURRENCY_MAX,
+            latency_target=config.LLM_LATENCY_TARGET_SECONDS,
+            rpm_limit=config.LLM_RPM_LIMIT,
+            tpm_limit=config.LLM_TPM_LIMIT,
+            max_queue=config.LLM_QUEUE_MAX,
+            queue_timeout=config.LLM_QUEUE_TIMEOUT_SECONDS,
+        )
+    return _limiter
+
+
+def reset_llm_limiter() -> None:
+    """Drop the process-wide limiter so it is rebuilt from config (test helper)."""
+    global _limiter
+    _limiter = None
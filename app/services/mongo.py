@@ -2,23 +2,42 @@
 
 from __future__ import annotations
 
-from typing import Any
+import logging
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Iterator
 
+import pymongo
 from pymongo import MongoClient
 from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
 
-from app.core import config
+from app.core import config, metrics
+from app.core.deadline import current_deadline
+from app.services.telemetry_columns import columnar_store
+from app.services.telemetry_ring import TelemetryRing
+from app.services import telemetry_retention
+from app.services.background import PeriodicWorker, background_pool
+from app.services.telemetry_wal import TelemetryWAL
+
+logger = logging.getLogger(__name__)
 
 # Global variable to hold the MongoDB client instance
 _client: MongoClient | None = None
-_memory_runs: list[dict] = []
-_memory_failures: list[dict] = []
+_memory_runs = TelemetryRing()
+_memory_failures = TelemetryRing()
+_wal: TelemetryWAL | None = None
+_wal_replayer: PeriodicWorker | None = None
+_retention_worker: PeriodicWorker | None = None
+_wal_lock = threading.Lock()
 
 
 def reset_memory_store() -> None:
     """Reset in-memory telemetry storage (test helper)."""
     _memory_runs.clear()
     _memory_failures.clear()
+    columnar_store.reset()
 
 
 def get_memory_runs() -> list[dict]:
@@ -30,6 +49,27 @@ def get_memory_failures() -> list[dict]:
     """Return in-memory failure telemetry (test helper)."""
     return list(_memory_failures)
 
+
+def iter_memory_runs() -> Iterator[dict]:
+    """Iterate a snapshot of in-memory lesson runs without copying them."""
+    return iter(_memory_runs.snapshot())
+
+
+def iter_memory_failures() -> Iterator[dict]:
+    """Iterate a snapshot of in-memory failures without copying them."""
+    return iter(_memory_failures.snapshot())
+
+
+def _append_memory(ring: TelemetryRing, doc: dict, name: str) -> None:
+    evicted = ring.append(
+        doc,
+        max_records=max(config.TELEMETRY_MEMORY_CAP, 0),
+        max_bytes=max(config.TELEMETRY_MEMORY_MAX_BYTES, 0),
+    )
+    if evicted:
+        metrics.increment(f"telemetry.memory_evicted.{name}", evicted)
+    metrics.set_gauge(f"telemetry.memory_bytes.{name}", ring.nbytes)
+
 # Singleton pattern for MongoDB client
 def get_client() -> MongoClient:
     """Return a singleton MongoDB client."""
@@ -52,26 +92,128 @@ def get_failure_collection() -> Collection[Any]:
     db = client[config.MONGO_DB_NAME]
     return db[config.MONGO_FAILURE_COLLECTION]
 
+def _collection(name: str) -> Collection[Any]:
+    return get_collection() if name == "runs" else get_failure_collection()
+
+
 # Insert a document into the lesson_runs collection
 def insert_lesson_run(doc: dict) -> None:
     """Insert a telemetry document into MongoDB."""
+    doc["ingested_at"] = datetime.now(timezone.utc)
     if config.TELEMETRY_BACKEND == "memory":
-        _memory_runs.append(doc)
-        cap = max(config.TELEMETRY_MEMORY_CAP, 0)
-        if cap and len(_memory_runs) > cap:
-            del _memory_runs[:-cap]
+        _append_memory(_memory_runs, doc, "runs")
+        columnar_store.append(doc)
         return
-    col = get_collection()
-    col.insert_one(doc)
+    _insert("runs", doc)
 
 
 def insert_lesson_failure(doc: dict) -> None:
     """Insert a failure document into MongoDB."""
+    doc["ingested_at"] = datetime.now(timezone.utc)
     if config.TELEMETRY_BACKEND == "memory":
-        _memory_failures.append(doc)
-        cap = max(config.TELEMETRY_MEMORY_CAP, 0)
-        if cap and len(_memory_failures) > cap:
-            del _memory_failures[:-cap]
+        _append_memory(_memory_failures, doc, "failures")
+        return
+    _insert("failures", doc)
+
+
+def _insert(name: str, doc: dict) -> None:
+    """Insert into Mongo, falling back to the local WAL when it is configured."""
+    wal = get_wal()
+    if wal is not None and wal.pending():
+        # Mongo was failing recently: queue behind the backlog instead of waiting on it
+        wal.append(name, doc)
+        return
+    try:
+        with pymongo.timeout(_write_timeout()):
+            _collection(name).insert_one(doc)
+    except PyMongoError as exc:
+        if wal is None:
+            raise
+        metrics.increment("telemetry.wal_fallback")
+        logger.warning("telemetry_wal_fallback", extra={"collection": name, "error": str(exc)})
+        wal.append(name, doc)
+
+
+def get_wal() -> TelemetryWAL | None:
+    """Return the telemetry WAL for `TELEMETRY_WAL_DIR` (None when disabled)."""
+    global _wal
+    if not config.TELEMETRY_WAL_DIR:
+        return None
+    with _wal_lock:
+        if _wal is None or _wal.directory != Path(config.TELEMETRY_WAL_DIR):
+            if _wal is not None:
+                _wal.close()
+            _wal = TelemetryWAL(config.TELEMETRY_WAL_DIR)
+        return _wal
+
+
+def replay_wal() -> int:
+    """Bulk-insert logged telemetry into Mongo; returns records acknowledged."""
+    wal = get_wal()
+    if wal is None:
+        return 0
+    return wal.replay(_insert_many, batch_size=config.TELEMETRY_WAL_REPLAY_BATCH)
+
+
+def _insert_many(name: str, docs: list[dict]) -> None:
+    # Replayed records are ingested now, so rollups past their created_at still see them
+    ingested_at = datetime.now(timezone.utc)
+    for doc in docs:
+        doc["ingested_at"] = ingested_at
+    _collection(name).insert_many(docs, ordered=False)
+
+
+def start_wal_replayer() -> None:
+    """Start draining the WAL in the background (no-op when disabled)."""
+    global _wal_replayer
+    wal = get_wal()
+    if wal is None or config.TELEMETRY_BACKEND != "mongo" or _wal_replayer is not None:
+        return
+    _wal_replayer = PeriodicWorker(
+        "telemetry-wal-replayer",
+        lambda: wal.pending() and replay_wal(),
+        interval=config.TELEMETRY_WAL_REPLAY_INTERVAL_SECONDS,
+    )
+    _wal_replayer.start()
+
+
+def stop_wal_replayer() -> None:
+    """Stop the replayer and seal the active segment; backlog is kept on disk."""
+    global _wal_replayer
+    replayer, _wal_replayer = _wal_replayer, None
+    if replayer is not None:
+        replayer.stop(timeout=config.TELEMETRY_WAL_REPLAY_INTERVAL_SECONDS)
+    if _wal is not None:
+        _wal.close()
+
+
+def _write_timeout() -> float:
+    """Bound writes by the request deadline, with a floor so telemetry still lands."""
+    deadline = current_deadline()
+    if deadline is None:
+        return max(config.TELEMETRY_WRITE_TIMEOUT_SECONDS, config.TELEMETRY_MIN_WRITE_SECONDS)
+    return max(deadline.remaining(), config.TELEMETRY_MIN_WRITE_SECONDS)
+
+
+def run_retention() -> None:
+    """Ensure indexes/TTL and prune expired hint details (best-effort)."""
+    telemetry_retention.run_retention(get_collection(), get_failure_collection())
+
+
+def start_retention_worker() -> None:
+    """Ensure indexes now (in the background) and re-run retention periodically."""
+    global _retention_worker
+    if config.TELEMETRY_BACKEND != "mongo" or not config.TELEMETRY_INDEXES_ENABLED or _retention_worker is not None:
         return
-    col = get_failure_collection()
-    col.insert_one(doc)
+    background_pool.submit("telemetry_retention", run_retention)
+    _retention_worker = PeriodicWorker(
+        "telemetry-retention", run_retention, interval=config.TELEMETRY_RETENTION_INTERVAL_SECONDS
+    )
+    _retention_worker.start()
+
+
+def stop_retention_worker() -> None:
+    global _retention_worker
+    worker, _retention_worker = _retention_worker, None
+    if worker is not None:
+        worker.stop(timeout=1.0)
@@ -0,0 +1,120 @@
+"""Overload detection for graceful degradation of lesson generation.
+
+The controller watches three signals:
+- event-loop scheduling lag (from the loop monitor)
+- LLM calls in flight or queued (from the LLM limiter)
+- rolling p95 latency of completed LLM calls
+
+When any signal crosses its threshold, requests are served in degraded
+mode (static lesson or stub content). Full LLM mode resumes once every
+signal has stayed below `OVERLOAD_RECOVERY_RATIO` of its threshold for
+`OVERLOAD_RECOVERY_SECONDS` (hysteresis avoids flapping).
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from typing import Callable
+
+from app.core import config, metrics
+from app.core.loop_monitor import LoopLagMonitor, loop_monitor
+from app.services.llm_limiter import LLMLimiter, get_llm_limiter
+
+logger = logging.getLogger(__name__)
+
+# Minimum completed calls before rolling latency is trusted
+_MIN_LATENCY_SAMPLES = 5
+
+
+class OverloadController:
+    """Decides per request whether to degrade, with hysteresis."""
+
+    def __init__(
+        self,
+        *,
+        monitor: LoopLagMonitor | None = None,
+        limiter_factory: Callable[[], LLMLimiter] = get_llm_limiter,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self._monitor = monitor or loop_monitor
+        self._limiter_factory = limiter_factory
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._reason: str | None = None
+        self._calm_since: float | None = None
+
+    @property
+    def degraded(self) -> bool:
+        return self._reason is not None
+
+    def signals(self) -> dict[str, float]:
+        """Current raw values of the watched signals."""
+        limiter = self._limiter_factory()
+        latencies = sorted(limiter.recent_latencies(config.OVERLOAD_LATENCY_WINDOW_SECONDS))
+        p95 = 0.0
+        if len(latencies) >= _MIN_LATENCY_SAMPLES:
+            p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        return {
+            "loop_lag": self._monitor.current_lag,
+            "llm_in_flight": float(limiter.in_flight + limiter.queue_length),
+            "llm_latency_p95": p95,
+        }
+
+    def evaluate(self) -> str | None:
+        """Return the degradation reason for a new request, or None for full mode."""
+        if not config.OVERLOAD_SHEDDING_ENABLED:
+            return None
+
+        signals = self.signals()
+        thresholds = {
+            "loop_lag": config.OVERLOAD_LOOP_LAG_SECONDS,
+            "llm_in_flight": float(config.OVERLOAD_LLM_IN_FLIGHT),
+            "llm_latency_p95": config.OVERLOAD_LLM_LATENCY_SECONDS,
+        }
+        breached = [
+            name
+            for name, value in signals.items()
+            if thresholds[name] > 0 and value >= thresholds[name]
+        ]
+        calm = all(
+            thresholds[name] <= 0 or value < thresholds[name] * config.OVERLOAD_RECOVERY_RATIO
+            for name, value in signals.items()
+        )
+
+        now = self._clock()
+        with self._lock:
+            if breached:
+                self._calm_since = None
+                if self._reason is None:
+                    self._reason = breached[0]
+                    self._transition(entered=True, signals=signals)
+            elif self._reason is not None:
+                if not calm:
+                    self._calm_since = None
+                elif self._calm_since is None:
+                    self._calm_since = now
+                elif now - self._calm_since >= config.OVERLOAD_RECOVERY_SECONDS:
+                    self._reason = None
+                    self._calm_since = None
+                    self._transition(entered=False, signals=signals)
+            return self._reason
+
+    def reset(self) -> None:
+        """Return to full mode immediately (test helper)."""
+        with self._lock:
+            self._reason = None
+            self._calm_since = None
+            metrics.set_gauge("overload.degraded", 0)
+
+    def _transition(self, *, entered: bool, signals: dict[str, float]) -> None:
+        metrics.set_gauge("overload.degraded", 1 if entered else 0)
+        metrics.increment("overload.entered" if entered else "overload.recovered")
+        logger.warning(
+            "overload_degraded" if entered else "overload_recovered",
+            extra={"reason": self._reason, **signals},
+        )
+
+
+overload_controller = OverloadController()
@@ -0,0 +1,305 @@
+"""Declarative stage graph executor for the lesson pipeline.
+
+A `StageGraph` is a DAG of named stages. Each stage receives the shared
+`PipelineContext` and its return value is stored under the stage name in
+`ctx.results`, where downstream stages read it.
+
+- A stage starts as soon as all of its dependencies finish, so independent
+  stages overlap. Sync stages run on the event loop unless `offload=True`,
+  in which case they run in a worker thread.
+- `timeout` (seconds, or a callable evaluated at stage start) bounds async
+  and offloaded stages; expiry raises `StageTimeoutError`.
+- `RetryPolicy` retries a failed stage, optionally rewinding to an upstream
+  stage first (e.g. re-generate content when validation fails). Attempts
+  are counted per rewind target, so stages sharing a policy share a budget.
+- `background=True` stages never delay the caller: `run()` executes the
+  foreground stages only, and `submit_background()` hands the rest to the
+  background pool, where they run in order (best-effort).
+- Per-stage timings, attempts, and status are recorded on the context and
+  observed as `pipeline.<stage>_seconds`; `describe()` returns the graph.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable
+
+from app.core import metrics, tracing
+from app.services.background import background_pool
+
+logger = logging.getLogger(__name__)
+
+
+class StageTimeoutError(TimeoutError):
+    """Raised when a stage exceeds its own timeout."""
+
+    def __init__(self, stage: str, timeout: float) -> None:
+        super().__init__(f"Stage '{stage}' timed out after {timeout:.2f}s.")
+        self.stage = stage
+        self.timeout = timeout
+
+
+@dataclass
+class PipelineContext:
+    """Shared state for one graph run."""
+
+    state: dict[str, Any] = field(default_factory=dict)
+    results: dict[str, Any] = field(default_factory=dict)
+    attempts: dict[str, int] = field(default_factory=dict)
+    timings: dict[str, dict[str, Any]] = field(default_factory=dict)
+
+    def stage_ms(self) -> dict[str, float]:
+        """Wall time per executed stage, in milliseconds."""
+        return {name: timing["ms"] for name, timing in self.timings.items()}
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Retry a failed stage, optionally rewinding to an upstream stage."""
+
+    max_attempts: int = 1
+    retry_on: tuple[type[BaseException], ...] = (Exception,)
+    rewind_to: str | None = None
+    should_retry: Callable[[PipelineContext, BaseException], bool] | None = None
+    on_retry: Callable[[PipelineContext, BaseException, int], None] | None = None
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One node in the graph."""
+
+    name: str
+    run: Callable[[PipelineContext], Any]
+    after: tuple[str, ...] = ()
+    timeout: float | Callable[[PipelineContext], float | None] | None = None
+    retry: RetryPolicy | None = None
+    offload: bool = False
+    background: bool = False
+
+
+class StageGraph:
+    """Validated DAG of stages with a concurrent executor."""
+
+    def __init__(self, stages: Iterable[Stage], *, name: str = "pipeline") -> None:
+        self.name = name
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = self._topological_order()
+        for stage in self.stages.values():
+            if stage.background:
+                continue
+            for dep in stage.after:
+                if self.stages[dep].background:
+                    raise ValueError(
+                        f"Foreground stage '{stage.name}' cannot depend on background stage '{dep}'."
+                    )
+            if stage.retry and stage.retry.rewind_to:
+                if stage.retry.rewind_to not in self._ancestors(stage.name) | {stage.name}:
+                    raise ValueError(
+                        f"Stage '{stage.name}' can only rewind to one of its ancestors."
+                    )
+
+    def describe(self) -> list[dict[str, Any]]:
+        """Return the graph shape in execution order."""
+        return [
+            {
+                "name": stage.name,
+                "after": list(stage.after),
+                "background": stage.background,
+                "offload": stage.offload,
+                "max_attempts": stage.retry.max_attempts if stage.retry else 1,
+            }
+            for stage in (self.stages[name] for name in self.order)
+        ]
+
+    async def run(self, ctx: PipelineContext) -> PipelineContext:
+        """Run foreground stages concurrently.
+
+        The first failure cancels the remaining stages and is re-raised.
+        """
+        tasks: dict[str, asyncio.Task] = {}
+        for name in self.order:
+            stage = self.stages[name]
+            if stage.background:
+                continue
+            deps = [tasks[dep] for dep in stage.after]
+            tasks[name] = asyncio.create_task(self._run_after(stage, ctx, deps))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+        return ctx
+
+    def submit_background(self, ctx: PipelineContext, *, durable: bool = False) -> None:
+        """Schedule background stages on the background pool (never shed when `durable`)."""
+        if any(stage.background for stage in self.stages.values()):
+            background_pool.submit(
+                f"{self.name}_background",
+                self.run_background,
+                ctx,
+                tracing.current_span(),
+                durable=durable,
+            )
+
+    def run_background(self, ctx: PipelineContext, parent_span: tracing.Span | None = None) -> None:
+        """Run background stages in order; a failure skips its dependents."""
+        with tracing.use_span(parent_span):
+            self._run_background(ctx)
+
+    def _run_background(self, ctx: PipelineContext) -> None:
+        failed: set[str] = set()
+        for name in self.order:
+            stage = self.stages[name]
+            if not stage.background:
+                continue
+            if failed.intersection(stage.after):
+                failed.add(name)
+                ctx.timings[name] = {"ms": 0.0, "attempts": 0, "status": "skipped"}
+                continue
+            while True:
+                started = time.perf_counter()
+                self._count_attempt(ctx, name)
+                try:
+                    with tracing.span(f"stage.{name}", attempt=ctx.attempts[name], background=True):
+                        result = stage.run(ctx)
+                        if inspect.isawaitable(result):
+                            result = asyncio.run(result)
+                except Exception as exc:  # noqa: BLE001 - background stages are best-effort
+                    self._record(ctx, stage, started, "failed")
+                    if self._should_retry(stage, ctx, exc):
+                        continue
+                    failed.add(name)
+                    logger.warning("Background stage failed stage=%s", name, exc_info=exc)
+                    break
+                self._record(ctx, stage, started, "ok")
+                ctx.results[name] = result
+                break
+
+    async def _run_after(
+        self,
+        stage: Stage,
+        ctx: PipelineContext,
+        deps: list[asyncio.Task],
+    ) -> Any:
+        if deps:
+            await asyncio.gather(*deps)
+        return await self._execute(stage, ctx)
+
+    async def _execute(self, stage: Stage, ctx: PipelineContext) -> Any:
+        while True:
+            try:
+                return await self._attempt(stage, ctx)
+            except Exception as exc:
+                if not self._should_retry(stage, ctx, exc):
+                    raise
+            # Re-run the stages between the rewind target and this stage
+            for name in self._rewind_segment(stage):
+                await self._execute(self.stages[name], ctx)
+
+    async def _attempt(self, stage: Stage, ctx: PipelineContext) -> Any:
+        self._count_attempt(ctx, stage.name)
+        with tracing.span(f"stage.{stage.name}", attempt=ctx.attempts[stage.name]):
+            return await self._attempt_in_span(stage, ctx)
+
+    async def _attempt_in_span(self, stage: Stage, ctx: PipelineContext) -> Any:
+        timeout = stage.timeout(ctx) if callable(stage.timeout) else stage.timeout
+        started = time.perf_counter()
+        status = "failed"
+        try:
+            if stage.offload:
+                result = asyncio.to_thread(stage.run, ctx)
+            else:
+                result = stage.run(ctx)
+            if inspect.isawaitable(result):
+                if timeout is None:
+                    result = await result
+                else:
+                    scope = asyncio.timeout(timeout)
+                    try:
+                        async with scope:
+                            result = await result
+                    except TimeoutError as exc:
+                        if not scope.expired():
+                            raise
+                        status = "timed_out"
+                        raise StageTimeoutError(stage.name, timeout) from exc
+            status = "ok"
+        finally:
+            self._record(ctx, stage, started, status)
+        ctx.results[stage.name] = result
+        return result
+
+    def _should_retry(self, stage: Stage, ctx: PipelineContext, exc: BaseException) -> bool:
+        policy = stage.retry
+        if policy is None or not isinstance(exc, policy.retry_on):
+            return False
+        attempt = ctx.attempts.get(policy.rewind_to or stage.name, 0)
+        if attempt >= policy.max_attempts:
+            return False
+        if policy.should_retry is not None and not policy.should_retry(ctx, exc):
+            return False
+        metrics.increment(f"pipeline.{stage.name}_retries")
+        if policy.on_retry is not None:
+            policy.on_retry(ctx, exc, attempt)
+        return True
+
+    def _rewind_segment(self, stage: Stage) -> list[str]:
+        target = stage.retry.rewind_to if stage.retry else None
+        if target is None or target == stage.name:
+            return []
+        between = self._ancestors(stage.name) & (self._descendants(target) | {target})
+        return [name for name in self.order if name in between]
+
+    def _count_attempt(self, ctx: PipelineContext, name: str) -> None:
+        ctx.attempts[name] = ctx.attempts.get(name, 0) + 1
+
+    def _record(self, ctx: PipelineContext, stage: Stage, started: float, status: str) -> None:
+        elapsed = time.perf_counter() - started
+        previous = ctx.timings.get(stage.name, {}).get("ms", 0.0)
+        ctx.timings[stage.name] = {
+            "ms": round(previous + elapsed * 1000, 3),
+            "attempts": ctx.attempts.get(stage.name, 0),
+            "status": status,
+        }
+        metrics.observe(f"pipeline.{stage.name}_seconds", elapsed)
+
+    def _topological_order(self) -> list[str]:
+        order: list[str] = []
+        visiting: set[str] = set()
+
+        def visit(name: str) -> None:
+            if name in order:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage graph has a cycle through '{name}'.")
+            if name not in self.stages:
+                raise ValueError(f"Unknown stage dependency '{name}'.")
+            visiting.add(name)
+            for dep in self.stages[name].after:
+                visit(dep)
+            visiting.discard(name)
+            order.append(name)
+
+        for name in self.stages:
+            visit(name)
+        return order
+
+    def _ancestors(self, name: str) -> set[str]:
+        found: set[str] = set()
+        pending = list(self.stages[name].after)
+        while pending:
+            dep = pending.pop()
+            if dep not in found:
+                found.add(dep)
+                pending.extend(self.stages[dep].after)
+        return found
+
+    def _descendants(self, name: str) -> set[str]:
+        return {other for other in self.stages if name in self._ancestors(other)}
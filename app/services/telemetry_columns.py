@@ -0,0 +1,259 @@
+"""Columnar in-memory telemetry store for demo-mode stats queries.
+
+Lesson runs written to the memory backend are also appended here as
+array-backed columns (8-byte timestamps, 1-byte levels, 2-byte attempt
+counts and latency buckets, 4-byte hint totals and topic ids), so a
+million runs cost tens of MB and window aggregates run over C arrays
+instead of dicts:
+
+- topics are dictionary-encoded (`topic_ids` index into `topics`);
+- hint codes are dictionary-encoded in a CSR layout (`hint_offsets[i]`
+  to `hint_offsets[i + 1]` are run i's codes);
+- latencies are stored as log-spaced bucket ids (~1% relative error),
+  so percentiles come from a bucket count instead of a sort.
+
+Timestamps are clamped to be non-decreasing on append, which makes a
+time window a pair of binary searches; pre-aggregated segment summaries
+keep a window query over a million runs to a few hundred merges. When
+`TELEMETRY_COLUMNS_MAX_RECORDS` is exceeded the oldest half is dropped
+(in whole segments), keeping appends amortized O(1).
+"""
+
+from __future__ import annotations
+
+import math
+import threading
+import time
+from array import array
+from bisect import bisect_left
+from collections import Counter
+from datetime import datetime
+from typing import Any, Iterable
+
+from app.core import config
+
+LEVELS = ("beginner", "intermediate")
+SEGMENT_SIZE = 4096
+PERCENTILES = (50, 90, 95, 99)
+
+# Latency bucket i covers [GROWTH**(i-1), GROWTH**i) ms; 0 holds values below 1 ms
+_GROWTH = 1.02
+_LOG_GROWTH = math.log(_GROWTH)
+_MAX_BUCKET = 65535
+
+
+def latency_bucket(ms: float) -> int:
+    if ms < 1.0:
+        return 0
+    return min(_MAX_BUCKET, int(math.log(ms) / _LOG_GROWTH) + 1)
+
+
+def bucket_value(bucket: int) -> float:
+    """Geometric midpoint of a bucket (ms)."""
+    if bucket == 0:
+        return 0.5
+    return _GROWTH ** (bucket - 0.5)
+
+
+def _hint_codes(doc: dict[str, Any]) -> Iterable[str]:
+    """Rule/runtime outcome codes; summary-tier runs fall back to `rule_summary.by_code`."""
+    entries = (doc.get("rule_hints") or []) + (doc.get("runtime_hints") or [])
+    if entries:
+        for entry in entries:
+            for outcome in entry.get("outcomes", []):
+                if outcome.get("code"):
+                    yield outcome["code"]
+        return
+    for code, count in ((doc.get("rule_summary") or {}).get("by_code") or {}).items():
+        yield from [code] * int(count)
+
+
+class _Summary:
+    """Mergeable aggregates over a range of runs."""
+
+    __slots__ = ("runs", "topics", "levels", "latency", "codes", "attempts_sum", "attempts_max", "hints")
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.topics: Counter[int] = Counter()
+        self.levels: Counter[int] = Counter()
+        self.latency: Counter[int] = Counter()
+        self.codes: Counter[int] = Counter()
+        self.attempts_sum = 0
+        self.attempts_max = 0
+        self.hints = 0
+
+    def scan(self, store: ColumnarTelemetryStore, lo: int, hi: int) -> None:
+        """Fold rows [lo, hi) of the store's columns into this summary."""
+        if hi <= lo:
+            return
+        attempts = store.attempts[lo:hi]
+        self.runs += hi - lo
+        self.topics.update(store.topic_ids[lo:hi])
+        self.levels.update(store.levels[lo:hi])
+        self.latency.update(store.latency_buckets[lo:hi])
+        self.codes.update(store.hint_codes[store.hint_offsets[lo]:store.hint_offsets[hi]])
+        self.attempts_sum += sum(attempts)
+        self.attempts_max = max(self.attempts_max, max(attempts))
+        self.hints += sum(store.hint_totals[lo:hi])
+
+    def merge(self, other: _Summary) -> None:
+        self.runs += other.runs
+        self.topics.update(other.topics)
+        self.levels.update(other.levels)
+        self.latency.update(other.latency)
+        self.codes.update(other.codes)
+        self.attempts_sum += other.attempts_sum
+        self.attempts_max = max(self.attempts_max, other.attempts_max)
+        self.hints += other.hints
+
+
+class ColumnarTelemetryStore:
+    """Append-only, array-backed lesson-run columns with window aggregates.
+
+    Every `segment_size` rows are also folded into a segment summary, so
+    a window query merges summaries for whole segments and scans the
+    columns only for the partial segments at either edge.
+    """
+
+    def __init__(self, segment_size: int = SEGMENT_SIZE) -> None:
+        self.segment_size = segment_size
+        self._lock = threading.Lock()
+        self.topics: list[str] = []
+        self._topic_index: dict[str, int] = {}
+        self.codes: list[str] = []
+        self._code_index: dict[str, int] = {}
+        self._reset_columns()
+
+    def _reset_columns(self) -> None:
+        self.timestamps = array("d")
+        self.levels = array("b")
+        self.attempts = array("H")
+        self.latency_buckets = array("H")
+        self.hint_totals = array("I")
+        self.topic_ids = array("I")
+        self.hint_offsets = array("Q", [0])
+        self.hint_codes = array("I")
+        self._segments: list[_Summary] = []
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def append(self, doc: dict[str, Any]) -> None:
+        """Add one lesson-run document (as written by `insert_lesson_run`)."""
+        created_at = doc.get("created_at")
+        ts = created_at.timestamp() if isinstance(created_at, datetime) else time.time()
+        timings = doc.get("timings") or {}
+        hint_summary = doc.get("hint_summary") or {}
+        hint_total = sum(v for v in hint_summary.values() if isinstance(v, int))
+        level = doc.get("level")
+        codes = list(_hint_codes(doc))
+
+        with self._lock:
+            if self.timestamps:
+                ts = max(ts, self.timestamps[-1])
+            self.timestamps.append(ts)
+            self.levels.append(LEVELS.index(level) if level in LEVELS else -1)
+            self.attempts.append(min(int(doc.get("attempt_count") or 0), 65535))
+            self.latency_buckets.append(latency_bucket(float(timings.get("response_ms") or 0.0)))
+            self.hint_totals.append(hint_total)
+            self.topic_ids.append(self._intern(doc.get("topic") or "", self.topics, self._topic_index))
+            for code in codes:
+                self.hint_codes.append(self._intern(code, self.codes, self._code_index))
+            self.hint_offsets.append(len(self.hint_codes))
+
+            size = self.segment_size
+            if len(self.timestamps) % size == 0:
+                segment = _Summary()
+                segment.scan(self, len(self.timestamps) - size, len(self.timestamps))
+                self._segments.append(segment)
+
+            # Drop whole segments so summaries stay aligned; at least two are kept
+            cap = max(config.TELEMETRY_COLUMNS_MAX_RECORDS, 2 * size)
+            if config.TELEMETRY_COLUMNS_MAX_RECORDS > 0 and len(self.timestamps) > cap:
+                self._drop_segments(max(1, (len(self.timestamps) - cap // 2) // size))
+
+    @staticmethod
+    def _intern(value: str, values: list[str], index: dict[str, int]) -> int:
+        key = index.get(value)
+        if key is None:
+            key = index[value] = len(values)
+            values.append(value)
+        return key
+
+    def _drop_segments(self, segments: int) -> None:
+        count = segments * self.segment_size
+        first_code = self.hint_offsets[count]
+        for name in ("timestamps", "levels", "attempts", "latency_buckets", "hint_totals", "topic_ids"):
+            del getattr(self, name)[:count]
+        del self.hint_codes[:first_code]
+        self.hint_offsets = array("Q", (offset - first_code for offset in self.hint_offsets[count:]))
+        del self._segments[:segments]
+
+    def stats(self, *, since: float | None = None, until: float | None = None, top: int = 10) -> dict[str, Any]:
+        """Aggregates over runs with `since <= created_at < until` (epoch seconds)."""
+        size = self.segment_size
+        summary = _Summary()
+        with self._lock:
+            lo = bisect_left(self.timestamps, since) if since is not None else 0
+            hi = bisect_left(self.timestamps, until) if until is not None else len(self.timestamps)
+            first = -(-lo // size)
+            last = min(hi // size, len(self._segments))
+            if first < last:
+                summary.scan(self, lo, first * size)
+                for segment in self._segments[first:last]:
+                    summary.merge(segment)
+                summary.scan(self, last * size, hi)
+            else:
+                summary.scan(self, lo, hi)
+            topics = list(self.topics)
+            codes = list(self.codes)
+
+        runs = summary.runs
+        return {
+            "runs": runs,
+            "topics": [
+                {"topic": topics[key], "count": count}
+                for key, count in summary.topics.most_common(top)
+            ],
+            "levels": {name: summary.levels.get(key, 0) for key, name in enumerate(LEVELS)},
+            "latency_ms": percentiles(summary.latency, runs),
+            "attempts": {
+                "mean": round(summary.attempts_sum / runs, 3) if runs else None,
+                "max": summary.attempts_max if runs else None,
+            },
+            "hints": {
+                "total": summary.hints,
+                "per_run": round(summary.hints / runs, 3) if runs else None,
+                "codes": [
+                    {"code": codes[key], "count": count}
+                    for key, count in summary.codes.most_common(top)
+                ],
+            },
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self.topics.clear()
+            self._topic_index.clear()
+            self.codes.clear()
+            self._code_index.clear()
+            self._reset_columns()
+
+
+def percentiles(bucket_counts: Counter[int], total: int) -> dict[str, float | None]:
+    result: dict[str, float | None] = {f"p{p}": None for p in PERCENTILES}
+    if not total:
+        return result
+    targets = [(p, math.ceil(total * p / 100)) for p in PERCENTILES]
+    seen = 0
+    for bucket in sorted(bucket_counts):
+        seen += bucket_counts[bucket]
+        while targets and seen >= targets[0][1]:
+            result[f"p{targets.pop(0)[0]}"] = round(bucket_value(bucket), 3)
+        if not targets:
+            break
+    return result
+
+
+columnar_store = ColumnarTelemetryStore()
@@ -0,0 +1,269 @@
+"""Streaming telemetry export to Parquet and gzip JSONL.
+
+Documents are read from Mongo with a batched cursor (or from the memory
+backend's ring snapshot), flattened into a fixed set of columns, and
+written one row group at a time, so memory stays bounded by
+`batch_size` rows whatever the collection size.
+
+Flattening: `hint_summary`, `rule_summary` and `mcp_summary` become
+`<summary>_<key>` columns; `timings.response_ms` becomes `response_ms`;
+remaining nested payloads (hint lists, deadline, usage, ...) are kept as
+JSON strings so the schema never depends on the data.
+
+CLI (reads from Mongo, or the memory backend of this process):
+    python -m app.services.telemetry_export runs --format parquet --out runs.parquet
+    python -m app.services.telemetry_export failures --format jsonl --out failures.jsonl.gz --since 2024-06-01
+
+Parquet needs `pyarrow` (in the dev extras); JSONL has no extra dependency.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import zlib
+from datetime import datetime, timezone
+from typing import Any, BinaryIO, Callable, Iterable, Iterator
+
+from app.core import config
+from app.services import mongo
+
+KINDS = ("runs", "failures")
+FORMATS = ("parquet", "jsonl")
+DEFAULT_BATCH_SIZE = 5000
+
+# (column, type) per kind; types: str, int, float, bool, datetime, list, json
+_SUMMARY_KEYS: dict[str, tuple[str, ...]] = {
+    "hint_summary": ("rule_hints", "runtime_errors", "mcp_explanations"),
+    "rule_summary": ("blocks_with_outcomes", "total_outcomes", "unique_codes", "by_code"),
+    "mcp_summary": ("python_blocks", "blocks_with_hints", "total_hints"),
+}
+COLUMNS: dict[str, tuple[tuple[str, str], ...]] = {
+    "runs": (
+        ("run_id", "str"),
+        ("session_id", "str"),
+        ("topic", "str"),
+        ("level", "str"),
+        ("created_at", "datetime"),
+        ("attempt_count", "int"),
+        ("total_minutes", "int"),
+        ("objective", "str"),
+        ("section_ids", "list"),
+        ("degraded", "bool"),
+        ("degraded_reason", "str"),
+        ("response_ms", "float"),
+        *(
+            (f"{summary}_{key}", "json" if key == "by_code" else "int")
+            for summary, keys in _SUMMARY_KEYS.items()
+            for key in keys
+        ),
+        ("rule_hints", "json"),
+        ("runtime_hints", "json"),
+        ("mcp_hints", "json"),
+        ("system_observations", "json"),
+        ("deadline", "json"),
+        ("llm_usage", "json"),
+        ("timings", "json"),
+        ("profile_path", "str"),
+        ("telemetry_sample", "json"),
+    ),
+    "failures": (
+        ("run_id", "str"),
+        ("session_id", "str"),
+        ("topic", "str"),
+        ("level", "str"),
+        ("created_at", "datetime"),
+        ("attempt_count", "int"),
+        ("error_type", "str"),
+        ("error_message", "str"),
+        ("error_details", "json"),
+        ("deadline", "json"),
+        ("profile_path", "str"),
+        ("count", "int"),
+        ("first_seen", "datetime"),
+        ("last_seen", "datetime"),
+        ("session_ids", "list"),
+    ),
+}
+
+
+def flatten(kind: str, doc: dict[str, Any]) -> dict[str, Any]:
+    """Map one telemetry document onto the export columns for `kind`."""
+    source = dict(doc)
+    for summary, keys in _SUMMARY_KEYS.items():
+        values = source.pop(summary, None) or {}
+        for key in keys:
+            source[f"{summary}_{key}"] = values.get(key)
+    if kind == "runs":
+        source["response_ms"] = (doc.get("timings") or {}).get("response_ms")
+        source["degraded"] = bool(doc.get("degraded"))
+
+    row: dict[str, Any] = {}
+    for column, kind_of in COLUMNS[kind]:
+        value = source.get(column)
+        if kind_of == "json" and value is not None:
+            value = json.dumps(value, default=str, sort_keys=True)
+        row[column] = value
+    return row
+
+
+def iter_documents(
+    kind: str,
+    *,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> Iterator[dict[str, Any]]:
+    """Stream raw documents from the configured backend, filtered on `created_at`."""
+    since, until = _utc(since), _utc(until)
+    if config.TELEMETRY_BACKEND == "memory":
+        docs = mongo.iter_memory_runs() if kind == "runs" else mongo.iter_memory_failures()
+        for doc in docs:
+            created_at = doc.get("created_at")
+            if since is not None and (created_at is None or created_at < since):
+                continue
+            if until is not None and (created_at is None or created_at >= until):
+                continue
+            yield doc
+        return
+
+    query: dict[str, Any] = {}
+    if since is not None or until is not None:
+        query["created_at"] = {
+            **({"$gte": since} if since is not None else {}),
+            **({"$lt": until} if until is not None else {}),
+        }
+    collection = mongo.get_collection() if kind == "runs" else mongo.get_failure_collection()
+    cursor = collection.find(query, projection={"_id": False}, batch_size=batch_size)
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
+
+
+def _utc(value: datetime | None) -> datetime | None:
+    """Naive timestamps are taken as UTC (how telemetry stores `created_at`)."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _batches(rows: Iterable[dict[str, Any]], size: int) -> Iterator[list[dict[str, Any]]]:
+    batch: list[dict[str, Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_jsonl_gz(kind: str, docs: Iterable[dict[str, Any]], *, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[bytes]:
+    """Gzip-compressed JSONL chunks (one per batch) of flattened rows."""
+    compressor = zlib.compressobj(wbits=31)  # gzip container
+    for batch in _batches((flatten(kind, doc) for doc in docs), batch_size):
+        lines = "".join(json.dumps(row, default=str) + "\n" for row in batch)
+        chunk = compressor.compress(lines.encode("utf-8"))
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to a generator."""
+
+    closed = False
+
+    def __init__(self) -> None:
+        self._chunks: list[bytes] = []
+        self._position = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def arrow_schema(kind: str) -> Any:
+    import pyarrow as pa
+
+    types: dict[str, Callable[[], Any]] = {
+        "str": pa.string,
+        "int": pa.int64,
+        "float": pa.float64,
+        "bool": pa.bool_,
+        "json": pa.string,
+        "datetime": lambda: pa.timestamp("us", tz="UTC"),
+        "list": lambda: pa.list_(pa.string()),
+    }
+    return pa.schema([(column, types[kind_of]()) for column, kind_of in COLUMNS[kind]])
+
+
+def iter_parquet(kind: str, docs: Iterable[dict[str, Any]], *, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[bytes]:
+    """Parquet file bytes, one row group per batch, yielded as each group is written."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = arrow_schema(kind)
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        for batch in _batches((flatten(kind, doc) for doc in docs), batch_size):
+            writer.write_table(pa.Table.from_pylist(batch, schema=schema), row_group_size=batch_size)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+def export(
+    kind: str,
+    fmt: str,
+    out: BinaryIO,
+    *,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    batch_size: int = DEFAULT_BATCH_SIZE,
+) -> None:
+    """Stream one collection to `out` in the given format."""
+    docs = iter_documents(kind, since=since, until=until, batch_size=batch_size)
+    chunks = iter_parquet if fmt == "parquet" else iter_jsonl_gz
+    for chunk in chunks(kind, docs, batch_size=batch_size):
+        out.write(chunk)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Export lesson telemetry to Parquet or gzip JSONL.")
+    parser.add_argument("kind", choices=KINDS)
+    parser.add_argument("--format", dest="fmt", choices=FORMATS, default="parquet")
+    parser.add_argument("--out", required=True, help="Output path ('-' for stdout)")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="ISO timestamp (inclusive)")
+    parser.add_argument("--until", type=datetime.fromisoformat, help="ISO timestamp (exclusive)")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    if args.out == "-":
+        export(args.kind, args.fmt, sys.stdout.buffer, since=args.since, until=args.until, batch_size=args.batch_size)
+        return 0
+    with open(args.out, "wb") as handle:
+        export(args.kind, args.fmt, handle, since=args.since, until=args.until, batch_size=args.batch_size)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
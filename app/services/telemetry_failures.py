@@ -0,0 +1,180 @@
+"""Coalescing of identical failure telemetry.
+
+During an upstream outage every request fails the same way, and writing
+one full `LessonFailure` per request floods Mongo when it can least
+afford it. Failures are therefore grouped by
+`(error_type, error_message, topic, level)`:
+
+- the first failure of a group is written as usual (on the background
+  pool), with its `error_details`, so every distinct failure is still
+  visible immediately;
+- identical failures within the next `TELEMETRY_FAILURE_WINDOW_SECONDS`
+  are only counted in memory;
+- when the window closes, one coalesced record is written. It carries
+  `count`, `first_seen` and `last_seen` for the absorbed failures, plus
+  up to `TELEMETRY_FAILURE_SAMPLE_SESSIONS` session ids, sampled
+  uniformly with a reservoir. It has no `error_details`.
+
+Per window, a burst of N identical failures costs two writes instead of
+N. Neither write happens on the request path: `admit()` only touches
+memory, and summaries are written by the flusher thread. Rollups and
+exports read `count` (1 when absent) to weight records.
+At most `TELEMETRY_FAILURE_MAX_GROUPS` groups are tracked. Failures of
+other kinds beyond that are written directly. A window of 0 disables
+coalescing.
+"""
+
+from __future__ import annotations
+
+import logging
+import random
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable
+from uuid import uuid4
+
+from app.core import config, metrics
+from app.models.db import LessonFailure
+from app.services import mongo
+from app.services.background import PeriodicWorker
+
+logger = logging.getLogger(__name__)
+
+GroupKey = tuple[str, str, str, str]
+
+
+@dataclass(slots=True)
+class _Group:
+    opened_at: datetime
+    count: int = 0
+    first_seen: datetime | None = None
+    last_seen: datetime | None = None
+    session_ids: list[str] = field(default_factory=list)
+
+
+def group_key(doc: dict[str, Any]) -> GroupKey:
+    return (doc["error_type"], doc["error_message"], doc["topic"], doc["level"])
+
+
+class FailureAggregator:
+    """Windowed coalescing of identical failure documents."""
+
+    def __init__(self, *, rng: random.Random | None = None) -> None:
+        self._lock = threading.Lock()
+        self._groups: dict[GroupKey, _Group] = {}
+        # Expired groups replaced by a new leading failure, awaiting flush()
+        self._closed: list[tuple[GroupKey, _Group]] = []
+        self._rng = rng or random.Random()
+
+    def __len__(self) -> int:
+        return len(self._groups)
+
+    def admit(self, doc: dict[str, Any], *, now: datetime | None = None) -> bool:
+        """Return True if `doc` should be written now, False if it was coalesced."""
+        window = config.TELEMETRY_FAILURE_WINDOW_SECONDS
+        if window <= 0:
+            return True
+        now = now or datetime.now(timezone.utc)
+        key = group_key(doc)
+        with self._lock:
+            group = self._groups.get(key)
+            if group is not None and now < group.opened_at + timedelta(seconds=window):
+                self._absorb(group, doc, doc.get("created_at") or now)
+                metrics.increment("telemetry.failures_coalesced")
+                return False
+            if group is None and len(self._groups) >= config.TELEMETRY_FAILURE_MAX_GROUPS:
+                return True
+            if group is not None and group.count:
+                self._closed.append((key, group))
+            self._groups[key] = _Group(opened_at=now)
+            metrics.set_gauge("telemetry.failure_groups", len(self._groups))
+        return True
+
+    def _absorb(self, group: _Group, doc: dict[str, Any], seen: datetime) -> None:
+        group.count += 1
+        group.first_seen = group.first_seen or seen
+        group.last_seen = seen
+        session_id = doc.get("session_id")
+        if not session_id:
+            return
+        limit = config.TELEMETRY_FAILURE_SAMPLE_SESSIONS
+        if len(group.session_ids) < limit:
+            group.session_ids.append(session_id)
+        else:
+            slot = self._rng.randrange(group.count)
+            if slot < limit:
+                group.session_ids[slot] = session_id
+
+    def flush(self, insert: Callable[[dict[str, Any]], None], *, now: datetime | None = None, force: bool = False) -> int:
+        """Close expired groups (all groups when `force`) and write their summaries.
+
+        Returns the number of coalesced records written.
+        """
+        now = now or datetime.now(timezone.utc)
+        window = timedelta(seconds=config.TELEMETRY_FAILURE_WINDOW_SECONDS)
+        with self._lock:
+            expired = [key for key, group in self._groups.items() if force or now >= group.opened_at + window]
+            closed, self._closed = self._closed, []
+            closed.extend((key, self._groups.pop(key)) for key in expired)
+            metrics.set_gauge("telemetry.failure_groups", len(self._groups))
+
+        written = 0
+        for key, group in closed:
+            if not group.count:
+                continue
+            try:
+                insert(_summary(key, group).to_mongo())
+                written += 1
+            except Exception as exc:  # noqa: BLE001 - telemetry is best-effort
+                logger.warning("Coalesced failure insert failed error_type=%s", key[0], exc_info=exc)
+        return written
+
+    def clear(self) -> None:
+        with self._lock:
+            self._groups.clear()
+            self._closed.clear()
+
+
+def _summary(key: GroupKey, group: _Group) -> LessonFailure:
+    error_type, error_message, topic, level = key
+    return LessonFailure(
+        run_id=str(uuid4()),
+        session_id=group.session_ids[0] if group.session_ids else "",
+        topic=topic,
+        level=level,
+        created_at=group.first_seen,
+        error_type=error_type,
+        error_message=error_message,
+        count=group.count,
+        first_seen=group.first_seen,
+        last_seen=group.last_seen,
+        session_ids=list(group.session_ids),
+    )
+
+
+failure_aggregator = FailureAggregator()
+_worker: PeriodicWorker | None = None
+
+
+def flush_failures(*, force: bool = False) -> int:
+    return failure_aggregator.flush(mongo.insert_lesson_failure, force=force)
+
+
+def start_worker() -> None:
+    """Write coalesced failures as their windows close."""
+    global _worker
+    window = config.TELEMETRY_FAILURE_WINDOW_SECONDS
+    if window <= 0 or _worker is not None:
+        return
+    _worker = PeriodicWorker("telemetry-failure-flusher", flush_failures, interval=min(window, 1.0))
+    _worker.start()
+
+
+def stop_worker() -> None:
+    """Stop the flusher and write every pending coalesced failure."""
+    global _worker
+    worker, _worker = _worker, None
+    if worker is not None:
+        worker.stop(timeout=1.0)
+    flush_failures(force=True)
@@ -0,0 +1,112 @@
+"""Index management and retention for the Mongo telemetry collections.
+
+`ensure_indexes()` is idempotent and runs at startup. It creates named
+indexes for the common query shapes:
+
+- `created_at`, a TTL index when retention is configured (time-window
+  queries, exports, rollups);
+- `(topic, level, created_at)`: per-topic dashboards;
+- `(session_id, created_at)`: one learner's history;
+- `run_id`: joining runs, failures, traces, and profiles;
+- `ingested_at`: the rollup job's watermark scans;
+- `(error_type, created_at)` on failures.
+
+When a TTL setting changes, the existing index is updated with `collMod`
+instead of failing with an options conflict. Setting it to 0 turns the
+TTL index back into a plain one.
+
+MongoDB TTL indexes delete whole documents, so hint details cannot expire
+through one. `prune_hint_details()` instead `$unset`s the detailed
+payloads (hint lists, system observations) from runs older than
+`TELEMETRY_DETAIL_TTL_DAYS`. The summaries stay until the document's own
+TTL expires it.
+"""
+
+from __future__ import annotations
+
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from pymongo import ASCENDING
+from pymongo.collection import Collection
+from pymongo.errors import OperationFailure, PyMongoError
+
+from app.core import config, metrics
+
+logger = logging.getLogger(__name__)
+
+DETAIL_FIELDS = ("rule_hints", "runtime_hints", "mcp_hints", "system_observations")
+_DAY_SECONDS = 86_400
+
+# name -> key spec, per collection (the created_at TTL index is handled separately)
+RUN_INDEXES: dict[str, list[tuple[str, int]]] = {
+    "topic_level_created_at": [("topic", ASCENDING), ("level", ASCENDING), ("created_at", ASCENDING)],
+    "session_created_at": [("session_id", ASCENDING), ("created_at", ASCENDING)],
+    "run_id": [("run_id", ASCENDING)],
+    "ingested_at": [("ingested_at", ASCENDING)],
+}
+FAILURE_INDEXES: dict[str, list[tuple[str, int]]] = {
+    **RUN_INDEXES,
+    "error_type_created_at": [("error_type", ASCENDING), ("created_at", ASCENDING)],
+}
+CREATED_AT_INDEX = "created_at"
+
+
+def ensure_indexes(runs: Collection[Any], failures: Collection[Any]) -> None:
+    """Create the query indexes and TTL retention on both collections (idempotent)."""
+    for collection, indexes, ttl_days in (
+        (runs, RUN_INDEXES, config.TELEMETRY_RUN_TTL_DAYS),
+        (failures, FAILURE_INDEXES, config.TELEMETRY_FAILURE_TTL_DAYS),
+    ):
+        for name, keys in indexes.items():
+            collection.create_index(keys, name=name)
+        _ensure_ttl_index(collection, ttl_days)
+    metrics.increment("telemetry.indexes_ensured")
+
+
+def _ensure_ttl_index(collection: Collection[Any], ttl_days: float) -> None:
+    expire = int(ttl_days * _DAY_SECONDS) if ttl_days > 0 else None
+    existing = collection.index_information().get(CREATED_AT_INDEX)
+    if existing is not None:
+        current = existing.get("expireAfterSeconds")
+        if current == expire:
+            return
+        if current is not None and expire is not None:
+            collection.database.command(
+                "collMod",
+                collection.name,
+                index={"name": CREATED_AT_INDEX, "expireAfterSeconds": expire},
+            )
+            logger.info("telemetry_ttl_updated", extra={"collection": collection.name, "expire_seconds": expire})
+            return
+        # Adding or removing TTL on an existing index needs a rebuild
+        collection.drop_index(CREATED_AT_INDEX)
+
+    options = {"expireAfterSeconds": expire} if expire is not None else {}
+    collection.create_index([("created_at", ASCENDING)], name=CREATED_AT_INDEX, **options)
+
+
+def prune_hint_details(runs: Collection[Any], *, now: datetime | None = None) -> int:
+    """Drop detailed hint payloads from runs older than the detail TTL; returns docs updated."""
+    if config.TELEMETRY_DETAIL_TTL_DAYS <= 0:
+        return 0
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(days=config.TELEMETRY_DETAIL_TTL_DAYS)
+    result = runs.update_many(
+        {"created_at": {"$lt": cutoff}, "$or": [{field: {"$exists": True}} for field in DETAIL_FIELDS]},
+        {"$unset": {field: "" for field in DETAIL_FIELDS}, "$set": {"details_pruned": True}},
+    )
+    if result.modified_count:
+        metrics.increment("telemetry.details_pruned", result.modified_count)
+    return result.modified_count
+
+
+def run_retention(runs: Collection[Any], failures: Collection[Any]) -> None:
+    """Startup/periodic entry point: best-effort, never raises on Mongo errors."""
+    try:
+        ensure_indexes(runs, failures)
+        prune_hint_details(runs)
+    except PyMongoError as exc:
+        metrics.increment("telemetry.retention_failed")
+        code = exc.code if isinstance(exc, OperationFailure) else None
+        logger.warning("telemetry_retention_failed", extra={"code": code}, exc_info=exc)
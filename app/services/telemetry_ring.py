@@ -0,0 +1,123 @@
+"""Bounded in-memory ring for telemetry documents (memory backend).
+
+The ring is capped by record count and by payload bytes (BSON size);
+whichever limit is hit first evicts the oldest records. Appends and
+evictions are O(1) amortized: records live in fixed-size, append-only
+chunks, and evicting only advances an offset into the head chunk (the
+chunk is dropped once fully consumed). Because chunks never change once
+written, `snapshot()` only copies chunk references, and iterating a
+snapshot needs no lock and is unaffected by concurrent appends.
+"""
+
+from __future__ import annotations
+
+import threading
+from collections import deque
+from itertools import islice
+from typing import Any, Iterator
+
+import bson
+from bson.errors import BSONError
+
+CHUNK_SIZE = 64
+
+
+def approx_size(doc: Any) -> int:
+    """Approximate payload bytes: the BSON size Mongo would store."""
+    try:
+        return len(bson.encode(doc))
+    except (BSONError, TypeError):
+        return len(repr(doc))
+
+
+class RingSnapshot:
+    """Point-in-time view of a `TelemetryRing` (oldest first)."""
+
+    __slots__ = ("_chunks", "_head", "_tail", "_len")
+
+    def __init__(self, chunks: tuple[list[Any], ...], head: int, tail: int, length: int) -> None:
+        self._chunks = chunks
+        self._head = head
+        self._tail = tail
+        self._len = length
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __iter__(self) -> Iterator[Any]:
+        last = len(self._chunks) - 1
+        for index, chunk in enumerate(self._chunks):
+            start = self._head if index == 0 else 0
+            stop = self._tail if index == last else len(chunk)
+            yield from islice(chunk, start, stop)
+
+
+class TelemetryRing:
+    """Thread-safe ring bounded by record count and payload bytes."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._chunks: deque[list[Any]] = deque()
+        self._sizes: deque[int] = deque()
+        self._head = 0
+        self._bytes = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._sizes)
+
+    @property
+    def nbytes(self) -> int:
+        return self._bytes
+
+    def append(self, record: Any, *, max_records: int = 0, max_bytes: int = 0) -> int:
+        """Add a record, evicting the oldest past either limit (0 = unbounded).
+
+        The newest record is always kept, even if it alone exceeds `max_bytes`.
+        Returns the number of records evicted.
+        """
+        size = approx_size(record)
+        with self._lock:
+            if not self._chunks or len(self._chunks[-1]) >= CHUNK_SIZE:
+                self._chunks.append([])
+            self._chunks[-1].append(record)
+            self._sizes.append(size)
+            self._bytes += size
+
+            evicted = 0
+            while len(self._sizes) > 1 and (
+                (max_records > 0 and len(self._sizes) > max_records)
+                or (max_bytes > 0 and self._bytes > max_bytes)
+            ):
+                self._evict_oldest()
+                evicted += 1
+            self.evicted += evicted
+            return evicted
+
+    def _evict_oldest(self) -> None:
+        self._bytes -= self._sizes.popleft()
+        self._head += 1
+        if self._head >= CHUNK_SIZE:
+            # Fully consumed head chunk; snapshots holding it keep their own reference
+            self._chunks.popleft()
+            self._head = 0
+
+    def snapshot(self) -> RingSnapshot:
+        """Cheap consistent view: copies chunk references, not records."""
+        with self._lock:
+            if not self._chunks:
+                return RingSnapshot((), 0, 0, 0)
+            return RingSnapshot(
+                tuple(self._chunks), self._head, len(self._chunks[-1]), len(self._sizes)
+            )
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self.snapshot())
+
+    def clear(self) -> None:
+        with self._lock:
+            self._chunks.clear()
+            self._sizes.clear()
+            self._head = 0
+            self._bytes = 0
+            self.evicted = 0
@@ -0,0 +1,364 @@
+"""Incremental hourly and daily telemetry rollups.
+
+A periodic job folds the runs and failures ingested since the last
+watermark into per-hour and per-day buckets. Each bucket holds:
+
+- run and failure counts, and failures by `error_type`;
+- the distribution of `attempt_count` over runs;
+- a latency sketch: counts per log-spaced bucket (the same ~1%-error
+  buckets as the columnar store). Two sketches merge by adding counts,
+  so percentiles stay exact to the bucket width after any number of
+  increments and across hours;
+- hint-code totals from `rule_summary.by_code`.
+
+The watermark is on `ingested_at` (stamped when a document is written to
+Mongo, including WAL replays), not on `created_at`. Late documents, such
+as records replayed after an outage, are still folded into the bucket of
+their `created_at`. The job stops `TELEMETRY_ROLLUP_LAG_SECONDS` short of
+now, to leave room for in-flight inserts and clock skew between app
+instances.
+
+With the mongo backend, buckets live in `MONGO_ROLLUP_COLLECTION`, keyed
+`<granularity>:<bucket start>`. They are updated with `$inc`, and each job
+claims its range `(previous watermark, cutoff]` with a compare-and-swap
+on the watermark document. A bucket also records the last cutoff applied
+to it. If a claimed range is re-applied after a crash, the update is then
+skipped instead of counted twice. With the memory backend (demo mode),
+buckets are kept in process.
+"""
+
+from __future__ import annotations
+
+import logging
+import threading
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import Any, Iterable, Iterator
+
+from pymongo import ASCENDING, UpdateOne
+from pymongo.collection import Collection
+from pymongo.errors import BulkWriteError, DuplicateKeyError, PyMongoError
+
+from app.core import config, metrics
+from app.services import mongo
+from app.services.background import PeriodicWorker
+from app.services.telemetry_columns import latency_bucket, percentiles
+
+logger = logging.getLogger(__name__)
+
+GRANULARITIES = ("hour", "day")
+WATERMARK_ID = "watermark"
+_BATCH_SIZE = 5000
+_DUPLICATE_KEY = 11000
+_PROJECTION = {
+    "_id": False,
+    "created_at": True,
+    "attempt_count": True,
+    "timings.response_ms": True,
+    "rule_summary.by_code": True,
+    "error_type": True,
+    "count": True,
+}
+
+
+def _utc(value: datetime | None) -> datetime | None:
+    """Mongo returns naive UTC datetimes; make them comparable with aware ones."""
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def bucket_start(created_at: datetime, granularity: str) -> datetime:
+    start = _utc(created_at).replace(minute=0, second=0, microsecond=0)
+    return start.replace(hour=0) if granularity == "day" else start
+
+
+def _key(value: Any) -> str:
+    """Map keys are stored as Mongo field names: no dots or leading `$`."""
+    return str(value).replace(".", "_").lstrip("$") or "_"
+
+
+class Rollup:
+    """Mergeable aggregates for one time bucket."""
+
+    __slots__ = ("runs", "failures", "attempts", "latency", "errors", "codes")
+
+    def __init__(self) -> None:
+        self.runs = 0
+        self.failures = 0
+        self.attempts: Counter[str] = Counter()
+        self.latency: Counter[str] = Counter()
+        self.errors: Counter[str] = Counter()
+        self.codes: Counter[str] = Counter()
+
+    def add_run(self, doc: dict[str, Any]) -> None:
+        self.runs += 1
+        self.attempts[str(int(doc.get("attempt_count") or 0))] += 1
+        response_ms = (doc.get("timings") or {}).get("response_ms")
+        if response_ms is not None:
+            self.latency[str(latency_bucket(float(response_ms)))] += 1
+        for code, count in ((doc.get("rule_summary") or {}).get("by_code") or {}).items():
+            self.codes[_key(code)] += int(count)
+
+    def add_failure(self, doc: dict[str, Any]) -> None:
+        # Coalesced failure records stand for `count` failures
+        count = int(doc.get("count") or 1)
+        self.failures += count
+        self.errors[_key(doc.get("error_type") or "unknown")] += count
+
+    def merge(self, other: Rollup) -> None:
+        self.runs += other.runs
+        self.failures += other.failures
+        self.attempts.update(other.attempts)
+        self.latency.update(other.latency)
+        self.errors.update(other.errors)
+        self.codes.update(other.codes)
+
+    def increments(self) -> dict[str, int]:
+        """Flat `$inc` document for this rollup."""
+        inc: dict[str, int] = {"runs": self.runs, "failures": self.failures}
+        for field in ("attempts", "latency", "errors", "codes"):
+            for key, count in getattr(self, field).items():
+                inc[f"{field}.{key}"] = count
+        return inc
+
+    @classmethod
+    def from_document(cls, doc: dict[str, Any]) -> Rollup:
+        rollup = cls()
+        rollup.runs = int(doc.get("runs", 0))
+        rollup.failures = int(doc.get("failures", 0))
+        for field in ("attempts", "latency", "errors", "codes"):
+            getattr(rollup, field).update(doc.get(field) or {})
+        return rollup
+
+    def as_dict(self) -> dict[str, Any]:
+        total = self.runs + self.failures
+        return {
+            "runs": self.runs,
+            "failures": self.failures,
+            "failure_rate": round(self.failures / total, 4) if total else None,
+            "attempts": dict(sorted(self.attempts.items(), key=lambda item: int(item[0]))),
+            "latency_ms": percentiles(Counter({int(k): v for k, v in self.latency.items()}), sum(self.latency.values())),
+            "errors": dict(self.errors.most_common()),
+            "codes": dict(self.codes.most_common()),
+        }
+
+
+def fold(runs: Iterable[dict[str, Any]], failures: Iterable[dict[str, Any]]) -> dict[tuple[str, datetime], Rollup]:
+    """Aggregate documents into (granularity, bucket start) rollups."""
+    rollups: dict[tuple[str, datetime], Rollup] = {}
+    for docs, add in ((runs, Rollup.add_run), (failures, Rollup.add_failure)):
+        for doc in docs:
+            created_at = doc.get("created_at")
+            if not isinstance(created_at, datetime):
+                continue
+            for granularity in GRANULARITIES:
+                key = (granularity, bucket_start(created_at, granularity))
+                rollup = rollups.get(key)
+                if rollup is None:
+                    rollup = rollups[key] = Rollup()
+                add(rollup, doc)
+    return rollups
+
+
+class MemoryRollupStore:
+    """In-process buckets and watermark for the memory backend."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._watermark: datetime | None = None
+        self._buckets: dict[tuple[str, datetime], Rollup] = {}
+
+    def claim(self, cutoff: datetime) -> tuple[datetime | None, datetime] | None:
+        with self._lock:
+            previous = self._watermark
+            if previous is not None and cutoff <= previous:
+                return None
+            self._watermark = cutoff
+            return previous, cutoff
+
+    def iter_new(self, previous: datetime | None, cutoff: datetime) -> tuple[Iterator[dict], Iterator[dict]]:
+        def select(docs: Iterable[dict]) -> Iterator[dict]:
+            for doc in docs:
+                ingested_at = doc.get("ingested_at")
+                if ingested_at is None or ingested_at > cutoff:
+                    continue
+                if previous is None or ingested_at > previous:
+                    yield doc
+
+        return select(mongo.iter_memory_runs()), select(mongo.iter_memory_failures())
+
+    def apply(self, rollups: dict[tuple[str, datetime], Rollup], cutoff: datetime) -> None:
+        with self._lock:
+            for key, rollup in rollups.items():
+                self._buckets.setdefault(key, Rollup()).merge(rollup)
+
+    def finish(self, cutoff: datetime) -> None:
+        pass
+
+    def query(self, granularity: str, since: datetime | None, until: datetime | None) -> list[tuple[datetime, Rollup]]:
+        with self._lock:
+            return sorted(
+                (start, rollup)
+                for (kind, start), rollup in self._buckets.items()
+                if kind == granularity and (since is None or start >= since) and (until is None or start < until)
+            )
+
+
+class MongoRollupStore:
+    """Buckets and watermark in `MONGO_ROLLUP_COLLECTION`."""
+
+    def __init__(self, collection: Collection[Any]) -> None:
+        self.collection = collection
+        self._indexed = False
+
+    def claim(self, cutoff: datetime) -> tuple[datetime | None, datetime] | None:
+        if not self._indexed:
+            self.collection.create_index(
+                [("granularity", ASCENDING), ("bucket_start", ASCENDING)], name="granularity_bucket_start"
+            )
+            self._indexed = True
+        state = self.collection.find_one({"_id": WATERMARK_ID})
+        if state is None:
+            try:
+                self.collection.insert_one({"_id": WATERMARK_ID, "value": cutoff, "previous": None, "pending": True})
+            except DuplicateKeyError:
+                return None  # another instance claimed the first range
+            return None, cutoff
+        if state.get("pending"):
+            # A previous job died mid-range: re-apply it (bucket updates are idempotent)
+            return _utc(state.get("previous")), _utc(state["value"])
+        previous = _utc(state["value"])
+        if cutoff <= previous:
+            return None
+        result = self.collection.update_one(
+            {"_id": WATERMARK_ID, "value": state["value"], "pending": {"$ne": True}},
+            {"$set": {"value": cutoff, "previous": state["value"], "pending": True}},
+        )
+        return (previous, cutoff) if result.modified_count else None
+
+    def iter_new(self, previous: datetime | None, cutoff: datetime) -> tuple[Iterator[dict], Iterator[dict]]:
+        window: dict[str, Any] = {"$lte": cutoff}
+        if previous is not None:
+            window["$gt"] = previous
+            query: dict[str, Any] = {"ingested_at": window}
+        else:
+            # First run also backfills documents written before `ingested_at` existed
+            query = {"$or": [{"ingested_at": window}, {"ingested_at": {"$exists": False}}]}
+
+        def find(collection: Collection[Any]) -> Iterator[dict]:
+            cursor = collection.find(query, projection=_PROJECTION, batch_size=_BATCH_SIZE)
+            try:
+                yield from cursor
+            finally:
+                cursor.close()
+
+        return find(mongo.get_collection()), find(mongo.get_failure_collection())
+
+    def apply(self, rollups: dict[tuple[str, datetime], Rollup], cutoff: datetime) -> None:
+        if not rollups:
+            return
+        operations = [
+            UpdateOne(
+                {"_id": f"{granularity}:{start.isoformat()}", "last_cutoff": {"$lt": cutoff}},
+                {
+                    "$inc": rollup.increments(),
+                    "$set": {"granularity": granularity, "bucket_start": start, "last_cutoff": cutoff},
+                },
+                upsert=True,
+            )
+            for (granularity, start), rollup in rollups.items()
+        ]
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as exc:
+            # Duplicate key on upsert: the bucket already has this cutoff applied
+            errors = exc.details.get("writeErrors", [])
+            if any(error.get("code") != _DUPLICATE_KEY for error in errors) or exc.details.get("writeConcernErrors"):
+                raise
+
+    def finish(self, cutoff: datetime) -> None:
+        self.collection.update_one({"_id": WATERMARK_ID, "value": cutoff}, {"$set": {"pending": False}})
+
+    def query(self, granularity: str, since: datetime | None, until: datetime | None) -> list[tuple[datetime, Rollup]]:
+        query: dict[str, Any] = {"granularity": granularity}
+        if since is not None or until is not None:
+            query["bucket_start"] = {
+                **({"$gte": since} if since is not None else {}),
+                **({"$lt": until} if until is not None else {}),
+            }
+        return [
+            (_utc(doc["bucket_start"]), Rollup.from_document(doc))
+            for doc in self.collection.find(query).sort("bucket_start", ASCENDING)
+        ]
+
+
+_memory_store = MemoryRollupStore()
+_worker: PeriodicWorker | None = None
+
+
+def get_store() -> MemoryRollupStore | MongoRollupStore:
+    if config.TELEMETRY_BACKEND == "memory":
+        return _memory_store
+    return MongoRollupStore(mongo.get_client()[config.MONGO_DB_NAME][config.MONGO_ROLLUP_COLLECTION])
+
+
+def reset_memory_rollups() -> None:
+    """Drop in-process rollups and the watermark (test helper)."""
+    global _memory_store
+    _memory_store = MemoryRollupStore()
+
+
+def run_rollups(*, now: datetime | None = None) -> int:
+    """Fold documents ingested since the watermark into rollups; returns documents folded."""
+    cutoff = (now or datetime.now(timezone.utc)) - timedelta(seconds=config.TELEMETRY_ROLLUP_LAG_SECONDS)
+    store = get_store()
+    try:
+        claim = store.claim(cutoff)
+        if claim is None:
+            return 0
+        previous, cutoff = claim
+        runs, failures = store.iter_new(previous, cutoff)
+        counted = Counter[str]()
+        rollups = fold(_count(runs, counted, "runs"), _count(failures, counted, "failures"))
+        store.apply(rollups, cutoff)
+        store.finish(cutoff)
+    except PyMongoError as exc:
+        metrics.increment("telemetry.rollup_failed")
+        logger.warning("telemetry_rollup_failed", exc_info=exc)
+        return 0
+    folded = sum(counted.values())
+    if folded:
+        metrics.increment("telemetry.rollup_documents", folded)
+    metrics.set_gauge("telemetry.rollup_watermark", cutoff.timestamp())
+    return folded
+
+
+def _count(docs: Iterable[dict[str, Any]], counter: Counter[str], name: str) -> Iterator[dict[str, Any]]:
+    for doc in docs:
+        counter[name] += 1
+        yield doc
+
+
+def query_rollups(
+    granularity: str, *, since: datetime | None = None, until: datetime | None = None
+) -> list[dict[str, Any]]:
+    """Rollup buckets with derived failure rates and latency percentiles."""
+    buckets = get_store().query(granularity, _utc(since), _utc(until))
+    return [{"bucket_start": start.isoformat(), **rollup.as_dict()} for start, rollup in buckets]
+
+
+def start_worker() -> None:
+    """Run the rollup job every `TELEMETRY_ROLLUP_INTERVAL_SECONDS`."""
+    global _worker
+    if not config.TELEMETRY_ROLLUPS_ENABLED or _worker is not None:
+        return
+    _worker = PeriodicWorker("telemetry-rollups", run_rollups, interval=config.TELEMETRY_ROLLUP_INTERVAL_SECONDS)
+    _worker.start()
+
+
+def stop_worker() -> None:
+    global _worker
+    worker, _worker = _worker, None
+    if worker is not None:
+        worker.stop(timeout=1.0)
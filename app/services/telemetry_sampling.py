@@ -0,0 +1,65 @@
+"""Payload tiers for lesson-run telemetry.
+
+Every run stores its summaries (`hint_summary`, `rule_summary`,
+`mcp_summary`, timings). The `rule_hints`, `runtime_hints` and
+`mcp_hints` arrays, which dominate document size, are kept only for:
+
+- runs matching a trigger in `TELEMETRY_DETAIL_TRIGGERS`: `retry`
+  (`attempt_count > 1`), `runtime_error` (any runtime error outcome) or
+  `degraded`. These are always kept;
+- a uniform sample of the remaining runs, at
+  `TELEMETRY_DETAIL_SAMPLE_RATE`.
+
+Failure records always keep their `error_details`.
+
+Each run records its decision as `telemetry_sample`:
+`{"tier": "full" | "summary", "reason": ..., "rate": ..., "weight": ...}`.
+`weight` is the inverse inclusion probability of the details: 1 for
+triggered runs, `1 / rate` for sampled ones, 0 for summary-only ones.
+Summing `weight * value` over full-tier runs estimates a detail-derived
+total (e.g. occurrences of one hint message) over all runs.
+`TELEMETRY_INCLUDE_HINT_DETAILS=false` still forces the summary tier
+for every run.
+"""
+
+from __future__ import annotations
+
+import random
+from typing import Any
+
+from app.core import config, metrics
+
+DETAIL_FIELDS = ("rule_hints", "runtime_hints", "mcp_hints")
+
+
+def detail_triggers() -> set[str]:
+    return {name.strip() for name in config.TELEMETRY_DETAIL_TRIGGERS.split(",") if name.strip()}
+
+
+def decide(*, attempt_count: int, runtime_errors: int, degraded: bool) -> dict[str, Any]:
+    """Pick the payload tier for one run and describe it for the telemetry record."""
+    rate = min(max(config.TELEMETRY_DETAIL_SAMPLE_RATE, 0.0), 1.0)
+    if not config.TELEMETRY_INCLUDE_HINT_DETAILS:
+        decision = {"tier": "summary", "reason": "disabled", "rate": 0.0, "weight": 0.0}
+    else:
+        triggers = detail_triggers()
+        reason = next(
+            (
+                name
+                for name, matched in (
+                    ("retry", attempt_count > 1),
+                    ("runtime_error", runtime_errors > 0),
+                    ("degraded", degraded),
+                )
+                if matched and name in triggers
+            ),
+            None,
+        )
+        if reason is not None:
+            decision = {"tier": "full", "reason": reason, "rate": rate, "weight": 1.0}
+        elif rate > 0 and (rate >= 1.0 or random.random() < rate):
+            decision = {"tier": "full", "reason": "sampled", "rate": rate, "weight": round(1.0 / rate, 6)}
+        else:
+            decision = {"tier": "summary", "reason": "unsampled", "rate": rate, "weight": 0.0}
+    metrics.increment(f"telemetry.detail_tier.{decision['tier']}")
+    return decision
@@ -0,0 +1,230 @@
+"""Local write-ahead log for telemetry while MongoDB is unreachable.
+
+When a Mongo insert fails, the document is appended to a segmented,
+append-only log under `TELEMETRY_WAL_DIR` instead of being dropped. Once
+the log holds anything, later inserts go straight to it (no per-write
+server-selection wait, and order is preserved) until the replayer has
+drained it.
+
+Segment files (`wal-<seq>.log`) hold records of the form
+`<crc32 little-endian u32><BSON document>`. BSON is self-length-prefixed
+and keeps datetimes intact. Each document gets an `_id` before it is
+logged, so a replay that is interrupted after a partial insert can be
+retried: duplicate-key errors mean "already stored".
+
+Durability uses group commit. A writer appends its record and then waits
+until an fsync covers it. Only one thread fsyncs at a time, and one fsync
+covers every record written before it started, so concurrent writers
+share a single disk flush.
+
+`replay()` (run periodically by `mongo.start_wal_replayer`) seals the
+active segment, bulk-inserts each sealed segment into Mongo
+(`insert_many`, unordered), and deletes the segment once Mongo has
+acknowledged every record.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import struct
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Callable, Iterator
+
+import bson
+from bson import ObjectId
+from bson.errors import BSONError
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.core import config, metrics
+
+logger = logging.getLogger(__name__)
+
+_CRC = struct.Struct("<I")
+_LENGTH = struct.Struct("<i")
+# Duplicate key: the record was stored by an earlier, interrupted replay
+_DUPLICATE_KEY = 11000
+
+
+def _encode(collection: str, doc: dict[str, Any]) -> bytes:
+    payload = bson.encode({"c": collection, "d": doc})
+    return _CRC.pack(zlib.crc32(payload)) + payload
+
+
+def read_segment(path: Path) -> Iterator[tuple[str, dict[str, Any]]]:
+    """Yield (collection, doc) records, stopping at a torn or corrupt tail."""
+    data = path.read_bytes()
+    offset = 0
+    while offset + _CRC.size + _LENGTH.size <= len(data):
+        (crc,) = _CRC.unpack_from(data, offset)
+        (length,) = _LENGTH.unpack_from(data, offset + _CRC.size)
+        start = offset + _CRC.size
+        payload = data[start:start + length]
+        if length < 5 or len(payload) < length or zlib.crc32(payload) != crc:
+            metrics.increment("telemetry.wal_corrupt")
+            logger.warning("telemetry_wal_corrupt_tail", extra={"segment": path.name, "offset": offset})
+            return
+        record = bson.decode(payload)
+        yield record["c"], record["d"]
+        offset = start + length
+
+
+class TelemetryWAL:
+    """Segmented append-only log with group-commit fsync."""
+
+    def __init__(self, directory: str | Path, *, segment_bytes: int | None = None) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.segment_bytes = segment_bytes or config.TELEMETRY_WAL_SEGMENT_BYTES
+        self._lock = threading.Lock()
+        self._sync_condition = threading.Condition()
+        self._syncing = False
+        self._written = 0
+        self._synced = 0
+        # Segments left by a previous process are replayed first
+        self._sealed: list[Path] = sorted(self.directory.glob("wal-*.log"))
+        self._next_seq = int(self._sealed[-1].stem.split("-")[1]) + 1 if self._sealed else 0
+        self._active: Any = None
+        self._active_path: Path | None = None
+        self._active_size = 0
+
+    def pending(self) -> bool:
+        """True while any record is waiting to be replayed."""
+        with self._lock:
+            return bool(self._sealed) or self._active_size > 0
+
+    def sealed_segments(self) -> list[Path]:
+        with self._lock:
+            return list(self._sealed)
+
+    def append(self, collection: str, doc: dict[str, Any]) -> None:
+        """Durably log one document; returns once an fsync covers it."""
+        doc.setdefault("_id", ObjectId())
+        record = _encode(collection, doc)
+        with self._lock:
+            if self._active is None or self._active_size >= self.segment_bytes:
+                self._rotate()
+            self._active.write(record)
+            self._active_size += len(record)
+            self._written += 1
+            ticket = self._written
+        metrics.increment("telemetry.wal_appended")
+        self._sync(ticket)
+
+    def _sync(self, ticket: int) -> None:
+        with self._sync_condition:
+            while self._synced < ticket and self._syncing:
+                self._sync_condition.wait()
+            if self._synced >= ticket:
+                return
+            self._syncing = True
+
+        covered = self._synced
+        try:
+            with self._lock:
+                covered = self._written
+                # Records in sealed segments were fsynced when sealed
+                fd = os.dup(self._active.fileno()) if self._active is not None else None
+                if fd is not None:
+                    self._active.flush()
+            if fd is not None:
+                # Other writers keep appending while this fsync runs
+                try:
+                    os.fsync(fd)
+                finally:
+                    os.close(fd)
+            metrics.increment("telemetry.wal_fsyncs")
+        finally:
+            with self._sync_condition:
+                self._syncing = False
+                self._synced = max(self._synced, covered)
+                self._sync_condition.notify_all()
+
+    def _rotate(self) -> None:
+        """Seal the active segment (if any) and open a new one. Caller holds the lock."""
+        self._seal_active()
+        self._active_path = self.directory / f"wal-{self._next_seq:012d}.log"
+        self._next_seq += 1
+        self._active = open(self._active_path, "ab")
+        self._active_size = 0
+
+    def _seal_active(self) -> None:
+        if self._active is None:
+            return
+        self._active.flush()
+        os.fsync(self._active.fileno())
+        self._active.close()
+        if self._active_size:
+            self._sealed.append(self._active_path)
+        else:
+            self._active_path.unlink(missing_ok=True)
+        self._active = None
+        self._active_path = None
+        self._active_size = 0
+
+    def seal(self) -> None:
+        """Close the active segment so the replayer can take it."""
+        with self._lock:
+            self._seal_active()
+
+    def acknowledge(self, path: Path) -> None:
+        """Drop a segment whose records are all stored in Mongo."""
+        with self._lock:
+            if path in self._sealed:
+                self._sealed.remove(path)
+        path.unlink(missing_ok=True)
+
+    def replay(self, insert_many: Callable[[str, list[dict[str, Any]]], None], *, batch_size: int = 500) -> int:
+        """Bulk-insert sealed segments in order; stop at the first failure.
+
+        Returns the number of records acknowledged.
+        """
+        self.seal()
+        replayed = 0
+        for path in self.sealed_segments():
+            batches: dict[str, list[dict[str, Any]]] = {}
+            try:
+                for collection, doc in read_segment(path):
+                    batch = batches.setdefault(collection, [])
+                    batch.append(doc)
+                    if len(batch) >= batch_size:
+                        _insert_idempotent(insert_many, collection, batch)
+                        replayed += len(batch)
+                        batch.clear()
+                for collection, batch in batches.items():
+                    if batch:
+                        _insert_idempotent(insert_many, collection, batch)
+                        replayed += len(batch)
+            except (PyMongoError, OSError) as exc:
+                metrics.increment("telemetry.wal_replay_failed")
+                logger.warning("telemetry_wal_replay_failed", extra={"segment": path.name}, exc_info=exc)
+                break
+            except BSONError as exc:
+                # Unreadable segment: keep it aside rather than blocking the log forever
+                metrics.increment("telemetry.wal_corrupt")
+                logger.error("telemetry_wal_segment_unreadable", extra={"segment": path.name}, exc_info=exc)
+                with self._lock:
+                    self._sealed.remove(path)
+                path.rename(path.with_suffix(".corrupt"))
+                continue
+            self.acknowledge(path)
+        if replayed:
+            metrics.increment("telemetry.wal_replayed", replayed)
+        return replayed
+
+    def close(self) -> None:
+        with self._lock:
+            self._seal_active()
+
+
+def _insert_idempotent(
+    insert_many: Callable[[str, list[dict[str, Any]]], None], collection: str, docs: list[dict[str, Any]]
+) -> None:
+    try:
+        insert_many(collection, docs)
+    except BulkWriteError as exc:
+        errors = exc.details.get("writeErrors", [])
+        if any(error.get("code") != _DUPLICATE_KEY for error in errors) or exc.details.get("writeConcernErrors"):
+            raise
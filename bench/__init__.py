@@ -0,0 +1 @@
+"""Load, chaos, and performance tooling (not imported by the app)."""
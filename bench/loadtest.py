@@ -0,0 +1,379 @@
+"""End-to-end load test for `POST /lesson`.
+
+Drives a running app (or one spawned here) with a fixed number of
+concurrent clients and reports throughput, latency percentiles, error
+rates, and a per-stage breakdown (from the `Server-Timing` header) as JSON.
+A second command compares two reports and flags regressions.
+
+Modes (with --spawn, which starts the app and, for `stub`, the stub LLM):
+- static: STATIC_LESSON_MODE=true (no agents)
+- fake:   canned ContentAgent (full pipeline, no LLM client)
+- stub:   ContentAgentLLM against bench.stub_llm (real client stack)
+
+Run:
+    python -m bench.loadtest run --spawn stub --concurrency 16 --requests 400 --out stub.json
+    python -m bench.loadtest compare baseline.json stub.json --threshold 0.1
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import random
+import shlex
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Iterator, Sequence
+
+import httpx
+
+MODES = ("static", "fake", "stub")
+DEFAULT_TOPICS = {
+    "pandas groupby": 3,
+    "python decorators": 2,
+    "list comprehensions": 2,
+    "async await in python": 1,
+    "numpy broadcasting": 1,
+}
+DEFAULT_LEVELS = {"beginner": 2, "intermediate": 1}
+
+# Relative increase (latency) / decrease (throughput) flagged by `compare`
+DEFAULT_THRESHOLD = 0.10
+# Absolute error-rate increase flagged by `compare`
+ERROR_RATE_TOLERANCE = 0.01
+
+
+@dataclass
+class Sample:
+    status: int
+    latency_ms: float
+    stages_ms: dict[str, float] = field(default_factory=dict)
+    degraded: bool = False
+    error: str | None = None
+
+
+def percentile(values: Sequence[float], q: float) -> float:
+    """Linear-interpolated percentile (q in 0..100); 0.0 for no values."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * q / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def parse_weights(spec: str | None, default: dict[str, int]) -> dict[str, int]:
+    """Parse `name=weight,name=weight` (weight defaults to 1)."""
+    if not spec:
+        return dict(default)
+    weights: dict[str, int] = {}
+    for item in spec.split(","):
+        name, _, weight = item.partition("=")
+        if name.strip():
+            weights[name.strip()] = int(weight) if weight else 1
+    return weights
+
+
+def parse_server_timing(header: str | None) -> dict[str, float]:
+    """Parse `name;dur=ms, ...` into {name: ms}."""
+    timings: dict[str, float] = {}
+    for entry in (header or "").split(","):
+        name, *params = [part.strip() for part in entry.split(";")]
+        for param in params:
+            if param.startswith("dur="):
+                timings[name] = float(param[4:])
+    return timings
+
+
+async def run_load(
+    client: httpx.AsyncClient,
+    *,
+    requests: int,
+    concurrency: int,
+    topics: dict[str, int],
+    levels: dict[str, int],
+    seed: int | None = None,
+    timeout_ms: int | None = None,
+) -> list[Sample]:
+    """Send `requests` lessons through `concurrency` workers; return samples."""
+    rng = random.Random(seed)
+    payloads = [
+        {
+            "topic": rng.choices(list(topics), weights=list(topics.values()))[0],
+            "level": rng.choices(list(levels), weights=list(levels.values()))[0],
+        }
+        for _ in range(requests)
+    ]
+    headers = {"X-Request-Timeout-Ms": str(timeout_ms)} if timeout_ms else {}
+    queue: asyncio.Queue[dict[str, str]] = asyncio.Queue()
+    for payload in payloads:
+        queue.put_nowait(payload)
+    samples: list[Sample] = []
+
+    async def _worker() -> None:
+        while True:
+            try:
+                payload = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            started = time.perf_counter()
+            try:
+                response = await client.post("/lesson", json=payload, headers=headers)
+            except httpx.HTTPError as exc:
+                samples.append(
+                    Sample(
+                        status=0,
+                        latency_ms=(time.perf_counter() - started) * 1000,
+                        error=type(exc).__name__,
+                    )
+                )
+                continue
+            latency_ms = (time.perf_counter() - started) * 1000
+            degraded = False
+            if response.status_code == 200:
+                degraded = bool(response.json().get("degraded"))
+            samples.append(
+                Sample(
+                    status=response.status_code,
+                    latency_ms=latency_ms,
+                    stages_ms=parse_server_timing(response.headers.get("server-timing")),
+                    degraded=degraded,
+                )
+            )
+
+    await asyncio.gather(*(_worker() for _ in range(max(1, concurrency))))
+    return samples
+
+
+def summarize(samples: list[Sample], elapsed_seconds: float, **meta: Any) -> dict[str, Any]:
+    """Build the JSON report for one run."""
+    ok = [s for s in samples if s.status == 200]
+    latencies = [s.latency_ms for s in ok]
+    errors = Counter(str(s.status) if s.status else (s.error or "error") for s in samples if s.status != 200)
+    stage_values: dict[str, list[float]] = {}
+    for sample in ok:
+        for name, ms in sample.stages_ms.items():
+            stage_values.setdefault(name, []).append(ms)
+
+    return {
+        **meta,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "duration_seconds": round(elapsed_seconds, 3),
+        "requests": len(samples),
+        "ok": len(ok),
+        "degraded": sum(1 for s in ok if s.degraded),
+        "errors": dict(errors),
+        "error_rate": round(1 - len(ok) / len(samples), 4) if samples else 0.0,
+        "throughput_rps": round(len(ok) / elapsed_seconds, 3) if elapsed_seconds > 0 else 0.0,
+        "latency_ms": _distribution(latencies),
+        "stages_ms": {name: _distribution(values) for name, values in sorted(stage_values.items())},
+    }
+
+
+def _distribution(values: Sequence[float]) -> dict[str, float]:
+    return {
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+        "mean": round(sum(values) / len(values), 3) if values else 0.0,
+        "max": round(max(values), 3) if values else 0.0,
+    }
+
+
+def compare_reports(
+    baseline: dict[str, Any],
+    candidate: dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> dict[str, Any]:
+    """Diff two reports; `regressions` lists every metric past the threshold."""
+    regressions: list[dict[str, Any]] = []
+    changes: dict[str, dict[str, float]] = {}
+
+    def _check(name: str, before: float, after: float, *, higher_is_worse: bool) -> None:
+        change = (after - before) / before if before else 0.0
+        changes[name] = {"baseline": before, "candidate": after, "change": round(change, 4)}
+        worse = change > threshold if higher_is_worse else change < -threshold
+        if worse:
+            regressions.append({"metric": name, **changes[name]})
+
+    _check("throughput_rps", baseline["throughput_rps"], candidate["throughput_rps"], higher_is_worse=False)
+    for q in ("p50", "p95", "p99"):
+        _check(f"latency_ms.{q}", baseline["latency_ms"][q], candidate["latency_ms"][q], higher_is_worse=True)
+    for stage, dist in candidate.get("stages_ms", {}).items():
+        before = baseline.get("stages_ms", {}).get(stage)
+        if before:
+            _check(f"stages_ms.{stage}.p95", before["p95"], dist["p95"], higher_is_worse=True)
+
+    error_delta = candidate["error_rate"] - baseline["error_rate"]
+    changes["error_rate"] = {
+        "baseline": baseline["error_rate"],
+        "candidate": candidate["error_rate"],
+        "change": round(error_delta, 4),
+    }
+    if error_delta > ERROR_RATE_TOLERANCE:
+        regressions.append({"metric": "error_rate", **changes["error_rate"]})
+
+    return {"threshold": threshold, "regressed": bool(regressions), "regressions": regressions, "changes": changes}
+
+
+# ---------------------------
+# Spawned app / stub processes
+# ---------------------------
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with contextlib.suppress(httpx.HTTPError):
+            if httpx.get(url, timeout=1.0).status_code == 200:
+                return
+        time.sleep(0.2)
+    raise RuntimeError(f"{url} did not become ready within {timeout:.0f}s")
+
+
+def _mode_env(mode: str, stub_url: str | None) -> dict[str, str]:
+    env = {
+        "TELEMETRY_BACKEND": "memory",
+        "SERVER_TIMING_ENABLED": "true",
+        "STATIC_LESSON_MODE": "false",
+        "DEMO_MODE": "false",
+        "USE_LLM_CONTENT": "false",
+    }
+    if mode == "static":
+        env["STATIC_LESSON_MODE"] = "true"
+    elif mode == "stub":
+        env["USE_LLM_CONTENT"] = "true"
+        env["LLM_BASE_URL"] = f"{stub_url}/v1"
+        env["LLM_CASSETTE_MODE"] = "off"
+    return env
+
+
+@contextlib.contextmanager
+def spawn(mode: str, stub_args: str = "") -> Iterator[str]:
+    """Start the app (and the stub LLM for `stub` mode); yield the app URL."""
+    processes: list[subprocess.Popen] = []
+    try:
+        stub_url = None
+        if mode == "stub":
+            stub_port = _free_port()
+            stub_url = f"http://127.0.0.1:{stub_port}"
+            processes.append(
+                subprocess.Popen(
+                    [sys.executable, "-m", "bench.stub_llm", "--port", str(stub_port), *shlex.split(stub_args)]
+                )
+            )
+            _wait_ready(f"{stub_url}/v1/models")
+
+        app_port = _free_port()
+        app_url = f"http://127.0.0.1:{app_port}"
+        processes.append(
+            subprocess.Popen(
+                [
+                    sys.executable, "-m", "uvicorn", "app.main:app",
+                    "--port", str(app_port), "--log-level", "warning",
+                ],
+                env={**os.environ, **_mode_env(mode, stub_url)},
+            )
+        )
+        _wait_ready(f"{app_url}/health")
+        yield app_url
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            with contextlib.suppress(subprocess.TimeoutExpired):
+                process.wait(timeout=10)
+
+
+async def _run_against(url: str, args: argparse.Namespace) -> dict[str, Any]:
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=args.timeout, limits=limits) as client:
+        started = time.perf_counter()
+        samples = await run_load(
+            client,
+            requests=args.requests,
+            concurrency=args.concurrency,
+            topics=parse_weights(args.topics, DEFAULT_TOPICS),
+            levels=parse_weights(args.levels, DEFAULT_LEVELS),
+            seed=args.seed,
+            timeout_ms=args.request_timeout_ms,
+        )
+        elapsed = time.perf_counter() - started
+    return summarize(
+        samples,
+        elapsed,
+        mode=args.spawn or args.mode,
+        url=url,
+        concurrency=args.concurrency,
+    )
+
+
+def _cmd_run(args: argparse.Namespace) -> int:
+    if args.spawn:
+        with spawn(args.spawn, args.stub_args) as url:
+            report = asyncio.run(_run_against(url, args))
+    else:
+        report = asyncio.run(_run_against(args.url, args))
+
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as handle:
+            handle.write(text + "\n")
+    print(text)
+    return 0
+
+
+def _cmd_compare(args: argparse.Namespace) -> int:
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    with open(args.candidate, encoding="utf-8") as handle:
+        candidate = json.load(handle)
+    result = compare_reports(baseline, candidate, args.threshold)
+    print(json.dumps(result, indent=2))
+    return 1 if result["regressed"] else 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Load test POST /lesson.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run a load test and print a JSON report.")
+    target = run.add_mutually_exclusive_group()
+    target.add_argument("--url", default="http://127.0.0.1:8000", help="Running app to target.")
+    target.add_argument("--spawn", choices=MODES, help="Start the app in this mode on a free port.")
+    run.add_argument("--mode", default="external", help="Label recorded in the report with --url.")
+    run.add_argument("--stub-args", default="", help="Extra bench.stub_llm flags for --spawn stub.")
+    run.add_argument("--requests", type=int, default=200)
+    run.add_argument("--concurrency", type=int, default=8)
+    run.add_argument("--topics", help="Weighted topics, e.g. 'pandas groupby=3,python decorators=1'.")
+    run.add_argument("--levels", help="Weighted levels, e.g. 'beginner=2,intermediate=1'.")
+    run.add_argument("--seed", type=int, default=None)
+    run.add_argument("--timeout", type=float, default=120.0, help="Client timeout (seconds).")
+    run.add_argument("--request-timeout-ms", type=int, default=None, help="X-Request-Timeout-Ms header.")
+    run.add_argument("--out", help="Write the report to this file.")
+    run.set_defaults(func=_cmd_run)
+
+    compare = commands.add_parser("compare", help="Compare two reports; exit 1 on regression.")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    compare.set_defaults(func=_cmd_compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,246 @@
+"""Micro-benchmarks for the per-request CPU paths.
+
+Each benchmark runs against a synthetic corpus of small, medium, and large
+lessons (all valid for `ValidatorAgent`), so results track how the hot
+paths scale with lesson size. Timings use `timeit`-style auto-ranging and
+report per-call microseconds (best, median, mean over repeats).
+
+Results are JSON, so a run can be saved as a baseline and compared with a
+later one:
+    python -m bench.microbench run --out bench/baselines/micro.json
+    python -m bench.microbench run --out /tmp/micro.json
+    python -m bench.microbench compare bench/baselines/micro.json /tmp/micro.json
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable
+from uuid import uuid4
+
+from app.agents.validator import ValidatorAgent
+from app.agents.validator_rules import RuleEngine
+from app.models.agents import ContentBlock, GeneratedSection
+from app.models.api import LessonSection
+from app.models.db import LessonRun
+from app.services.markdown_renderer import render_blocks_to_markdown
+from app.services.mcp_hints import collect_hints_from_markdown_sections, inspect_python_code
+
+# (text blocks, python blocks, python body repeats) per section
+LESSON_SIZES: dict[str, tuple[int, int, int]] = {
+    "small": (1, 1, 1),
+    "medium": (3, 2, 3),
+    "large": (8, 6, 6),
+}
+SECTION_IDS = ("concept", "example", "exercise")
+# Median slowdown flagged by `compare`
+DEFAULT_THRESHOLD = 0.15
+
+
+def _text_block(topic: str, index: int, repeats: int) -> str:
+    paragraph = " ".join(
+        f"Part {index} explains how {topic} behaves when the input grows." for _ in range(repeats)
+    )
+    return (
+        f"{paragraph}\n\n"
+        "- Define the core concept in one sentence.\n"
+        "- Highlight a common use case.\n\n"
+        "1. Identify the goal.\n"
+        "2. Apply the technique with a small example."
+    )
+
+
+def _python_block(index: int, repeats: int) -> str:
+    lines = [
+        "import pandas as pd",
+        "",
+        "df = pd.DataFrame({'group': ['A', 'B', 'A'], 'value': [10, 20, 30]})",
+    ]
+    for step in range(repeats):
+        # Mix of clean code and patterns the rule engine reports on
+        lines += [
+            f"step_{step} = df.groupby('group')['value'].sum() + {index}",
+            f"df.head({step + 1})",
+            f"print(step_{step})",
+            f"totals_{step} = [v * {step} for v in df['value'] if v > {step}]",
+        ]
+    return "\n".join(lines)
+
+
+def build_lesson(size: str, topic: str = "pandas groupby") -> list[GeneratedSection]:
+    """Synthetic lesson of the given size (see LESSON_SIZES)."""
+    text_blocks, python_blocks, repeats = LESSON_SIZES[size]
+    sections: list[GeneratedSection] = []
+    for section_id in SECTION_IDS:
+        blocks = [ContentBlock(type="text", content=_text_block(topic, i, repeats)) for i in range(text_blocks)]
+        blocks += [ContentBlock(type="python", content=_python_block(i, repeats)) for i in range(python_blocks)]
+        if section_id == "exercise":
+            blocks.append(ContentBlock(type="exercise", content=f"Group the data and sum each {topic} bucket."))
+        sections.append(GeneratedSection(id=section_id, title=section_id.title(), minutes=5, blocks=blocks))
+    return sections
+
+
+def build_corpus() -> dict[str, list[GeneratedSection]]:
+    return {size: build_lesson(size) for size in LESSON_SIZES}
+
+
+def _benchmarks(corpus: dict[str, list[GeneratedSection]]) -> dict[str, Callable[[], Any]]:
+    validator = ValidatorAgent(runtime_smoke_test_enabled=False)
+    engine = RuleEngine()
+    benches: dict[str, Callable[[], Any]] = {}
+
+    for size, sections in corpus.items():
+        code_blocks = [b.content for s in sections for b in s.blocks if b.type == "python"]
+        rendered = [
+            LessonSection(
+                id=s.id,
+                title=s.title,
+                minutes=s.minutes,
+                content_markdown=render_blocks_to_markdown(s.blocks),
+            )
+            for s in sections
+        ]
+        hints, hint_summary = collect_hints_from_markdown_sections(rendered)
+        run_fields = {
+            "session_id": str(uuid4()),
+            "topic": "pandas groupby",
+            "level": "beginner",
+            "created_at": datetime.now(timezone.utc),
+            "attempt_count": 1,
+            "total_minutes": 15,
+            "objective": "Learn pandas groupby",
+            "section_ids": [s.id for s in sections],
+            "hint_summary": hint_summary,
+            "rule_hints": validator.collect_rule_outcomes(sections),
+            "mcp_hints": hints,
+            "timings": {"response_ms": 12.5, "stages": {"plan": 0.1, "generate": 10.0}},
+        }
+        lesson_run = LessonRun(run_id=str(uuid4()), **run_fields)
+
+        benches[f"validator.validate[{size}]"] = lambda s=sections: validator.validate(s)
+        benches[f"rule_engine.run[{size}]"] = lambda c=code_blocks: [engine.run(code) for code in c]
+        benches[f"inspect_python_code[{size}]"] = lambda c=code_blocks: [inspect_python_code(code) for code in c]
+        benches[f"collect_hints_from_markdown_sections[{size}]"] = (
+            lambda r=rendered: collect_hints_from_markdown_sections(r)
+        )
+        benches[f"render_blocks_to_markdown[{size}]"] = (
+            lambda s=sections: [render_blocks_to_markdown(section.blocks) for section in s]
+        )
+        benches[f"lesson_run.construct[{size}]"] = lambda f=run_fields: LessonRun(run_id="bench", **f)
+        benches[f"lesson_run.to_mongo[{size}]"] = lambda r=lesson_run: r.to_mongo()
+    return benches
+
+
+def measure(fn: Callable[[], Any], *, min_time: float = 0.2, repeat: int = 5) -> dict[str, Any]:
+    """Per-call timings (µs): loops auto-ranged to ~min_time, then repeated."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+
+    per_call: list[float] = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        per_call.append((time.perf_counter() - started) / loops * 1e6)
+
+    return {
+        "loops": loops,
+        "repeat": repeat,
+        "best_us": round(min(per_call), 3),
+        "median_us": round(statistics.median(per_call), 3),
+        "mean_us": round(statistics.fmean(per_call), 3),
+    }
+
+
+def run_benchmarks(
+    *,
+    pattern: str | None = None,
+    min_time: float = 0.2,
+    repeat: int = 5,
+) -> dict[str, Any]:
+    """Run every benchmark whose name contains `pattern`; return the JSON report."""
+    results = {
+        name: measure(fn, min_time=min_time, repeat=repeat)
+        for name, fn in _benchmarks(build_corpus()).items()
+        if pattern is None or pattern in name
+    }
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+
+
+def compare_reports(
+    baseline: dict[str, Any],
+    candidate: dict[str, Any],
+    threshold: float = DEFAULT_THRESHOLD,
+) -> dict[str, Any]:
+    """Median change per benchmark; `regressions` lists slowdowns past the threshold."""
+    changes: dict[str, dict[str, float]] = {}
+    regressions: list[str] = []
+    for name, result in candidate["results"].items():
+        before = baseline["results"].get(name)
+        if not before:
+            continue
+        change = (result["median_us"] - before["median_us"]) / before["median_us"]
+        changes[name] = {
+            "baseline_us": before["median_us"],
+            "candidate_us": result["median_us"],
+            "change": round(change, 4),
+        }
+        if change > threshold:
+            regressions.append(name)
+    return {"threshold": threshold, "regressed": bool(regressions), "regressions": regressions, "changes": changes}
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for per-request CPU paths.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run benchmarks and print a JSON report.")
+    run.add_argument("-k", "--filter", dest="pattern", help="Only run benchmarks containing this text.")
+    run.add_argument("--min-time", type=float, default=0.2, help="Seconds per timing repeat.")
+    run.add_argument("--repeat", type=int, default=5)
+    run.add_argument("--out", help="Write the report (baseline) to this file.")
+
+    compare = commands.add_parser("compare", help="Compare two reports; exit 1 on regression.")
+    compare.add_argument("baseline")
+    compare.add_argument("candidate")
+    compare.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        report = run_benchmarks(pattern=args.pattern, min_time=args.min_time, repeat=args.repeat)
+        text = json.dumps(report, indent=2)
+        if args.out:
+            with open(args.out, "w", encoding="utf-8") as handle:
+                handle.write(text + "\n")
+        print(text)
+        return 0
+
+    with open(args.baseline, encoding="utf-8") as handle:
+        baseline = json.load(handle)
+    with open(args.candidate, encoding="utf-8") as handle:
+        candidate = json.load(handle)
+    result = compare_reports(baseline, candidate, args.threshold)
+    print(json.dumps(result, indent=2))
+    return 1 if result["regressed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""OpenAI-compatible stub LLM server for load and chaos testing.
+
+Point the app at it with `LLM_BASE_URL=http://127.0.0.1:9100/v1` and
+`USE_LLM_CONTENT=true`; requests then go through the real client stack
+(pydantic-ai, the OpenAI SDK and its retries, the LLM limiter, streaming
+validation, and parsing) without a provider account.
+
+The stub implements `POST /v1/chat/completions` (streaming and
+non-streaming) and `GET /v1/models`. Completions are valid lessons built
+from the sections listed in the prompt, so the pipeline succeeds unless a
+fault is injected:
+
+- latency: time to first token drawn from a distribution
+  (`fixed:S`, `uniform:MIN,MAX`, `normal:MEAN,STD`, `lognormal:MEDIAN,SIGMA`)
+  plus an optional per-chunk delay while streaming
+- `--rate-429` / `--rate-500`: fraction of requests rejected with that status
+- `--rate-malformed`: fraction of completions truncated to invalid JSON
+
+`GET /stub/stats` reports request and injected-fault counts.
+
+Run:
+    python -m bench.stub_llm --port 9100 --latency lognormal:2.0,0.4 --rate-429 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.agents.content import ContentAgent
+from app.agents.planner import PlannerAgent
+from app.models.agents import PlannedSection
+
+_TOPIC_RE = re.compile(r'^Topic: "(?P<topic>.*)"$', re.MULTILINE)
+_LEVEL_RE = re.compile(r'^Audience level: "(?P<level>.*)"$', re.MULTILINE)
+_SECTION_RE = re.compile(
+    r"^- id: (?P<id>[^,]+), title: (?P<title>.+), minutes: (?P<minutes>\d+)$",
+    re.MULTILINE,
+)
+
+LatencySampler = Callable[[random.Random], float]
+
+
+def parse_latency(spec: str) -> LatencySampler:
+    """Parse `kind:args` into a sampler returning seconds (never negative)."""
+    kind, _, raw_args = spec.partition(":")
+    try:
+        args = [float(value) for value in raw_args.split(",")] if raw_args else []
+    except ValueError as exc:
+        raise ValueError(f"Invalid latency spec {spec!r}.") from exc
+
+    if kind == "fixed" and len(args) == 1:
+        return lambda rng: max(0.0, args[0])
+    if kind == "uniform" and len(args) == 2:
+        return lambda rng: max(0.0, rng.uniform(args[0], args[1]))
+    if kind == "normal" and len(args) == 2:
+        return lambda rng: max(0.0, rng.gauss(args[0], args[1]))
+    if kind == "lognormal" and len(args) == 2 and args[0] > 0:
+        mu = math.log(args[0])
+        return lambda rng: rng.lognormvariate(mu, args[1])
+    raise ValueError(
+        f"Invalid latency spec {spec!r}; expected fixed:S, uniform:MIN,MAX, "
+        "normal:MEAN,STD, or lognormal:MEDIAN,SIGMA."
+    )
+
+
+@dataclass
+class StubSettings:
+    latency: str = "fixed:0"
+    chunk_delay: float = 0.0
+    chunk_chars: int = 64
+    rate_429: float = 0.0
+    rate_500: float = 0.0
+    rate_malformed: float = 0.0
+    retry_after: float = 1.0
+    seed: int | None = None
+
+
+@dataclass
+class _StubState:
+    settings: StubSettings
+    sample_latency: LatencySampler
+    rng: random.Random
+    stats: Counter = field(default_factory=Counter)
+
+
+def create_app(settings: StubSettings | None = None) -> FastAPI:
+    """Build the stub ASGI app (also usable in-process via httpx.ASGITransport)."""
+    settings = settings or StubSettings()
+    state = _StubState(
+        settings=settings,
+        sample_latency=parse_latency(settings.latency),
+        rng=random.Random(settings.seed),
+    )
+    app = FastAPI(title="Stub LLM")
+    app.state.stub = state
+
+    @app.get("/v1/models")
+    async def list_models() -> dict:
+        return {"object": "list", "data": [{"id": "stub", "object": "model", "owned_by": "bench"}]}
+
+    @app.get("/stub/stats")
+    async def stats() -> dict:
+        return dict(state.stats)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        model = body.get("model", "stub")
+        stream = bool(body.get("stream"))
+        state.stats["requests"] += 1
+
+        fault = _pick_fault(state)
+        if fault is not None:
+            state.stats[f"injected_{fault}"] += 1
+            await asyncio.sleep(state.sample_latency(state.rng))
+            return _error_response(fault, settings.retry_after)
+
+        prompt = _prompt_text(body.get("messages", []))
+        content = await _lesson_json(prompt)
+        if settings.rate_malformed and state.rng.random() < settings.rate_malformed:
+            state.stats["injected_malformed"] += 1
+            content = content[: state.rng.randint(1, max(1, len(content) - 1))]
+
+        usage = _usage(prompt, content)
+        chunks = [
+            content[i : i + settings.chunk_chars]
+            for i in range(0, len(content), max(1, settings.chunk_chars))
+        ]
+        ttft = state.sample_latency(state.rng)
+        if stream:
+            state.stats["streamed"] += 1
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            return StreamingResponse(
+                _stream(model, chunks, ttft, settings.chunk_delay, usage if include_usage else None),
+                media_type="text/event-stream",
+            )
+
+        await asyncio.sleep(ttft + settings.chunk_delay * len(chunks))
+        return {
+            "id": _completion_id(),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }
+            ],
+            "usage": usage,
+        }
+
+    return app
+
+
+def _pick_fault(state: _StubState) -> str | None:
+    roll = state.rng.random()
+    if roll < state.settings.rate_429:
+        return "429"
+    if roll < state.settings.rate_429 + state.settings.rate_500:
+        return "500"
+    return None
+
+
+def _error_response(fault: str, retry_after: float) -> JSONResponse:
+    if fault == "429":
+        return JSONResponse(
+            status_code=429,
+            content={
+                "error": {
+                    "message": "Rate limit reached (stub).",
+                    "type": "rate_limit_error",
+                    "code": "rate_limit_exceeded",
+                }
+            },
+            headers={"retry-after": str(retry_after)},
+        )
+    return JSONResponse(
+        status_code=500,
+        content={"error": {"message": "Internal error (stub).", "type": "server_error"}},
+    )
+
+
+def _prompt_text(messages: list[dict[str, Any]]) -> str:
+    parts: list[str] = []
+    for message in messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(item.get("text", "") for item in content if isinstance(item, dict))
+    return "\n".join(parts)
+
+
+async def _lesson_json(prompt: str) -> str:
+    """A lesson that passes validation for the sections requested in the prompt."""
+    topic_match = _TOPIC_RE.search(prompt)
+    level_match = _LEVEL_RE.search(prompt)
+    topic = topic_match.group("topic") if topic_match else "python"
+    level = level_match.group("level") if level_match else "beginner"
+    planned = [
+        PlannedSection(id=m.group("id"), title=m.group("title"), minutes=int(m.group("minutes")))
+        for m in _SECTION_RE.finditer(prompt)
+    ] or PlannerAgent().plan(topic, level)
+
+    sections = await ContentAgent().generate(topic, level, planned)
+    return json.dumps(
+        {
+            "sections": [
+                {
+                    "id": section.id,
+                    "title": section.title,
+                    "minutes": section.minutes,
+                    "blocks": [
+                        {"type": block.type, "content": block.content} for block in section.blocks
+                    ],
+                }
+                for section in sections
+            ]
+        }
+    )
+
+
+def _usage(prompt: str, content: str) -> dict[str, Any]:
+    # ~4 characters per token, matching the limiter's estimate
+    prompt_tokens = max(1, len(prompt) // 4)
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+        "prompt_tokens_details": {"cached_tokens": 0},
+    }
+
+
+def _completion_id() -> str:
+    return f"chatcmpl-stub-{time.time_ns()}"
+
+
+async def _stream(
+    model: str,
+    chunks: list[str],
+    ttft: float,
+    chunk_delay: float,
+    usage: dict[str, Any] | None,
+) -> AsyncIterator[str]:
+    completion_id = _completion_id()
+    created = int(time.time())
+
+    def _event(choices: list[dict[str, Any]], **extra: Any) -> str:
+        payload = {
+            "id": completion_id,
+            "object": "chat.completion.chunk",
+            "created": created,
+            "model": model,
+            "choices": choices,
+            **extra,
+        }
+        return f"data: {json.dumps(payload)}\n\n"
+
+    await asyncio.sleep(ttft)
+    yield _event([{"index": 0, "delta": {"role": "assistant", "content": ""}, "finish_reason": None}])
+    for chunk in chunks:
+        if chunk_delay:
+            await asyncio.sleep(chunk_delay)
+        yield _event([{"index": 0, "delta": {"content": chunk}, "finish_reason": None}])
+    yield _event([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+    if usage is not None:
+        yield _event([], usage=usage)
+    yield "data: [DONE]\n\n"
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="OpenAI-compatible stub LLM server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    parser.add_argument("--latency", default="fixed:0", help="Time to first token distribution.")
+    parser.add_argument("--chunk-delay", type=float, default=0.0, help="Seconds between stream chunks.")
+    parser.add_argument("--chunk-chars", type=int, default=64)
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-500", type=float, default=0.0)
+    parser.add_argument("--rate-malformed", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    settings = StubSettings(
+        latency=args.latency,
+        chunk_delay=args.chunk_delay,
+        chunk_chars=args.chunk_chars,
+        rate_429=args.rate_429,
+        rate_500=args.rate_500,
+        rate_malformed=args.rate_malformed,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+    import uvicorn
+
+    uvicorn.run(create_app(settings), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
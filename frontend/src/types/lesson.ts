@@ -15,4 +15,5 @@ export interface LessonResponse {
   objective: string;
   total_minutes: number;
   sections: LessonSection[];
+  degraded?: boolean;
 }
@@ -0,0 +1,12 @@
+import pytest
+
+from app.services.background import background_pool
+from app.services.telemetry_failures import failure_aggregator
+
+
+@pytest.fixture(autouse=True)
+def _drain_background_work():
+    """Keep post-response work from leaking into the next test."""
+    yield
+    background_pool.drain()
+    failure_aggregator.clear()
@@ -5,6 +5,7 @@ from app.main import app
 from app.core import config
 from app.services import mongo
 from app.services import lesson_service
+from app.services.background import background_pool
 
 pytestmark = pytest.mark.integration
 
@@ -22,6 +23,7 @@ def test_lesson_endpoint_records_mcp_summary(monkeypatch, static_mode):
     )
 
     assert response.status_code == 200
+    background_pool.drain()
     runs = mongo.get_memory_runs()
     assert runs
     assert "mcp_summary" in runs[-1]
@@ -63,6 +65,7 @@ def test_lesson_endpoint_records_rule_engine_hints(monkeypatch):
     )
 
     assert response.status_code == 200
+    background_pool.drain()
     runs = mongo.get_memory_runs()
     assert runs
     hint_codes = {
@@ -9,6 +9,7 @@ import pytest
 from app.agents.validator import ValidatorAgent
 from app.models.agents import ContentBlock, GeneratedSection
 from app.agents.content_llm_models import LLMLessonModel
+from app.core import config
 
 
 def _load_content_llm():
@@ -23,8 +24,19 @@ def _load_content_llm():
             def __init__(self, *args, **kwargs) -> None:
                 pass
 
+        class NativeOutput:
+            def __init__(self, *args, **kwargs) -> None:
+                pass
+
         dummy.Agent = Agent
+        dummy.NativeOutput = NativeOutput
+        exceptions = types.ModuleType("pydantic_ai.exceptions")
+        exceptions.UnexpectedModelBehavior = type("UnexpectedModelBehavior", (Exception,), {})
+        messages = types.ModuleType("pydantic_ai.messages")
+        messages.TextPart = type("TextPart", (), {})
         sys.modules["pydantic_ai"] = dummy
+        sys.modules["pydantic_ai.exceptions"] = exceptions
+        sys.modules["pydantic_ai.messages"] = messages
         return importlib.import_module("app.agents.content_llm")
 
 
@@ -463,8 +475,9 @@ def test_content_llm_parse_result_accepts_model():
 
 
 @pytest.mark.content_parse
-def test_content_llm_coerce_result_strips_code_fences_from_output():
+def test_content_llm_coerce_result_strips_code_fences_from_output(monkeypatch):
     content_llm = _load_content_llm()
+    monkeypatch.setattr(config, "LLM_OUTPUT_MODE", "text")
     agent = content_llm.ContentAgentLLM.__new__(content_llm.ContentAgentLLM)
 
     payload = {
@@ -5,6 +5,7 @@ from fastapi.testclient import TestClient
 from app.main import app
 from app.core import config
 from app.services import mongo
+from app.services.background import background_pool
 import pytest
 
 pytestmark = pytest.mark.api
@@ -41,6 +42,7 @@ def test_lesson_inserts_telemetry():
     with patch("app.services.lesson_service.insert_lesson_run") as mock_insert:
         response = client.post("/lesson", json={"topic": "x", "level": "beginner"})
         assert response.status_code == 200
+        background_pool.drain()
         mock_insert.assert_called_once()
         doc = mock_insert.call_args.args[0]
         assert doc["topic"] == "x"
@@ -64,6 +66,7 @@ def test_lesson_endpoint_static_mode(monkeypatch):
     assert body["total_minutes"] == 15
     assert "groupby" in body["sections"][1]["content_markdown"].lower()
     assert "Intermediate focus" in body["sections"][0]["content_markdown"]
+    background_pool.drain()
     assert mongo.get_memory_runs()
 
 
@@ -0,0 +1,179 @@
+# Background pool and off-critical-path telemetry tests
+import asyncio
+import threading
+
+import pytest
+
+from app.core import config, metrics
+from app.models.api import LessonRequest
+from app.services import lesson_service, mongo
+from app.services.background import BackgroundTaskPool, background_pool
+from app.mcp import python_code_hints  # noqa: F401
+
+pytestmark = pytest.mark.unit
+
+
+class _FailingContent:
+    def generate(self, topic, level, planned_sections):
+        raise ValueError("bad lesson")
+
+
+def test_pool_runs_work_in_background_and_drains():
+    release = threading.Event()
+    done: list[str] = []
+    pool = BackgroundTaskPool(max_workers=1, max_pending=4)
+
+    def work(label):
+        release.wait(1)
+        done.append(label)
+
+    pool.submit("test_work", work, "a")
+    assert done == []
+    assert pool.pending == 1
+
+    release.set()
+    assert pool.drain(timeout=1)
+    assert done == ["a"]
+    pool.shutdown()
+
+
+def test_pool_runs_inline_when_saturated():
+    release = threading.Event()
+    done: list[str] = []
+    pool = BackgroundTaskPool(max_workers=1, max_pending=1)
+    metrics.reset_metrics()
+
+    pool.submit("test_work", lambda: release.wait(1))
+    pool.submit("test_work", lambda: done.append("inline"))
+
+    assert done == ["inline"]
+    assert metrics.snapshot()["counters"]["background.inline_saturated"] == 1
+    release.set()
+    pool.shutdown(timeout=1)
+
+
+def test_pool_runs_inline_when_disabled(monkeypatch):
+    monkeypatch.setattr(config, "BACKGROUND_TASKS_ENABLED", False)
+    done: list[str] = []
+    pool = BackgroundTaskPool()
+
+    pool.submit("test_work", lambda: done.append("inline"))
+
+    assert done == ["inline"]
+    assert pool.pending == 0
+
+
+def test_pool_never_runs_work_on_the_event_loop(monkeypatch):
+    release = threading.Event()
+    threads: list[str] = []
+    pool = BackgroundTaskPool(max_workers=1, max_pending=1)
+    metrics.reset_metrics()
+
+    async def submit_saturated():
+        pool.submit("test_work", lambda: release.wait(1))
+        pool.submit("test_work", lambda: threads.append("dropped"))
+
+    asyncio.run(submit_saturated())
+    release.set()
+    assert pool.drain(timeout=1)
+    assert threads == []
+    assert metrics.snapshot()["counters"]["background.dropped_saturated"] == 1
+
+    monkeypatch.setattr(config, "BACKGROUND_TASKS_ENABLED", False)
+
+    async def submit_disabled():
+        pool.submit("test_work", lambda: threads.append(threading.current_thread().name))
+        assert await asyncio.to_thread(pool.drain, 1)
+
+    asyncio.run(submit_disabled())
+    assert len(threads) == 1
+    assert threads[0] != threading.main_thread().name
+    pool.shutdown()
+
+
+def test_saturated_pool_still_writes_telemetry(monkeypatch):
+    release = threading.Event()
+    inserted: list[dict] = []
+    monkeypatch.setattr(config, "BACKGROUND_MAX_PENDING", 1)
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    monkeypatch.setattr(lesson_service, "insert_lesson_failure", inserted.append)
+    metrics.reset_metrics()
+
+    monkeypatch.setattr(config, "STATIC_LESSON_MODE", False)
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", False)
+    monkeypatch.setattr(lesson_service, "content_agent", _FailingContent())
+
+    background_pool.submit("test_work", lambda: release.wait(2))
+    with pytest.raises(ValueError):
+        asyncio.run(lesson_service.generate_lesson(LessonRequest(topic="python loops", level="beginner")))
+
+    release.set()
+    assert background_pool.drain(timeout=2)
+    assert inserted[0]["error_message"] == "bad lesson"
+    assert metrics.snapshot()["counters"]["background.overflow"] == 1
+
+
+def test_writes_outside_a_request_have_a_bounded_timeout(monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_WRITE_TIMEOUT_SECONDS", 5.0)
+    monkeypatch.setattr(config, "TELEMETRY_MIN_WRITE_SECONDS", 0.5)
+
+    assert mongo._write_timeout() == 5.0
+
+
+def test_pool_supervises_failures():
+    pool = BackgroundTaskPool(max_workers=1)
+    metrics.reset_metrics()
+
+    def boom():
+        raise RuntimeError("telemetry down")
+
+    pool.submit("test_work", boom)
+    assert pool.drain(timeout=1)
+    assert metrics.snapshot()["counters"]["background.failed"] == 1
+    pool.shutdown()
+
+
+def test_response_is_returned_before_telemetry_is_written(monkeypatch):
+    release = threading.Event()
+    inserted: list[dict] = []
+
+    def slow_insert(doc):
+        release.wait(2)
+        inserted.append(doc)
+
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    monkeypatch.setattr(lesson_service, "insert_lesson_run", slow_insert)
+    mongo.reset_memory_store()
+
+    request = LessonRequest(topic="vector databases", level="beginner")
+    response = asyncio.run(lesson_service.generate_lesson(request))
+
+    assert response.sections
+    assert inserted == []
+
+    release.set()
+    background_pool.drain()
+    assert inserted[0]["timings"]["response_ms"] >= 0
+    assert "mcp_hints" in inserted[0]["timings"]["stages"]
+
+
+def test_failure_telemetry_is_written_after_the_error_is_raised(monkeypatch):
+    release = threading.Event()
+    inserted: list[dict] = []
+
+    def slow_insert(doc):
+        release.wait(2)
+        inserted.append(doc)
+
+    monkeypatch.setattr(config, "STATIC_LESSON_MODE", False)
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", False)
+    monkeypatch.setattr(lesson_service, "content_agent", _FailingContent())
+    monkeypatch.setattr(lesson_service, "insert_lesson_failure", slow_insert)
+
+    with pytest.raises(ValueError):
+        asyncio.run(lesson_service.generate_lesson(LessonRequest(topic="python loops", level="beginner")))
+
+    assert inserted == []
+    release.set()
+    background_pool.drain()
+    assert inserted[0]["error_message"] == "bad lesson"
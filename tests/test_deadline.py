@@ -0,0 +1,175 @@
+# Request deadline propagation tests
+import asyncio
+from unittest.mock import Mock
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.agents.mcp_tools import invoke_tool
+from app.core import config
+from app.core.deadline import Deadline, DeadlineExceeded, use_deadline
+from app.main import app
+from app.mcp import python_code_hints
+from app.models.agents import ContentBlock, GeneratedSection
+from app.models.api import LessonRequest
+from app.services import lesson_service, mongo
+from app.services.background import background_pool
+
+pytestmark = pytest.mark.unit
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class DummyPlanner:
+    def plan(self, topic: str, level: str):
+        return []
+
+
+class SlowContent:
+    async def generate(self, topic: str, level: str, planned_sections):
+        await asyncio.sleep(5)
+
+
+def test_deadline_from_header_defaults_and_clamps(monkeypatch):
+    monkeypatch.setattr(config, "REQUEST_DEADLINE_SECONDS", 30.0)
+    monkeypatch.setattr(config, "REQUEST_DEADLINE_MAX_SECONDS", 45.0)
+
+    assert Deadline.from_header(None).budget == 30.0
+    assert Deadline.from_header("not-a-number").budget == 30.0
+    assert Deadline.from_header("2500").budget == 2.5
+    assert Deadline.from_header("600000").budget == 45.0
+
+
+@pytest.mark.parametrize("value", ["nan", "inf", "-inf", "1e400"])
+def test_deadline_from_header_rejects_non_finite_values(monkeypatch, value):
+    monkeypatch.setattr(config, "REQUEST_DEADLINE_SECONDS", 30.0)
+    monkeypatch.setattr(config, "REQUEST_DEADLINE_MAX_SECONDS", 45.0)
+
+    assert Deadline.from_header(value).budget == 30.0
+
+
+def test_deadline_records_skips_and_shortened_timeouts():
+    clock = FakeClock()
+    deadline = Deadline(10.0, clock=clock)
+
+    clock.now = 8.0
+    assert deadline.timeout_for(4.0, reserve=0.5) == pytest.approx(1.5)
+    assert deadline.allows("context7", 1.0)
+    assert not deadline.allows("generate_repair", 5.0)
+
+    summary = deadline.to_summary()
+    assert summary["budget_ms"] == 10_000
+    assert summary["misses"] == [
+        {"stage": "generate_repair", "action": "skipped", "remaining_ms": 2000}
+    ]
+
+
+def test_generate_lesson_times_out_generation_and_records_failure(monkeypatch):
+    insert_failure = Mock()
+    monkeypatch.setattr(config, "DEADLINE_RESERVE_SECONDS", 0.0)
+    monkeypatch.setattr(lesson_service, "planner_agent", DummyPlanner())
+    monkeypatch.setattr(lesson_service, "content_agent", SlowContent())
+    monkeypatch.setattr(lesson_service, "insert_lesson_failure", insert_failure)
+
+    request = LessonRequest(topic="vector databases", level="beginner")
+    with pytest.raises(DeadlineExceeded):
+        asyncio.run(lesson_service.generate_lesson(request, deadline=Deadline(0.05)))
+
+    background_pool.drain()
+    failure_doc = insert_failure.call_args[0][0]
+    assert failure_doc["error_type"] == "deadline_exceeded"
+    assert failure_doc["deadline"]["misses"][0]["stage"] == "generate"
+
+
+def test_generate_lesson_skips_repair_attempt_without_budget(monkeypatch):
+    class BrokenContent:
+        def __init__(self):
+            self.repair_calls = 0
+
+        async def generate(self, topic: str, level: str, planned_sections):
+            raise ValueError("Bad python block")
+
+        async def generate_with_repair(self, topic, level, planned_sections, error_summary):
+            self.repair_calls += 1
+            raise AssertionError("Repair must be skipped without budget.")
+
+    content = BrokenContent()
+    insert_failure = Mock()
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", True)
+    monkeypatch.setattr(config, "OVERLOAD_SHEDDING_ENABLED", False)
+    monkeypatch.setattr(config, "DEADLINE_MIN_LLM_ATTEMPT_SECONDS", 30.0)
+    monkeypatch.setattr(lesson_service, "planner_agent", DummyPlanner())
+    monkeypatch.setattr(lesson_service, "content_agent", content)
+    monkeypatch.setattr(lesson_service, "insert_lesson_failure", insert_failure)
+
+    request = LessonRequest(topic="vector databases", level="beginner")
+    with pytest.raises(ValueError):
+        asyncio.run(lesson_service.generate_lesson(request, deadline=Deadline(10.0)))
+
+    background_pool.drain()
+    assert content.repair_calls == 0
+    failure_doc = insert_failure.call_args[0][0]
+    assert failure_doc["attempt_count"] == 1
+    assert failure_doc["deadline"]["misses"][0]["stage"] == "generate_repair"
+
+
+def test_generate_lesson_records_deadline_summary_in_telemetry(monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    mongo.reset_memory_store()
+
+    request = LessonRequest(topic="vector databases", level="beginner")
+    asyncio.run(lesson_service.generate_lesson(request, deadline=Deadline(20.0)))
+    background_pool.drain()
+
+    deadline = mongo.get_memory_runs()[-1]["deadline"]
+    assert deadline["budget_ms"] == 20_000
+    assert deadline["misses"] == []
+
+
+def test_lesson_endpoint_returns_504_when_budget_is_exhausted(monkeypatch):
+    monkeypatch.setattr(config, "DEADLINE_RESERVE_SECONDS", 0.0)
+    monkeypatch.setattr(lesson_service, "planner_agent", DummyPlanner())
+    monkeypatch.setattr(lesson_service, "content_agent", SlowContent())
+    monkeypatch.setattr(lesson_service, "insert_lesson_failure", lambda doc: None)
+
+    client = TestClient(app)
+    response = client.post(
+        "/lesson",
+        json={"topic": "x", "level": "beginner"},
+        headers={"X-Request-Timeout-Ms": "50"},
+    )
+
+    assert response.status_code == 504
+
+
+def test_context7_lookups_are_skipped_when_budget_is_low(monkeypatch):
+    calls: list[str] = []
+
+    def fake_fetch_context_snippets(*, api_key, library_name, query):
+        calls.append(library_name)
+        return []
+
+    monkeypatch.setattr(config, "CONTEXT7_API_KEY", "ctx7sk-test")
+    monkeypatch.setattr(config, "DEADLINE_MIN_CONTEXT7_SECONDS", 5.0)
+    monkeypatch.setattr(python_code_hints, "fetch_context_snippets", fake_fetch_context_snippets)
+    sections = [
+        GeneratedSection(
+            id="example",
+            title="Example",
+            minutes=5,
+            blocks=[ContentBlock(type="python", content="import requests\nprint('ok')\n")],
+        )
+    ]
+
+    deadline = Deadline(1.0)
+    with use_deadline(deadline):
+        invoke_tool("python_code_hints", {"mode": "agentic", "sections": sections})
+
+    assert calls == []
+    assert deadline.misses[0]["stage"] == "context7"
@@ -5,6 +5,7 @@ from uuid import uuid4
 from app.models.api import LessonRequest
 from app.services.lesson_service import generate_lesson
 from app.services import mongo
+from app.services.background import background_pool
 from app.core import config
 
 import pytest
@@ -30,6 +31,7 @@ def test_generate_lesson_inserts_telemetry_document():
     import asyncio
 
     asyncio.run(generate_lesson(request))
+    background_pool.drain()
 
     after_count = collection.count_documents(
         {
@@ -0,0 +1,149 @@
+# LLM record/replay cassette tests
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.models.function import FunctionModel
+
+from app.agents.content import ContentAgent
+from app.agents.content_llm import ContentAgentLLM
+from app.agents.llm_cassette import CassetteMiss, LLMCassette
+from app.agents.planner import PlannerAgent
+from app.core import config
+from app.models.api import LessonRequest
+from app.services import lesson_service, mongo
+from app.services.llm_limiter import LLMLimiter
+
+pytestmark = pytest.mark.unit
+
+
+def _stub_lesson_json(topic: str, level: str) -> str:
+    planned = PlannerAgent().plan(topic, level)
+    sections = asyncio.run(ContentAgent().generate(topic, level, planned))
+    return json.dumps(
+        {
+            "sections": [
+                {
+                    "id": section.id,
+                    "title": section.title,
+                    "minutes": section.minutes,
+                    "blocks": [
+                        {"type": block.type, "content": block.content} for block in section.blocks
+                    ],
+                }
+                for section in sections
+            ]
+        }
+    )
+
+
+def _recording_agent(text: str, calls: list[str]) -> ContentAgentLLM:
+    async def stream(messages, info):
+        calls.append("provider")
+        for index in range(0, len(text), 50):
+            yield text[index : index + 50]
+
+    agent = ContentAgentLLM.__new__(ContentAgentLLM)
+    agent.agent = Agent(FunctionModel(stream_function=stream))
+    agent._limiter = LLMLimiter()
+    return agent
+
+
+@pytest.fixture
+def cassette_config(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", True)
+    monkeypatch.setattr(config, "OVERLOAD_SHEDDING_ENABLED", False)
+    monkeypatch.setattr(config, "LLM_STREAMING_ENABLED", True)
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    monkeypatch.setattr(config, "LLM_CASSETTE_DIR", str(tmp_path))
+    mongo.reset_memory_store()
+    return tmp_path
+
+
+def test_record_then_replay_generate_lesson_offline(monkeypatch, cassette_config):
+    request = LessonRequest(topic="vector databases", level="beginner")
+    calls: list[str] = []
+
+    monkeypatch.setattr(config, "LLM_CASSETTE_MODE", "record")
+    monkeypatch.setattr(
+        lesson_service,
+        "content_agent",
+        _recording_agent(_stub_lesson_json(request.topic, request.level), calls),
+    )
+    recorded = asyncio.run(lesson_service.generate_lesson(request))
+
+    assert calls == ["provider"]
+    assert len(list(cassette_config.glob("*.json"))) == 1
+
+    monkeypatch.setattr(config, "LLM_CASSETTE_MODE", "replay")
+    monkeypatch.setattr(config, "LLM_CASSETTE_LATENCY", "0.05")
+    replayer = ContentAgentLLM(limiter=LLMLimiter())
+    assert replayer.agent is None
+    monkeypatch.setattr(lesson_service, "content_agent", replayer)
+
+    started = time.perf_counter()
+    replayed = asyncio.run(lesson_service.generate_lesson(request))
+
+    assert time.perf_counter() - started >= 0.05
+    assert calls == ["provider"]
+    assert replayed.sections == recorded.sections
+
+
+def test_replay_miss_raises(monkeypatch, cassette_config):
+    monkeypatch.setattr(config, "LLM_CASSETTE_MODE", "replay")
+    agent = ContentAgentLLM(limiter=LLMLimiter())
+
+    with pytest.raises(CassetteMiss):
+        asyncio.run(agent._run_prompt("never recorded"))
+
+
+def test_replay_uses_recorded_latency_with_scale(tmp_path):
+    slept: list[float] = []
+
+    async def fake_sleep(seconds):
+        slept.append(seconds)
+
+    cassette = LLMCassette(tmp_path, mode="replay", latency_scale=0.5, sleep=fake_sleep)
+    key = LLMCassette.key("prompt", model="m", output_mode="native", system_prompt="s")
+    cassette.save(key, model="m", output="{}", latency_seconds=4.0, usage=None)
+
+    entry = asyncio.run(cassette.replay(key))
+
+    assert entry.output == "{}"
+    assert slept == [2.0]
+
+
+def test_cassette_file_io_runs_off_the_event_loop(tmp_path, monkeypatch):
+    cassette = LLMCassette(tmp_path, mode="record")
+    threads: list[str] = []
+    save, load = cassette.save, cassette.load
+
+    def tracking(fn):
+        def wrapper(*args, **kwargs):
+            threads.append(threading.current_thread().name)
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    monkeypatch.setattr(cassette, "save", tracking(save))
+    monkeypatch.setattr(cassette, "load", tracking(load))
+
+    async def scenario():
+        await cassette.record("k", model="m", output="{}", latency_seconds=0.0, usage=None)
+        return await cassette.replay("k")
+
+    assert asyncio.run(scenario()).output == "{}"
+    assert len(threads) == 2
+    assert threading.main_thread().name not in threads
+
+
+def test_cassette_key_changes_with_prompt_inputs():
+    base = {"model": "m", "output_mode": "native", "system_prompt": "s"}
+    key = LLMCassette.key("prompt", **base)
+
+    assert key == LLMCassette.key("prompt", **base)
+    assert key != LLMCassette.key("prompt", **{**base, "output_mode": "text"})
+    assert key != LLMCassette.key("other prompt", **base)
@@ -0,0 +1,242 @@
+# LLM admission control tests
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import config, metrics
+from app.main import app
+from app.services import lesson_service
+from app.services.llm_limiter import LLMCapacityError, LLMLimiter, TokenBucket
+
+pytestmark = pytest.mark.unit
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class ProviderError(Exception):
+    def __init__(self, status_code: int) -> None:
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_token_bucket_refills_per_minute():
+    clock = FakeClock()
+    bucket = TokenBucket(60, clock=clock)
+
+    bucket.consume(60)
+    assert bucket.time_until_available(1) == pytest.approx(1.0)
+
+    clock.now = 30.0
+    assert bucket.available == pytest.approx(30.0)
+    assert bucket.time_until_available(30) == 0.0
+
+
+def test_token_bucket_disabled_when_rate_is_zero():
+    bucket = TokenBucket(0)
+
+    bucket.consume(10_000)
+
+    assert bucket.time_until_available(10_000) == 0.0
+
+
+def test_limiter_applies_aimd_to_provider_signals():
+    limiter = LLMLimiter(initial_concurrency=4, max_concurrency=8)
+
+    async def ok():
+        return "ok"
+
+    async def throttled():
+        raise ProviderError(429)
+
+    asyncio.run(limiter.run(ok))
+    assert limiter.concurrency.limit == pytest.approx(4.25)
+
+    with pytest.raises(ProviderError):
+        asyncio.run(limiter.run(throttled))
+    assert limiter.concurrency.limit == pytest.approx(2.125)
+    assert limiter.in_flight == 0
+
+
+def test_limiter_rejects_when_queue_is_full():
+    limiter = LLMLimiter(initial_concurrency=1, max_concurrency=1, max_queue=0)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+            return "done"
+
+        first = asyncio.create_task(limiter.run(slow))
+        await asyncio.sleep(0)
+        with pytest.raises(LLMCapacityError) as excinfo:
+            await limiter.run(slow)
+        release.set()
+        assert await first == "done"
+        return excinfo.value
+
+    error = asyncio.run(scenario())
+
+    assert error.reason == "queue_full"
+    assert int(error.retry_after_header) >= 1
+    assert limiter.rejections == 1
+
+
+def test_limiter_queues_until_a_slot_is_released():
+    limiter = LLMLimiter(initial_concurrency=1, max_concurrency=1, max_queue=4, queue_timeout=1.0)
+    order: list[str] = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def first_call():
+            await release.wait()
+            order.append("first")
+
+        async def second_call():
+            order.append("second")
+
+        first = asyncio.create_task(limiter.run(first_call))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(limiter.run(second_call))
+        await asyncio.sleep(0)
+        assert limiter.queue_length == 1
+        release.set()
+        await asyncio.gather(first, second)
+
+    asyncio.run(scenario())
+
+    assert order == ["first", "second"]
+    assert limiter.queue_length == 0
+
+
+def test_limiter_hands_released_slots_to_waiters_in_order():
+    limiter = LLMLimiter(initial_concurrency=1, max_concurrency=1, max_queue=4, queue_timeout=1.0)
+    order: list[str] = []
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def first_call():
+            await release.wait()
+            order.append("first")
+
+        def call(name):
+            async def run():
+                order.append(name)
+
+            return run
+
+        first = asyncio.create_task(limiter.run(first_call))
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(limiter.run(call("queued")))
+        await asyncio.sleep(0)
+        release.set()
+        await first
+        # The slot now belongs to the queued call; a new arrival cannot take it
+        late = asyncio.create_task(limiter.run(call("late")))
+        await asyncio.gather(queued, late)
+
+    asyncio.run(scenario())
+
+    assert order == ["first", "queued", "late"]
+    assert limiter.in_flight == 0
+
+
+def test_cancelled_waiter_passes_its_slot_on():
+    limiter = LLMLimiter(initial_concurrency=1, max_concurrency=1, max_queue=4, queue_timeout=1.0)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow():
+            await release.wait()
+
+        async def ok():
+            return "ok"
+
+        first = asyncio.create_task(limiter.run(slow))
+        await asyncio.sleep(0)
+        cancelled = asyncio.create_task(limiter.run(ok))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(limiter.run(ok))
+        await asyncio.sleep(0)
+        release.set()
+        await first
+        # The slot was handed to `cancelled`, which gives up before it runs
+        cancelled.cancel()
+        assert await asyncio.wait_for(waiting, timeout=0.5) == "ok"
+        with pytest.raises(asyncio.CancelledError):
+            await cancelled
+
+    asyncio.run(scenario())
+
+    assert limiter.in_flight == 0
+    assert limiter.queue_length == 0
+
+
+def test_slow_failures_count_against_the_latency_target():
+    clock = FakeClock()
+    limiter = LLMLimiter(initial_concurrency=4, max_concurrency=8, latency_target=0.5, clock=clock)
+
+    async def slow_failure():
+        clock.now += 2.0
+        raise ValueError("bad output")
+
+    with pytest.raises(ValueError):
+        asyncio.run(limiter.run(slow_failure))
+
+    assert limiter.concurrency.limit == pytest.approx(2.0)
+
+
+def test_limiter_rejects_when_token_budget_exceeds_queue_timeout():
+    limiter = LLMLimiter(tpm_limit=1000, queue_timeout=0.5)
+
+    async def ok():
+        return "ok"
+
+    asyncio.run(limiter.run(ok, estimated_tokens=1000))
+    with pytest.raises(LLMCapacityError) as excinfo:
+        asyncio.run(limiter.run(ok, estimated_tokens=1000))
+
+    assert excinfo.value.reason == "queue_timeout"
+    assert excinfo.value.retry_after > 0.5
+
+
+def test_lesson_endpoint_returns_503_with_retry_after(monkeypatch):
+    class DummyPlanner:
+        def plan(self, topic: str, level: str):
+            return []
+
+    class SaturatedContent:
+        async def generate(self, topic: str, level: str, planned_sections):
+            raise LLMCapacityError("LLM capacity exhausted (queue_full).", retry_after=2.2, reason="queue_full")
+
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", True)
+    monkeypatch.setattr(lesson_service, "planner_agent", DummyPlanner())
+    monkeypatch.setattr(lesson_service, "content_agent", SaturatedContent())
+    monkeypatch.setattr(lesson_service, "insert_lesson_failure", lambda doc: None)
+
+    client = TestClient(app)
+    response = client.post("/lesson", json={"topic": "x", "level": "beginner"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "3"
+
+
+def test_metrics_endpoint_exposes_limiter_gauges():
+    metrics.reset_metrics()
+    LLMLimiter(initial_concurrency=3)
+
+    client = TestClient(app)
+    body = client.get("/metrics").json()
+
+    assert body["gauges"]["llm_limiter.limit"] == 3
+    assert body["gauges"]["llm_limiter.queue_length"] == 0
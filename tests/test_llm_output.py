@@ -0,0 +1,319 @@
+# LLM output streaming and structured-output tests
+import asyncio
+import json
+import os
+import types
+from pathlib import Path
+
+import pytest
+from pydantic import ValidationError
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, TextPart
+from pydantic_ai.models.function import FunctionModel
+from pydantic_ai.profiles import ModelProfile
+
+from app.agents import content_llm
+from app.agents.content import ContentAgent
+from app.agents.content_llm import ContentAgentLLM, _output_type
+from app.agents.streaming_parser import StreamingLessonParser
+from app.core import config, metrics
+from app.core.llm_usage import current_llm_usage, track_llm_usage
+from app.models.api import LessonRequest
+from app.services import lesson_service, mongo
+from app.services.background import background_pool
+from app.services.llm_limiter import LLMLimiter
+
+pytestmark = pytest.mark.unit
+
+TEXT = "Intro content.\n\n- First key point.\n- Second key point."
+
+
+def _lesson(first_id="concept", first_minutes=5):
+    return {
+        "sections": [
+            {
+                "id": first_id,
+                "title": "Core concept",
+                "minutes": first_minutes,
+                "blocks": [
+                    {"type": "text", "content": TEXT},
+                    {"type": "python", "content": "import math\nprint(math.pi)"},
+                ],
+            },
+            {
+                "id": "example",
+                "title": "Worked example",
+                "minutes": 6,
+                "blocks": [{"type": "text", "content": TEXT}],
+            },
+            {
+                "id": "exercise",
+                "title": "Exercise",
+                "minutes": 4,
+                "blocks": [{"type": "exercise", "content": "Try it {yourself} with \"quotes\"."}],
+            },
+        ]
+    }
+
+
+def _chunks(text, size=7):
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_parser_reports_blocks_and_sections_as_they_close():
+    events = []
+    parser = StreamingLessonParser(
+        on_block=lambda index, block: events.append(("block", index, block["type"])),
+        on_section=lambda index, section: events.append(("section", index, section["id"])),
+    )
+    text = "```json\n" + json.dumps(_lesson()) + "\n```"
+
+    for chunk in _chunks(text, size=3):
+        parser.feed(chunk)
+
+    assert events == [
+        ("block", 0, "text"),
+        ("block", 0, "python"),
+        ("section", 0, "concept"),
+        ("block", 1, "text"),
+        ("section", 1, "example"),
+        ("block", 2, "exercise"),
+        ("section", 2, "exercise"),
+    ]
+    assert parser.text == text
+
+
+@pytest.mark.parametrize("size", [1, 64, 100_000])
+def test_parser_results_do_not_depend_on_delta_boundaries(size):
+    sections = []
+    parser = StreamingLessonParser(on_section=lambda index, section: sections.append(section))
+    text = json.dumps(_lesson(), indent=2)
+
+    for chunk in _chunks(text, size=size):
+        parser.feed(chunk)
+    parser.feed("")
+
+    assert sections == _lesson()["sections"]
+    assert parser.text == text
+
+
+def _agent_with_stream(text, consumed):
+    async def stream(messages, info):
+        for chunk in _chunks(text, size=20):
+            consumed.append(chunk)
+            yield chunk
+
+    agent = ContentAgentLLM.__new__(ContentAgentLLM)
+    agent.agent = Agent(FunctionModel(stream_function=stream))
+    agent._limiter = LLMLimiter()
+    return agent
+
+
+def test_streamed_lesson_is_parsed(monkeypatch):
+    monkeypatch.setattr(config, "LLM_STREAMING_ENABLED", True)
+    consumed: list[str] = []
+    agent = _agent_with_stream(json.dumps(_lesson()), consumed)
+
+    lesson = asyncio.run(agent._run_prompt("prompt"))
+
+    assert [section.id for section in lesson.sections] == ["concept", "example", "exercise"]
+
+
+@pytest.mark.parametrize(
+    ("lesson", "message"),
+    [
+        (_lesson(first_id="overview"), "Section IDs must be one of"),
+        (_lesson(first_minutes=1), "at least 3 minutes"),
+    ],
+)
+def test_stream_aborts_on_first_invalid_section(monkeypatch, lesson, message):
+    monkeypatch.setattr(config, "LLM_STREAMING_ENABLED", True)
+    consumed: list[str] = []
+    text = json.dumps(lesson)
+    agent = _agent_with_stream(text, consumed)
+
+    with pytest.raises(ValueError, match=message):
+        asyncio.run(agent._run_prompt("prompt"))
+
+    assert len("".join(consumed)) < len(text) / 2
+
+
+def test_stream_aborts_on_fenced_exercise_block(monkeypatch):
+    monkeypatch.setattr(config, "LLM_STREAMING_ENABLED", True)
+    lesson = _lesson()
+    lesson["sections"][0]["blocks"][0]["content"] = ":::exercise\nDo it\n:::"
+    consumed: list[str] = []
+    text = json.dumps(lesson)
+    agent = _agent_with_stream(text, consumed)
+
+    with pytest.raises(ValueError, match="exercise markers"):
+        asyncio.run(agent._run_prompt("prompt"))
+
+    assert len("".join(consumed)) < len(text) / 3
+
+
+def _native_agent(*, function=None, stream_function=None, seen_modes=None):
+    def _record(info):
+        if seen_modes is not None:
+            seen_modes.append(info.model_request_parameters.output_mode)
+
+    def wrapped(messages, info):
+        _record(info)
+        return function(messages, info)
+
+    async def wrapped_stream(messages, info):
+        _record(info)
+        async for chunk in stream_function(messages, info):
+            yield chunk
+
+    agent = ContentAgentLLM.__new__(ContentAgentLLM)
+    agent.agent = Agent(
+        FunctionModel(
+            wrapped if function else None,
+            stream_function=wrapped_stream if stream_function else None,
+            profile=ModelProfile(supports_json_schema_output=True),
+        ),
+        output_type=_output_type(),
+        output_retries=0,
+    )
+    agent._limiter = LLMLimiter()
+    return agent
+
+
+def test_native_output_requests_json_schema_mode(monkeypatch):
+    monkeypatch.setattr(config, "LLM_OUTPUT_MODE", "native")
+    monkeypatch.setattr(config, "LLM_STREAMING_ENABLED", False)
+    modes: list[str] = []
+    agent = _native_agent(
+        function=lambda messages, info: ModelResponse(parts=[TextPart(json.dumps(_lesson()))]),
+        seen_modes=modes,
+    )
+
+    lesson = asyncio.run(agent._run_prompt("prompt"))
+
+    assert modes == ["native"]
+    assert lesson.sections[0].id == "concept"
+
+
+def test_native_output_schema_failure_is_a_value_error(monkeypatch):
+    monkeypatch.setattr(config, "LLM_OUTPUT_MODE", "native")
+    monkeypatch.setattr(config, "LLM_STREAMING_ENABLED", False)
+    metrics.reset_metrics()
+    agent = _native_agent(
+        function=lambda messages, info: ModelResponse(parts=[TextPart('{"sections": 1}')]),
+    )
+
+    with pytest.raises(ValueError, match="lesson schema"):
+        asyncio.run(agent._run_prompt("prompt"))
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["llm_output.schema_failures"] == 1
+    assert counters["llm_output.completions"] == 1
+
+
+def test_native_output_streams_raw_json(monkeypatch):
+    monkeypatch.setattr(config, "LLM_OUTPUT_MODE", "native")
+    monkeypatch.setattr(config, "LLM_STREAMING_ENABLED", True)
+    modes: list[str] = []
+
+    async def stream(messages, info):
+        for chunk in _chunks(json.dumps(_lesson()), size=20):
+            yield chunk
+
+    agent = _native_agent(stream_function=stream, seen_modes=modes)
+
+    lesson = asyncio.run(agent._run_prompt("prompt"))
+
+    assert modes == ["native"]
+    assert [section.id for section in lesson.sections] == ["concept", "example", "exercise"]
+
+
+def test_parse_result_validates_raw_bytes():
+    agent = ContentAgentLLM.__new__(ContentAgentLLM)
+
+    lesson = agent._parse_llm_result(json.dumps(_lesson()).encode())
+
+    assert lesson.sections[2].blocks[0].type == "exercise"
+
+
+def test_parse_result_strips_code_fences_only_in_text_mode(monkeypatch):
+    agent = ContentAgentLLM.__new__(ContentAgentLLM)
+    fenced = f"```json\n{json.dumps(_lesson())}\n```"
+
+    monkeypatch.setattr(config, "LLM_OUTPUT_MODE", "text")
+    assert agent._parse_llm_result(fenced).sections[0].id == "concept"
+
+    monkeypatch.setattr(config, "LLM_OUTPUT_MODE", "native")
+    with pytest.raises(ValidationError):
+        agent._parse_llm_result(fenced)
+
+
+def test_prompts_share_a_static_prefix():
+    agent = ContentAgentLLM.__new__(ContentAgentLLM)
+    planned = [types.SimpleNamespace(id="concept", title="Core concept", minutes=5)]
+
+    first = agent._build_prompt("pandas groupby", "beginner", planned)
+    second = agent._build_prompt("vector databases", "intermediate", planned)
+
+    prefix = os.path.commonprefix([first, second])
+    assert prefix.startswith(first[: first.index("Lesson request:")])
+    assert "pandas groupby" not in prefix
+    assert first.endswith("- id: concept, title: Core concept, minutes: 5")
+
+
+def test_prompt_templates_are_read_once(monkeypatch):
+    content_llm._load_prompt.cache_clear()
+    reads: list[str] = []
+    original = Path.read_text
+
+    def counting_read_text(self, *args, **kwargs):
+        reads.append(self.name)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(Path, "read_text", counting_read_text)
+    agent = ContentAgentLLM.__new__(ContentAgentLLM)
+    planned = [types.SimpleNamespace(id="concept", title="Core concept", minutes=5)]
+
+    for topic in ("a", "b", "c"):
+        agent._build_prompt(topic, "beginner", planned)
+
+    assert reads == ["content_llm_user.txt"]
+
+
+def test_llm_usage_is_accumulated_per_request(monkeypatch):
+    monkeypatch.setattr(config, "LLM_STREAMING_ENABLED", True)
+    agent = _agent_with_stream(json.dumps(_lesson()), [])
+
+    async def run_twice():
+        await agent._run_prompt("prompt")
+        await agent._run_prompt("prompt")
+
+    with track_llm_usage() as usage:
+        asyncio.run(run_twice())
+
+    assert usage.requests == 2
+    assert usage.input_tokens > 0
+    assert usage.to_summary()["cached_ratio"] == 0.0
+
+
+def test_llm_usage_reports_cached_tokens_in_telemetry(monkeypatch):
+    class CachedContent:
+        async def generate(self, topic, level, planned_sections):
+            current_llm_usage().add(
+                types.SimpleNamespace(
+                    requests=1, input_tokens=1200, output_tokens=900, cache_read_tokens=1024
+                )
+            )
+            return await ContentAgent().generate(topic, level, planned_sections)
+
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    monkeypatch.setattr(lesson_service, "content_agent", CachedContent())
+    mongo.reset_memory_store()
+
+    request = LessonRequest(topic="vector databases", level="beginner")
+    asyncio.run(lesson_service.generate_lesson(request))
+    background_pool.drain()
+
+    usage = mongo.get_memory_runs()[-1]["llm_usage"]
+    assert usage["cache_read_tokens"] == 1024
+    assert usage["cached_ratio"] == pytest.approx(1024 / 1200, abs=1e-4)
@@ -0,0 +1,118 @@
+# Load-test harness tests (in-process app, no sockets)
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.core import config
+from app.main import app
+from app.services import mongo
+from bench.loadtest import (
+    DEFAULT_LEVELS,
+    DEFAULT_TOPICS,
+    Sample,
+    compare_reports,
+    parse_server_timing,
+    parse_weights,
+    percentile,
+    run_load,
+    summarize,
+)
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def fake_llm_app(monkeypatch):
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", False)
+    monkeypatch.setattr(config, "STATIC_LESSON_MODE", False)
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    monkeypatch.setattr(config, "SERVER_TIMING_ENABLED", True)
+    mongo.reset_memory_store()
+
+
+def _run(requests: int, concurrency: int) -> dict:
+    async def _drive():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://app") as client:
+            started = time.perf_counter()
+            samples = await run_load(
+                client,
+                requests=requests,
+                concurrency=concurrency,
+                topics=DEFAULT_TOPICS,
+                levels=DEFAULT_LEVELS,
+                seed=7,
+            )
+            return summarize(samples, time.perf_counter() - started, mode="fake")
+
+    return asyncio.run(_drive())
+
+
+def test_percentile_interpolates():
+    values = [10.0, 20.0, 30.0, 40.0]
+
+    assert percentile(values, 50) == 25.0
+    assert percentile(values, 100) == 40.0
+    assert percentile([], 95) == 0.0
+
+
+def test_parsers():
+    assert parse_weights("a=3,b", {}) == {"a": 3, "b": 1}
+    assert parse_weights(None, {"x": 1}) == {"x": 1}
+    assert parse_server_timing("plan;dur=1.5, generate;dur=20, total;dur=22") == {
+        "plan": 1.5,
+        "generate": 20.0,
+        "total": 22.0,
+    }
+
+
+def test_run_load_reports_percentiles_and_stage_breakdown(fake_llm_app):
+    report = _run(requests=12, concurrency=4)
+
+    assert report["requests"] == 12
+    assert report["ok"] == 12
+    assert report["error_rate"] == 0.0
+    assert report["throughput_rps"] > 0
+    assert report["latency_ms"]["p50"] <= report["latency_ms"]["p99"]
+    assert {"plan", "generate", "validate", "render", "total"} <= set(report["stages_ms"])
+
+
+def test_server_timing_header_is_opt_in(monkeypatch, fake_llm_app):
+    monkeypatch.setattr(config, "SERVER_TIMING_ENABLED", False)
+
+    report = _run(requests=2, concurrency=1)
+
+    assert report["ok"] == 2
+    assert report["stages_ms"] == {}
+
+
+def test_summarize_counts_errors():
+    samples = [
+        Sample(status=200, latency_ms=10.0),
+        Sample(status=503, latency_ms=1.0),
+        Sample(status=0, latency_ms=5.0, error="ReadTimeout"),
+    ]
+
+    report = summarize(samples, 1.0)
+
+    assert report["errors"] == {"503": 1, "ReadTimeout": 1}
+    assert report["error_rate"] == pytest.approx(0.6667)
+    assert report["throughput_rps"] == 1.0
+
+
+def test_compare_flags_latency_throughput_and_error_regressions():
+    baseline = summarize([Sample(status=200, latency_ms=100.0, stages_ms={"generate": 80.0})] * 10, 1.0)
+    same = compare_reports(baseline, baseline)
+    assert same["regressed"] is False
+
+    slower = summarize(
+        [Sample(status=200, latency_ms=150.0, stages_ms={"generate": 130.0})] * 9
+        + [Sample(status=500, latency_ms=1.0)],
+        2.0,
+    )
+    result = compare_reports(baseline, slower, threshold=0.1)
+
+    flagged = {entry["metric"] for entry in result["regressions"]}
+    assert {"throughput_rps", "latency_ms.p95", "stages_ms.generate.p95", "error_rate"} <= flagged
@@ -0,0 +1,101 @@
+# Queued JSON logging tests
+import io
+import json
+import logging
+import logging.handlers
+import queue
+
+import pytest
+
+from app.core import metrics
+from app.core.logging import EventSampler, JsonFormatter, _EnqueueHandler, parse_sample_rates, setup_logging
+
+pytestmark = pytest.mark.unit
+
+
+def _queued_logger(name: str, *, maxsize: int = 0, rates: dict[str, float] | None = None):
+    stream = io.StringIO()
+    output = logging.StreamHandler(stream)
+    output.setFormatter(JsonFormatter())
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _EnqueueHandler(log_queue, maxsize=maxsize)
+    handler.addFilter(EventSampler(rates or {}))
+    logger = logging.getLogger(name)
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.INFO)
+    listener = logging.handlers.QueueListener(log_queue, output)
+    return logger, listener, stream
+
+
+def test_extra_fields_are_rendered_as_json_keys():
+    logger, listener, stream = _queued_logger("test.json")
+    listener.start()
+    logger.info("mcp_hint", extra={"session_id": "s1", "hint_code": "unused"})
+    logger.info("attempt %s of %s", 1, 2)
+    try:
+        raise ValueError("bad")
+    except ValueError:
+        logger.exception("failed")
+    listener.stop()
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert lines[0]["event"] == "mcp_hint"
+    assert lines[0]["session_id"] == "s1"
+    assert lines[0]["hint_code"] == "unused"
+    assert lines[0]["level"] == "INFO"
+    assert lines[1]["event"] == "attempt 1 of 2"
+    assert "ValueError: bad" in lines[2]["exc_info"]
+
+
+def test_sampling_drops_info_events_but_keeps_warnings():
+    metrics.reset_metrics()
+    logger, listener, stream = _queued_logger("test.sampling", rates={"mcp_hint": 0.0})
+    listener.start()
+    for _ in range(5):
+        logger.info("mcp_hint", extra={"hint_code": "x"})
+    logger.warning("mcp_hint")
+    logger.info("hint_summary")
+    listener.stop()
+
+    events = [(line["level"], line["event"]) for line in map(json.loads, stream.getvalue().splitlines())]
+    assert events == [("WARNING", "mcp_hint"), ("INFO", "hint_summary")]
+    assert metrics.snapshot()["counters"]["logging.sampled_out"] == 5
+
+
+def test_full_queue_drops_instead_of_blocking():
+    metrics.reset_metrics()
+    logger, _listener, _stream = _queued_logger("test.full", maxsize=1)
+
+    logger.info("first")
+    logger.info("second")
+
+    assert metrics.snapshot()["counters"]["logging.dropped"] == 1
+
+
+def test_parse_sample_rates():
+    assert parse_sample_rates("mcp_hint=0.01, mcp_environment_hint=2,bad=x") == {
+        "mcp_hint": 0.01,
+        "mcp_environment_hint": 1.0,
+    }
+    assert parse_sample_rates("") == {}
+
+
+def test_setup_logging_keeps_caller_information():
+    setup_logging()
+    logger = logging.getLogger("caller-check")
+    captured: list[logging.LogRecord] = []
+
+    class Capture(logging.Handler):
+        def emit(self, record):
+            captured.append(record)
+
+    handler = Capture()
+    logger.addHandler(handler)
+    logger.propagate = False
+    try:
+        logger.warning("where am I")
+    finally:
+        logger.removeHandler(handler)
+
+    assert captured[0].funcName == "test_setup_logging_keeps_caller_information"
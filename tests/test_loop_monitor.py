@@ -0,0 +1,74 @@
+# Event-loop lag monitor and blocking-call detector tests
+import asyncio
+import time
+
+import pytest
+
+from app.core import metrics
+from app.core.loop_monitor import LoopLagMonitor
+
+pytestmark = pytest.mark.unit
+
+
+def _blocking_helper(seconds: float) -> None:
+    time.sleep(seconds)
+
+
+def _run_with_monitor(monitor: LoopLagMonitor, body) -> None:
+    async def _main():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        try:
+            await body()
+        finally:
+            await monitor.stop()
+
+    asyncio.run(_main())
+
+
+def test_blocking_call_is_reported_with_its_call_site():
+    metrics.reset_metrics()
+    monitor = LoopLagMonitor(interval=0.01, block_threshold=0.05)
+
+    async def body():
+        _blocking_helper(0.3)
+        await asyncio.sleep(0.1)
+
+    _run_with_monitor(monitor, body)
+
+    assert len(monitor.offenders) == 1
+    offender = monitor.offenders[0]
+    assert "_blocking_helper" in offender["call_site"]
+    assert offender["call_site"].startswith(__file__)
+    assert offender["blocked_seconds"] >= 0.05
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["event_loop.blocked"] == 1
+    assert snapshot["histograms"]["event_loop.blocked_seconds"]["count"] == 1
+    assert snapshot["histograms"]["event_loop.blocked_seconds"]["sum"] >= 0.2
+
+
+def test_lag_samples_feed_histogram_without_false_positives():
+    metrics.reset_metrics()
+    monitor = LoopLagMonitor(interval=0.01, block_threshold=0.2)
+
+    async def body():
+        await asyncio.sleep(0.1)
+
+    _run_with_monitor(monitor, body)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["histograms"]["event_loop.lag_seconds"]["count"] >= 5
+    assert "event_loop.blocked" not in snapshot["counters"]
+    assert list(monitor.offenders) == []
+
+
+def test_watchdog_disabled_with_zero_threshold():
+    monitor = LoopLagMonitor(interval=0.01, block_threshold=0)
+
+    async def body():
+        assert monitor._watchdog is None
+        _blocking_helper(0.1)
+
+    _run_with_monitor(monitor, body)
+
+    assert list(monitor.offenders) == []
@@ -0,0 +1,52 @@
+# Micro-benchmark suite tests (corpus validity and report shape)
+import pytest
+
+from app.agents.validator import ValidatorAgent
+from bench.microbench import LESSON_SIZES, build_corpus, compare_reports, measure, run_benchmarks
+
+pytestmark = pytest.mark.unit
+
+
+def test_corpus_lessons_pass_validation_and_grow_with_size():
+    corpus = build_corpus()
+    validator = ValidatorAgent(runtime_smoke_test_enabled=False)
+
+    block_counts = []
+    for size in LESSON_SIZES:
+        sections = validator.validate(corpus[size], strict_minutes=True)
+        block_counts.append(sum(len(section.blocks) for section in sections))
+
+    assert block_counts == sorted(block_counts)
+    assert block_counts[0] < block_counts[-1]
+
+
+def test_run_benchmarks_covers_every_hot_path():
+    report = run_benchmarks(pattern="[small]", min_time=0.001, repeat=1)
+
+    assert set(report["results"]) == {
+        "validator.validate[small]",
+        "rule_engine.run[small]",
+        "inspect_python_code[small]",
+        "collect_hints_from_markdown_sections[small]",
+        "render_blocks_to_markdown[small]",
+        "lesson_run.construct[small]",
+        "lesson_run.to_mongo[small]",
+    }
+    assert all(result["median_us"] > 0 for result in report["results"].values())
+
+
+def test_measure_autoranges_loops():
+    result = measure(lambda: None, min_time=0.001, repeat=2)
+
+    assert result["loops"] > 1
+    assert result["best_us"] <= result["mean_us"]
+
+
+def test_compare_flags_median_slowdowns():
+    baseline = {"results": {"a": {"median_us": 10.0}, "b": {"median_us": 10.0}}}
+    candidate = {"results": {"a": {"median_us": 10.5}, "b": {"median_us": 13.0}, "new": {"median_us": 1.0}}}
+
+    result = compare_reports(baseline, candidate, threshold=0.15)
+
+    assert result["regressions"] == ["b"]
+    assert set(result["changes"]) == {"a", "b"}
@@ -0,0 +1,164 @@
+# Overload shedding tests
+import asyncio
+
+import pytest
+
+from app.core import config
+from app.models.api import LessonRequest
+from app.services import lesson_service, mongo
+from app.services.background import background_pool
+from app.services.overload import OverloadController
+from app.mcp import python_code_hints  # noqa: F401
+
+pytestmark = pytest.mark.unit
+
+
+class FakeClock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeLimiter:
+    def __init__(self) -> None:
+        self.in_flight = 0
+        self.queue_length = 0
+        self.latencies: list[float] = []
+
+    def recent_latencies(self, window_seconds: float) -> list[float]:
+        return list(self.latencies)
+
+
+class FakeMonitor:
+    current_lag = 0.0
+
+
+class FixedController:
+    def __init__(self, reason):
+        self.reason = reason
+
+    def evaluate(self):
+        return self.reason
+
+
+def _controller(limiter, monitor=None, clock=None):
+    return OverloadController(
+        monitor=monitor or FakeMonitor(),
+        limiter_factory=lambda: limiter,
+        clock=clock or FakeClock(),
+    )
+
+
+def test_controller_degrades_on_in_flight_and_recovers_with_hysteresis(monkeypatch):
+    monkeypatch.setattr(config, "OVERLOAD_LLM_IN_FLIGHT", 10)
+    monkeypatch.setattr(config, "OVERLOAD_RECOVERY_RATIO", 0.5)
+    monkeypatch.setattr(config, "OVERLOAD_RECOVERY_SECONDS", 5.0)
+    limiter = FakeLimiter()
+    clock = FakeClock()
+    controller = _controller(limiter, clock=clock)
+
+    assert controller.evaluate() is None
+
+    limiter.in_flight = 8
+    limiter.queue_length = 2
+    assert controller.evaluate() == "llm_in_flight"
+
+    # Below threshold but above the recovery ratio: still degraded
+    limiter.queue_length = 0
+    limiter.in_flight = 7
+    clock.now = 100.0
+    assert controller.evaluate() == "llm_in_flight"
+
+    limiter.in_flight = 2
+    clock.now = 101.0
+    assert controller.evaluate() == "llm_in_flight"
+    clock.now = 106.0
+    assert controller.evaluate() is None
+
+
+def test_controller_uses_rolling_latency_p95(monkeypatch):
+    monkeypatch.setattr(config, "OVERLOAD_LLM_LATENCY_SECONDS", 20.0)
+    limiter = FakeLimiter()
+    controller = _controller(limiter)
+
+    limiter.latencies = [25.0] * 4
+    assert controller.evaluate() is None
+
+    limiter.latencies = [25.0] * 6
+    assert controller.evaluate() == "llm_latency_p95"
+
+
+def test_controller_watches_event_loop_lag(monkeypatch):
+    monkeypatch.setattr(config, "OVERLOAD_LOOP_LAG_SECONDS", 0.2)
+    monitor = FakeMonitor()
+    monitor.current_lag = 0.3
+    controller = _controller(FakeLimiter(), monitor=monitor)
+
+    assert controller.evaluate() == "loop_lag"
+
+
+def test_controller_disabled_never_degrades(monkeypatch):
+    monkeypatch.setattr(config, "OVERLOAD_SHEDDING_ENABLED", False)
+    limiter = FakeLimiter()
+    limiter.in_flight = 10_000
+    controller = _controller(limiter)
+
+    assert controller.evaluate() is None
+
+
+def test_generate_lesson_serves_static_lesson_when_overloaded(monkeypatch):
+    class ExplodingContent:
+        async def generate(self, topic: str, level: str, planned_sections):
+            raise AssertionError("LLM must not be called while degraded.")
+
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", True)
+    monkeypatch.setattr(config, "OVERLOAD_FALLBACK", "static")
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    monkeypatch.setattr(lesson_service, "content_agent", ExplodingContent())
+    monkeypatch.setattr(lesson_service, "overload_controller", FixedController("llm_in_flight"))
+    mongo.reset_memory_store()
+
+    request = LessonRequest(topic="Pandas groupby performance", level="beginner")
+    response = asyncio.run(lesson_service.generate_lesson(request))
+
+    assert response.degraded is True
+    assert "Beginner focus" in response.sections[0].content_markdown
+    background_pool.drain()
+    run = mongo.get_memory_runs()[-1]
+    assert run["degraded"] is True
+    assert run["degraded_reason"] == "llm_in_flight"
+
+
+def test_generate_lesson_serves_stub_content_when_overloaded(monkeypatch):
+    class ExplodingContent:
+        async def generate(self, topic: str, level: str, planned_sections):
+            raise AssertionError("LLM must not be called while degraded.")
+
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", True)
+    monkeypatch.setattr(config, "OVERLOAD_FALLBACK", "stub")
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    monkeypatch.setattr(lesson_service, "content_agent", ExplodingContent())
+    monkeypatch.setattr(lesson_service, "overload_controller", FixedController("loop_lag"))
+    mongo.reset_memory_store()
+
+    request = LessonRequest(topic="vector databases", level="beginner")
+    response = asyncio.run(lesson_service.generate_lesson(request))
+
+    assert response.degraded is True
+    assert "key ideas behind vector databases" in response.sections[0].content_markdown
+    background_pool.drain()
+    assert mongo.get_memory_runs()[-1]["degraded_reason"] == "loop_lag"
+
+
+def test_generate_lesson_full_mode_is_not_degraded(monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    mongo.reset_memory_store()
+
+    request = LessonRequest(topic="vector databases", level="beginner")
+    response = asyncio.run(lesson_service.generate_lesson(request))
+
+    assert response.degraded is False
+    background_pool.drain()
+    assert "degraded" not in mongo.get_memory_runs()[-1]
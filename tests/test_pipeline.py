@@ -0,0 +1,193 @@
+# Stage graph executor tests
+import asyncio
+import time
+
+import pytest
+
+from app.models.api import LessonRequest
+from app.services import lesson_service
+from app.services.background import background_pool
+from app.services.lesson_service import build_lesson_graph
+from app.services.pipeline import (
+    PipelineContext,
+    RetryPolicy,
+    Stage,
+    StageGraph,
+    StageTimeoutError,
+)
+
+pytestmark = pytest.mark.unit
+
+
+def _sleeper(value, seconds=0.1):
+    async def run(ctx):
+        await asyncio.sleep(seconds)
+        return value
+
+    return run
+
+
+def test_independent_stages_run_concurrently():
+    graph = StageGraph(
+        [
+            Stage("source", lambda ctx: 1),
+            Stage("left", _sleeper("l"), after=("source",)),
+            Stage("right", _sleeper("r"), after=("source",)),
+            Stage(
+                "join",
+                lambda ctx: ctx.results["left"] + ctx.results["right"],
+                after=("left", "right"),
+            ),
+        ]
+    )
+    ctx = PipelineContext()
+
+    started = time.perf_counter()
+    asyncio.run(graph.run(ctx))
+    elapsed = time.perf_counter() - started
+
+    assert ctx.results["join"] == "lr"
+    assert elapsed < 0.18
+    assert set(ctx.stage_ms()) == {"source", "left", "right", "join"}
+    assert ctx.timings["left"]["status"] == "ok"
+
+
+def test_stage_timeout_raises_and_is_recorded():
+    graph = StageGraph([Stage("slow", _sleeper("x", seconds=1), timeout=0.01)])
+    ctx = PipelineContext()
+
+    with pytest.raises(StageTimeoutError) as exc_info:
+        asyncio.run(graph.run(ctx))
+
+    assert exc_info.value.stage == "slow"
+    assert ctx.timings["slow"]["status"] == "timed_out"
+
+
+def test_retry_rewinds_to_upstream_stage():
+    calls: list[str] = []
+    retried: list[int] = []
+
+    def produce(ctx):
+        calls.append("produce")
+        return ctx.attempts["produce"]
+
+    def check(ctx):
+        calls.append("check")
+        if ctx.results["produce"] < 2:
+            raise ValueError("bad output")
+        return "ok"
+
+    policy = RetryPolicy(
+        max_attempts=2,
+        retry_on=(ValueError,),
+        rewind_to="produce",
+        on_retry=lambda ctx, exc, attempt: retried.append(attempt),
+    )
+    graph = StageGraph(
+        [
+            Stage("produce", produce, retry=policy),
+            Stage("check", check, after=("produce",), retry=policy),
+        ]
+    )
+    ctx = PipelineContext()
+
+    asyncio.run(graph.run(ctx))
+
+    assert calls == ["produce", "check", "produce", "check"]
+    assert retried == [1]
+    assert ctx.attempts["produce"] == 2
+    assert ctx.results["check"] == "ok"
+
+
+def test_retry_budget_is_shared_across_the_rewind_segment():
+    def check(ctx):
+        raise ValueError("always bad")
+
+    policy = RetryPolicy(max_attempts=2, retry_on=(ValueError,), rewind_to="produce")
+    graph = StageGraph(
+        [
+            Stage("produce", lambda ctx: None, retry=policy),
+            Stage("check", check, after=("produce",), retry=policy),
+        ]
+    )
+    ctx = PipelineContext()
+
+    with pytest.raises(ValueError):
+        asyncio.run(graph.run(ctx))
+    assert ctx.attempts == {"produce": 2, "check": 2}
+
+
+def test_background_stages_run_after_submit_and_skip_on_failure():
+    def boom(ctx):
+        raise RuntimeError("down")
+
+    graph = StageGraph(
+        [
+            Stage("respond", lambda ctx: "body"),
+            Stage("hints", boom, background=True),
+            Stage("record", lambda ctx: "written", after=("hints",), background=True),
+            Stage("audit", lambda ctx: ctx.results["respond"], background=True),
+        ]
+    )
+    ctx = PipelineContext()
+
+    asyncio.run(graph.run(ctx))
+    assert "audit" not in ctx.results
+
+    graph.submit_background(ctx)
+    background_pool.drain()
+
+    assert ctx.timings["hints"]["status"] == "failed"
+    assert ctx.timings["record"]["status"] == "skipped"
+    assert ctx.results["audit"] == "body"
+
+
+def test_graph_rejects_cycles_and_foreground_on_background():
+    with pytest.raises(ValueError):
+        StageGraph(
+            [
+                Stage("a", lambda ctx: 1, after=("b",)),
+                Stage("b", lambda ctx: 1, after=("a",)),
+            ]
+        )
+    with pytest.raises(ValueError):
+        StageGraph(
+            [
+                Stage("bg", lambda ctx: 1, background=True),
+                Stage("fg", lambda ctx: 1, after=("bg",)),
+            ]
+        )
+
+
+def test_lesson_graph_runs_rule_outcomes_after_the_response(monkeypatch):
+    stages = {entry["name"]: entry for entry in build_lesson_graph(static_mode=False).describe()}
+
+    assert stages["render"]["after"] == ["validate"]
+    assert stages["rule_outcomes"]["after"] == ["validate"]
+    assert stages["rule_outcomes"]["background"] is True
+    assert stages["mcp_hints"]["after"] == ["rule_outcomes"]
+    assert stages["generate"]["max_attempts"] == 2
+    assert stages["telemetry"]["background"] is True
+    assert [entry["name"] for entry in build_lesson_graph(static_mode=True).describe()] == [
+        "static_lesson",
+        "mcp_hints",
+        "telemetry",
+    ]
+
+    # The runtime smoke test needs the main thread (SIGALRM), so it stays inline
+    monkeypatch.setattr(lesson_service.validator_agent, "_runtime_smoke_test_enabled", True)
+    stages = {entry["name"]: entry for entry in build_lesson_graph(static_mode=False).describe()}
+    assert stages["rule_outcomes"]["background"] is False
+    assert stages["rule_outcomes"]["offload"] is False
+
+
+def test_repair_log_reports_the_policy_attempt_budget(monkeypatch):
+    policy = build_lesson_graph(static_mode=False).stages["generate"].retry
+    logged: list[dict] = []
+    monkeypatch.setattr(lesson_service.logger, "info", lambda event, extra: logged.append(extra))
+    ctx = PipelineContext(state={"request": LessonRequest(topic="python loops", level="beginner"), "session_id": "s"})
+
+    policy.on_retry(ctx, ValueError("bad lesson"), 1)
+
+    assert logged[0]["max_attempts"] == policy.max_attempts
+    assert ctx.state["prior_error_summary"] == "bad lesson"
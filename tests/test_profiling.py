@@ -0,0 +1,89 @@
+# Opt-in per-request profiling tests
+import asyncio
+import pstats
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import config, metrics, profiling
+from app.main import app
+from app.models.api import LessonRequest
+from app.services import lesson_service, mongo
+from app.services.background import background_pool
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def profiling_config(monkeypatch, tmp_path):
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", False)
+    monkeypatch.setattr(config, "STATIC_LESSON_MODE", False)
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    monkeypatch.setattr(config, "PROFILING_DIR", str(tmp_path))
+    monkeypatch.setattr(config, "PROFILING_ADMIN_TOKEN", "s3cret")
+    monkeypatch.setattr(config, "PROFILING_SAMPLE_RATE", 0.0)
+    mongo.reset_memory_store()
+    return tmp_path
+
+
+def test_should_profile_requires_the_admin_token_or_sampling(monkeypatch, profiling_config):
+    assert profiling.should_profile("s3cret") is True
+    assert profiling.should_profile("wrong") is False
+    assert profiling.should_profile(None) is False
+    # compare_digest rejects non-ASCII str; the header must not turn into a 500
+    assert profiling.should_profile("café") is False
+
+    monkeypatch.setattr(config, "PROFILING_ADMIN_TOKEN", "")
+    assert profiling.should_profile("") is False
+
+    monkeypatch.setattr(config, "PROFILING_SAMPLE_RATE", 1.0)
+    assert profiling.should_profile(None) is True
+
+
+def test_profiled_run_writes_profile_linked_from_telemetry(profiling_config):
+    request = LessonRequest(topic="pandas groupby", level="beginner")
+
+    asyncio.run(lesson_service.generate_lesson(request, profile=True))
+    background_pool.drain()
+
+    run = mongo.get_memory_runs()[-1]
+    profile_file = profiling_config / f"{run['run_id']}.prof"
+    assert run["profile_path"] == str(profile_file)
+    stats = pstats.Stats(str(profile_file))
+    assert any(func_name == "_generate_lesson" for _, _, func_name in stats.stats)
+
+
+def test_unprofiled_run_has_no_profile(profiling_config):
+    request = LessonRequest(topic="pandas groupby", level="beginner")
+
+    asyncio.run(lesson_service.generate_lesson(request))
+    background_pool.drain()
+
+    assert "profile_path" not in mongo.get_memory_runs()[-1]
+    assert list(profiling_config.iterdir()) == []
+
+
+def test_admin_header_profiles_the_request(profiling_config):
+    client = TestClient(app)
+
+    response = client.post(
+        "/lesson",
+        json={"topic": "pandas groupby", "level": "beginner"},
+        headers={"X-Profile": "s3cret"},
+    )
+    background_pool.drain()
+
+    assert response.status_code == 200
+    assert len(list(profiling_config.glob("*.prof"))) == 1
+
+
+def test_concurrent_profile_is_skipped(profiling_config):
+    metrics.reset_metrics()
+
+    with profiling.profile_request("outer", enabled=True) as outer:
+        with profiling.profile_request("inner", enabled=True) as inner:
+            pass
+
+    assert outer is not None
+    assert inner is None
+    assert metrics.snapshot()["counters"]["profiling.skipped_busy"] == 1
@@ -13,6 +13,7 @@ from app.models.db import LessonRun
 from app.core import config
 from app.services import lesson_service
 from app.services import mongo
+from app.services.background import background_pool
 from app.services.lesson_service import generate_lesson
 from app.mcp import python_code_hints  # noqa: F401
 
@@ -65,6 +66,7 @@ def test_generate_lesson_static_mode_uses_template(monkeypatch):
     assert response.total_minutes == 15
     assert [section.minutes for section in response.sections] == [4, 7, 4]
     assert "groupby" in response.sections[1].content_markdown.lower()
+    background_pool.drain()
     assert mongo.get_memory_runs()
 
 
@@ -90,6 +92,7 @@ def test_generate_lesson_static_mode_invokes_mcp_tool(monkeypatch):
 
     response = asyncio.run(generate_lesson(request))
     expected = build_static_lesson(request.topic, request.level)
+    background_pool.drain()
 
     assert calls
     assert calls[0]["name"] == "python_code_hints"
@@ -126,6 +129,7 @@ def test_generate_lesson_records_system_observations_for_environment_mcp_hints(m
     )
 
     _ = asyncio.run(generate_lesson(request))
+    background_pool.drain()
 
     runs = mongo.get_memory_runs()
     assert runs
@@ -150,6 +154,7 @@ def test_generate_lesson_records_mcp_summary(monkeypatch, static_mode):
     response = asyncio.run(generate_lesson(request))
 
     assert response.sections
+    background_pool.drain()
     runs = mongo.get_memory_runs()
     assert runs
     assert "mcp_summary" in runs[-1]
@@ -202,6 +207,25 @@ def test_lesson_run_validation_accepts_valid_payload():
     assert lesson_run.level == "beginner"
 
 
+def test_lesson_run_validation_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_VALIDATION_ENABLED", False)
+
+    lesson_run = LessonRun(
+        run_id="run-789",
+        session_id="session-789",
+        topic="vector databases",
+        level="expert",
+        created_at=datetime(2024, 1, 1, tzinfo=timezone.utc),
+        attempt_count=1,
+        total_minutes=15,
+        objective="Learn vector databases.",
+        section_ids=["concept"],
+    )
+
+    assert lesson_run.to_mongo()["level"] == "expert"
+    assert not hasattr(lesson_run, "__dict__")
+
+
 def _make_validation_error() -> ValidationError:
     class DummyModel(BaseModel):
         value: int
@@ -247,6 +271,7 @@ def test_generate_lesson_persists_schema_failure(monkeypatch):
     with pytest.raises(ValidationError):
         asyncio.run(lesson_service.generate_lesson(request))
 
+    background_pool.drain()
     assert insert_failure.called
     failure_doc = insert_failure.call_args[0][0]
     assert failure_doc["error_type"] == "schema_validation"
@@ -302,6 +327,7 @@ def test_generate_lesson_persists_content_failure(monkeypatch):
     with pytest.raises(ValueError):
         asyncio.run(lesson_service.generate_lesson(request))
 
+    background_pool.drain()
     assert insert_failure.called
     failure_doc = insert_failure.call_args[0][0]
     assert failure_doc["error_type"] == "content_validation"
@@ -434,6 +460,7 @@ def test_generate_lesson_records_attempts_on_retry_exhaustion(monkeypatch):
     with pytest.raises(ValueError):
         asyncio.run(lesson_service.generate_lesson(request))
 
+    background_pool.drain()
     assert dummy_content.calls == 1
     assert dummy_content.repair_calls == 1
     assert insert_failure.called
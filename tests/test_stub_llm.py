@@ -0,0 +1,104 @@
+# OpenAI-compatible stub LLM server tests
+import asyncio
+import random
+
+import httpx
+import pytest
+from fastapi.testclient import TestClient
+from openai import AsyncOpenAI
+from pydantic import ValidationError
+from pydantic_ai import Agent
+from pydantic_ai.exceptions import ModelHTTPError
+from pydantic_ai.models.openai import OpenAIChatModel
+from pydantic_ai.providers.openai import OpenAIProvider
+
+from app.agents import content_llm
+from app.agents.content_llm import ContentAgentLLM
+from app.agents.planner import PlannerAgent
+from app.core import config
+from app.services.llm_limiter import LLMLimiter
+from bench.stub_llm import StubSettings, create_app, parse_latency
+
+pytestmark = pytest.mark.unit
+
+
+def _llm_against(stub_settings: StubSettings) -> ContentAgentLLM:
+    """ContentAgentLLM wired to the stub through the real OpenAI client (in-process)."""
+    client = AsyncOpenAI(
+        base_url="http://stub/v1",
+        api_key="stub",
+        max_retries=0,
+        http_client=httpx.AsyncClient(transport=httpx.ASGITransport(app=create_app(stub_settings))),
+    )
+    agent = ContentAgentLLM.__new__(ContentAgentLLM)
+    agent.agent = Agent(
+        model=OpenAIChatModel(config.MODEL, provider=OpenAIProvider(openai_client=client)),
+        system_prompt="stub",
+        output_type=content_llm._output_type(),
+        output_retries=0,
+    )
+    agent._limiter = LLMLimiter()
+    return agent
+
+
+def _generate(agent: ContentAgentLLM):
+    planned = PlannerAgent().plan("pandas groupby", "beginner")
+    return asyncio.run(agent.generate("pandas groupby", "beginner", planned))
+
+
+def test_parse_latency_distributions():
+    rng = random.Random(1)
+
+    assert parse_latency("fixed:0.25")(rng) == 0.25
+    assert 0.1 <= parse_latency("uniform:0.1,0.2")(rng) <= 0.2
+    assert parse_latency("normal:0,0.001")(rng) >= 0.0
+    assert parse_latency("lognormal:1.0,0.5")(rng) > 0.0
+    with pytest.raises(ValueError):
+        parse_latency("gamma:1,2")
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+@pytest.mark.parametrize("output_mode", ["native", "text"])
+def test_content_agent_generates_against_stub(monkeypatch, streaming, output_mode):
+    monkeypatch.setattr(config, "LLM_STREAMING_ENABLED", streaming)
+    monkeypatch.setattr(config, "LLM_OUTPUT_MODE", output_mode)
+
+    sections = _generate(_llm_against(StubSettings(chunk_chars=32)))
+
+    assert [s.id for s in sections] == [s.id for s in PlannerAgent().plan("pandas groupby", "beginner")]
+
+
+def test_injected_429_reaches_the_client_with_retry_after():
+    client = TestClient(create_app(StubSettings(rate_429=1.0, retry_after=2.5)))
+
+    response = client.post("/v1/chat/completions", json={"model": "stub", "messages": []})
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "2.5"
+    assert client.get("/stub/stats").json() == {"requests": 1, "injected_429": 1}
+
+
+def test_injected_500_surfaces_as_model_http_error(monkeypatch):
+    monkeypatch.setattr(config, "LLM_STREAMING_ENABLED", False)
+
+    with pytest.raises(ModelHTTPError) as exc_info:
+        _generate(_llm_against(StubSettings(rate_500=1.0)))
+
+    assert exc_info.value.status_code == 500
+
+
+def test_injected_malformed_json_fails_parsing(monkeypatch):
+    monkeypatch.setattr(config, "LLM_STREAMING_ENABLED", False)
+    monkeypatch.setattr(config, "LLM_OUTPUT_MODE", "text")
+
+    with pytest.raises(ValidationError):
+        _generate(_llm_against(StubSettings(rate_malformed=1.0, seed=3)))
+
+
+def test_llm_base_url_builds_openai_compatible_model(monkeypatch):
+    monkeypatch.setattr(config, "LLM_BASE_URL", "http://127.0.0.1:9100/v1")
+
+    model = content_llm._model()
+
+    assert isinstance(model, OpenAIChatModel)
+    assert str(model.client.base_url).startswith("http://127.0.0.1:9100/v1")
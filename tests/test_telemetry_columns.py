@@ -0,0 +1,122 @@
+# Columnar telemetry store and stats endpoint tests
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import config
+from app.main import app
+from app.mcp import python_code_hints  # noqa: F401
+from app.models.api import LessonRequest
+from app.services import lesson_service, mongo
+from app.services.background import background_pool
+from app.services.telemetry_columns import ColumnarTelemetryStore
+
+pytestmark = pytest.mark.unit
+
+START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _run(index: int, *, topic: str, latency_ms: float, codes: list[str], level: str = "beginner") -> dict:
+    return {
+        "run_id": str(index),
+        "topic": topic,
+        "level": level,
+        "created_at": START + timedelta(seconds=index),
+        "attempt_count": 1 + index % 2,
+        "hint_summary": {"rule_hints": len(codes), "runtime_errors": 0, "mcp_explanations": 0},
+        "rule_hints": [{"outcomes": [{"code": code} for code in codes]}] if codes else [],
+        "timings": {"response_ms": latency_ms},
+    }
+
+
+def _fill(store: ColumnarTelemetryStore, count: int) -> None:
+    for index in range(count):
+        store.append(
+            _run(
+                index,
+                topic=f"topic {index % 3}",
+                latency_ms=float(index + 1),
+                codes=["unused_result"] + (["bare_except"] if index % 5 == 0 else []),
+                level="beginner" if index % 4 else "intermediate",
+            )
+        )
+
+
+def test_window_stats_match_across_segment_boundaries():
+    store = ColumnarTelemetryStore(segment_size=8)
+    _fill(store, 100)
+
+    window = {
+        "since": (START + timedelta(seconds=10)).timestamp(),
+        "until": (START + timedelta(seconds=90)).timestamp(),
+    }
+    stats = store.stats(**window)
+    unsegmented = ColumnarTelemetryStore(segment_size=1000)
+    _fill(unsegmented, 100)
+
+    assert stats == unsegmented.stats(**window)
+    assert stats["runs"] == 80
+    assert {row["topic"]: row["count"] for row in stats["topics"]} == {"topic 0": 26, "topic 1": 27, "topic 2": 27}
+    assert stats["levels"] == {"beginner": 60, "intermediate": 20}
+    assert stats["hints"]["codes"] == [{"code": "unused_result", "count": 80}, {"code": "bare_except", "count": 16}]
+    assert stats["attempts"] == {"mean": 1.5, "max": 2}
+
+
+def test_hint_codes_count_rule_outcomes_only():
+    store = ColumnarTelemetryStore()
+    summary_tier = _run(0, topic="t", latency_ms=1.0, codes=[])
+    summary_tier["rule_summary"] = {"by_code": {"unused_result": 2}}
+    without_rules = _run(1, topic="t", latency_ms=1.0, codes=[])
+    without_rules["mcp_hints"] = [{"hints": [{"code": "mcp_explanation"}]}]
+    store.append(summary_tier)
+    store.append(without_rules)
+
+    assert store.stats()["hints"]["codes"] == [{"code": "unused_result", "count": 2}]
+
+
+def test_latency_percentiles_are_within_bucket_error():
+    store = ColumnarTelemetryStore()
+    _fill(store, 1000)
+
+    latency = store.stats()["latency_ms"]
+
+    for name, exact in (("p50", 500), ("p90", 900), ("p99", 990)):
+        assert latency[name] == pytest.approx(exact, rel=0.02)
+
+
+def test_oldest_segments_are_dropped_past_the_cap(monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_COLUMNS_MAX_RECORDS", 40)
+    store = ColumnarTelemetryStore(segment_size=8)
+
+    _fill(store, 100)
+
+    stats = store.stats()
+    assert len(store) <= 40
+    assert stats["runs"] == len(store)
+    assert store.stats(until=(START + timedelta(seconds=60)).timestamp())["runs"] < 60
+
+
+def test_stats_endpoint_reports_demo_runs(monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    monkeypatch.setattr(config, "STATIC_LESSON_MODE", False)
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", False)
+    monkeypatch.setattr(config, "TELEMETRY_ADMIN_TOKEN", "s3cret")
+    mongo.reset_memory_store()
+
+    for topic in ("pandas groupby", "pandas groupby", "numpy"):
+        asyncio.run(lesson_service.generate_lesson(LessonRequest(topic=topic, level="beginner")))
+    background_pool.drain()
+
+    body = (
+        TestClient(app)
+        .get("/telemetry/stats", params={"window_seconds": 60}, headers={"X-Admin-Token": "s3cret"})
+        .json()
+    )
+
+    assert body["enabled"] is True
+    assert body["runs"] == 3
+    assert body["topics"][0] == {"topic": "pandas groupby", "count": 2}
+    assert body["levels"]["beginner"] == 3
+    assert body["latency_ms"]["p50"] is not None
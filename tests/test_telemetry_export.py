@@ -0,0 +1,145 @@
+# Streaming telemetry export tests
+import asyncio
+import gzip
+import io
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core import config
+from app.main import app
+from app.mcp import python_code_hints  # noqa: F401
+from app.models.api import LessonRequest
+from app.services import lesson_service, mongo, telemetry_export
+from app.services.background import background_pool
+
+pytestmark = pytest.mark.unit
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+        self.closed = False
+
+    def __iter__(self):
+        return iter(self.docs)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+
+    def find(self, query, projection=None, batch_size=None):
+        self.calls.append({"query": query, "projection": projection, "batch_size": batch_size})
+        return FakeCursor(self.docs)
+
+
+@pytest.fixture
+def memory_runs(monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    monkeypatch.setattr(config, "STATIC_LESSON_MODE", False)
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", False)
+    mongo.reset_memory_store()
+    for topic in ("pandas groupby", "numpy broadcasting", "python loops"):
+        asyncio.run(lesson_service.generate_lesson(LessonRequest(topic=topic, level="beginner")))
+    background_pool.drain()
+
+
+def test_flatten_spreads_summaries_into_columns():
+    row = telemetry_export.flatten(
+        "runs",
+        {
+            "run_id": "r1",
+            "hint_summary": {"rule_hints": 2, "runtime_errors": 0, "mcp_explanations": 1},
+            "rule_summary": {"total_outcomes": 2, "by_code": {"unused": 2}},
+            "timings": {"response_ms": 12.5},
+            "degraded": True,
+            "rule_hints": [{"outcomes": []}],
+        },
+    )
+
+    assert row["hint_summary_rule_hints"] == 2
+    assert row["rule_summary_total_outcomes"] == 2
+    assert json.loads(row["rule_summary_by_code"]) == {"unused": 2}
+    assert row["mcp_summary_total_hints"] is None
+    assert row["response_ms"] == 12.5
+    assert row["degraded"] is True
+    assert json.loads(row["rule_hints"]) == [{"outcomes": []}]
+    assert list(row) == [column for column, _type in telemetry_export.COLUMNS["runs"]]
+
+
+def test_parquet_export_writes_one_row_group_per_batch(memory_runs):
+    pq = pytest.importorskip("pyarrow.parquet")
+    out = io.BytesIO()
+
+    telemetry_export.export("runs", "parquet", out, batch_size=2)
+
+    parquet = pq.ParquetFile(io.BytesIO(out.getvalue()))
+    assert parquet.metadata.num_rows == 3
+    assert parquet.metadata.num_row_groups == 2
+    table = parquet.read()
+    assert sorted(table.column("topic").to_pylist()) == ["numpy broadcasting", "pandas groupby", "python loops"]
+    assert table.column("hint_summary_rule_hints").type == "int64"
+    assert table.column("created_at").type.tz == "UTC"
+
+
+def test_jsonl_export_filters_by_time_window(memory_runs):
+    out = io.BytesIO()
+    now = datetime.now(timezone.utc)
+
+    telemetry_export.export("runs", "jsonl", out, since=now - timedelta(minutes=5))
+    rows = [json.loads(line) for line in gzip.decompress(out.getvalue()).splitlines()]
+    assert len(rows) == 3
+    assert "hint_summary_mcp_explanations" in rows[0]
+
+    empty = io.BytesIO()
+    telemetry_export.export("runs", "jsonl", empty, since=(now + timedelta(minutes=5)).replace(tzinfo=None))
+    assert gzip.decompress(empty.getvalue()) == b""
+
+
+def test_mongo_export_uses_batched_cursor(monkeypatch, tmp_path):
+    docs = [{"run_id": f"r{i}", "topic": "t", "created_at": datetime(2024, 1, 1)} for i in range(5)]
+    collection = FakeCollection(docs)
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "mongo")
+    monkeypatch.setattr(mongo, "get_collection", lambda: collection)
+    out = tmp_path / "runs.jsonl.gz"
+
+    assert telemetry_export.main(["runs", "--format", "jsonl", "--out", str(out), "--since", "2023-12-31", "--batch-size", "2"]) == 0
+
+    assert [json.loads(line)["run_id"] for line in gzip.decompress(out.read_bytes()).splitlines()] == [
+        f"r{i}" for i in range(5)
+    ]
+    call = collection.calls[0]
+    assert call["batch_size"] == 2
+    assert call["projection"] == {"_id": False}
+    assert call["query"]["created_at"]["$gte"] == datetime(2023, 12, 31, tzinfo=timezone.utc)
+
+
+def test_export_endpoint_streams_attachment(memory_runs, monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_ADMIN_TOKEN", "s3cret")
+    response = TestClient(app).get(
+        "/telemetry/export/runs", params={"format": "jsonl"}, headers={"X-Admin-Token": "s3cret"}
+    )
+
+    assert response.status_code == 200
+    assert response.headers["content-disposition"] == 'attachment; filename="runs.jsonl.gz"'
+    assert len(gzip.decompress(response.content).splitlines()) == 3
+
+
+@pytest.mark.parametrize("path", ["/telemetry/export/runs", "/telemetry/stats", "/telemetry/rollups"])
+def test_telemetry_routes_require_the_admin_token(monkeypatch, path):
+    client = TestClient(app)
+
+    monkeypatch.setattr(config, "TELEMETRY_ADMIN_TOKEN", "")
+    assert client.get(path, headers={"X-Admin-Token": ""}).status_code == 403
+
+    monkeypatch.setattr(config, "TELEMETRY_ADMIN_TOKEN", "s3cret")
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get(path, headers={"X-Admin-Token": "caf\xe9".encode("latin-1")}).status_code == 403
@@ -0,0 +1,124 @@
+# Failure coalescing tests
+import random
+import threading
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock
+
+import pytest
+
+from app.core import config, metrics
+from app.models.api import LessonRequest
+from app.services import lesson_service, telemetry_rollups
+from app.services.background import background_pool
+from app.services.telemetry_failures import FailureAggregator, failure_aggregator
+
+pytestmark = pytest.mark.unit
+
+START = datetime(2024, 6, 1, 10, tzinfo=timezone.utc)
+
+
+def _failure(second: int, *, session: str = "s", error_type: str = "APIConnectionError", topic: str = "python loops") -> dict:
+    return {
+        "run_id": f"r{second}",
+        "session_id": session,
+        "topic": topic,
+        "level": "beginner",
+        "created_at": START + timedelta(seconds=second),
+        "error_type": error_type,
+        "error_message": "Connection error.",
+        "error_details": [{"retry": 1}],
+    }
+
+
+@pytest.fixture(autouse=True)
+def window(monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_FAILURE_WINDOW_SECONDS", 10.0)
+    monkeypatch.setattr(config, "TELEMETRY_FAILURE_SAMPLE_SESSIONS", 3)
+    monkeypatch.setattr(config, "TELEMETRY_FAILURE_MAX_GROUPS", 1000)
+    metrics.reset_metrics()
+
+
+def test_burst_is_written_as_first_failure_plus_one_summary():
+    aggregator = FailureAggregator(rng=random.Random(7))
+    admitted = [
+        aggregator.admit(_failure(i % 10, session=f"s{i}"), now=START + timedelta(seconds=i / 20))
+        for i in range(100)
+    ]
+    written = []
+
+    assert admitted == [True] + [False] * 99
+    assert aggregator.flush(written.append, now=START + timedelta(seconds=9)) == 0
+    assert aggregator.flush(written.append, now=START + timedelta(seconds=10)) == 1
+
+    (summary,) = written
+    assert summary["count"] == 99
+    assert summary["first_seen"] == START + timedelta(seconds=1)
+    assert summary["last_seen"] == START + timedelta(seconds=9)
+    assert summary["created_at"] == summary["first_seen"]
+    assert summary["error_details"] is None
+    assert len(summary["session_ids"]) == 3
+    assert set(summary["session_ids"]) <= {f"s{i}" for i in range(1, 100)}
+    assert summary["session_id"] == summary["session_ids"][0]
+    assert metrics.snapshot()["counters"]["telemetry.failures_coalesced"] == 99
+    assert len(aggregator) == 0
+
+
+def test_distinct_failures_are_not_coalesced():
+    aggregator = FailureAggregator()
+
+    assert aggregator.admit(_failure(0), now=START)
+    assert aggregator.admit(_failure(0, error_type="RateLimitError"), now=START)
+    assert aggregator.admit(_failure(0, topic="pandas groupby"), now=START)
+    assert aggregator.flush(Mock(), now=START + timedelta(minutes=1)) == 0
+
+
+def test_new_window_keeps_the_previous_summary():
+    aggregator = FailureAggregator()
+    insert = Mock()
+    aggregator.admit(_failure(0), now=START)
+    aggregator.admit(_failure(1), now=START + timedelta(seconds=1))
+
+    # The window has expired but flush() has not run yet
+    assert aggregator.admit(_failure(12), now=START + timedelta(seconds=12))
+    assert aggregator.flush(insert, now=START + timedelta(seconds=13)) == 1
+    assert insert.call_args[0][0]["count"] == 1
+    assert len(aggregator) == 1
+
+
+def test_disabled_window_and_group_cap(monkeypatch):
+    aggregator = FailureAggregator()
+    monkeypatch.setattr(config, "TELEMETRY_FAILURE_WINDOW_SECONDS", 0.0)
+    assert all(aggregator.admit(_failure(0), now=START) for _ in range(3))
+
+    monkeypatch.setattr(config, "TELEMETRY_FAILURE_WINDOW_SECONDS", 10.0)
+    monkeypatch.setattr(config, "TELEMETRY_FAILURE_MAX_GROUPS", 1)
+    aggregator.admit(_failure(0), now=START)
+    assert aggregator.admit(_failure(0, topic="other"), now=START)
+    assert aggregator.admit(_failure(0, topic="other"), now=START)
+    assert len(aggregator) == 1
+
+
+def test_record_failure_writes_once_per_window_and_rollups_weight_counts(monkeypatch):
+    threads: list[str] = []
+    insert_failure = Mock(side_effect=lambda doc: threads.append(threading.current_thread().name))
+    monkeypatch.setattr(lesson_service, "insert_lesson_failure", insert_failure)
+    request = LessonRequest(topic="python loops", level="beginner")
+
+    for index in range(5):
+        lesson_service._record_failure(
+            session_id=f"session-{index}",
+            request=request,
+            error_type="APIConnectionError",
+            error_message="Connection error.",
+        )
+
+    background_pool.drain()
+    assert insert_failure.call_count == 1
+    # The leading failure is written by the background pool, not the caller
+    assert threads != [threading.current_thread().name]
+    written = [insert_failure.call_args[0][0]]
+    assert failure_aggregator.flush(written.append, force=True) == 1
+    assert written[1]["count"] == 4
+
+    rollups = telemetry_rollups.fold([], written)
+    assert sum(rollup.failures for (granularity, _start), rollup in rollups.items() if granularity == "hour") == 5
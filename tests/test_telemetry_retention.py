@@ -0,0 +1,163 @@
+# Telemetry index management and retention tests
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from pymongo.errors import ServerSelectionTimeoutError
+
+from app.core import config, metrics
+from app.services import mongo, telemetry_retention
+from app.services.background import background_pool
+
+pytestmark = pytest.mark.unit
+
+
+class FakeDatabase:
+    def __init__(self, collections):
+        self.collections = collections
+        self.commands = []
+
+    def command(self, name, target, **kwargs):
+        self.commands.append((name, target, kwargs))
+        index = self.collections[target].indexes[kwargs["index"]["name"]]
+        index["expireAfterSeconds"] = kwargs["index"]["expireAfterSeconds"]
+
+
+class FakeCollection:
+    """Index bookkeeping and update_many over in-memory documents."""
+
+    def __init__(self, name, docs=None):
+        self.name = name
+        self.docs = docs or []
+        self.indexes: dict = {"_id_": {"key": [("_id", 1)]}}
+        self.created = []
+        self.dropped = []
+        self.database = FakeDatabase({name: self})
+        self.available = True
+
+    def create_index(self, keys, name, **options):
+        self._check()
+        existing = self.indexes.get(name)
+        if existing is not None and existing.get("expireAfterSeconds") != options.get("expireAfterSeconds"):
+            raise AssertionError(f"index options conflict on {name}")
+        if existing is None:
+            self.created.append(name)
+        self.indexes[name] = {"key": list(keys), **options}
+        return name
+
+    def index_information(self):
+        self._check()
+        return {name: dict(info) for name, info in self.indexes.items()}
+
+    def drop_index(self, name):
+        self.dropped.append(name)
+        del self.indexes[name]
+
+    def update_many(self, query, update):
+        cutoff = query["created_at"]["$lt"]
+        modified = 0
+        for doc in self.docs:
+            if doc["created_at"] < cutoff and any(field in doc for field in telemetry_retention.DETAIL_FIELDS):
+                for field in update["$unset"]:
+                    doc.pop(field, None)
+                doc.update(update["$set"])
+                modified += 1
+        return SimpleNamespace(modified_count=modified)
+
+    def _check(self):
+        if not self.available:
+            raise ServerSelectionTimeoutError("mongo down")
+
+
+@pytest.fixture
+def collections(monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_RUN_TTL_DAYS", 0.0)
+    monkeypatch.setattr(config, "TELEMETRY_FAILURE_TTL_DAYS", 0.0)
+    monkeypatch.setattr(config, "TELEMETRY_DETAIL_TTL_DAYS", 0.0)
+    metrics.reset_metrics()
+    return FakeCollection("lesson_runs"), FakeCollection("lesson_failures")
+
+
+def test_ensure_indexes_is_idempotent(collections):
+    runs, failures = collections
+
+    telemetry_retention.ensure_indexes(runs, failures)
+    telemetry_retention.ensure_indexes(runs, failures)
+
+    assert sorted(runs.created) == ["created_at", "ingested_at", "run_id", "session_created_at", "topic_level_created_at"]
+    assert "error_type_created_at" in failures.created
+    assert runs.indexes["topic_level_created_at"]["key"] == [("topic", 1), ("level", 1), ("created_at", 1)]
+    assert runs.indexes["session_created_at"]["key"] == [("session_id", 1), ("created_at", 1)]
+    assert "expireAfterSeconds" not in runs.indexes["created_at"]
+    assert runs.dropped == []
+
+
+def test_ttl_changes_use_collmod_and_can_be_disabled(collections, monkeypatch):
+    runs, failures = collections
+    monkeypatch.setattr(config, "TELEMETRY_RUN_TTL_DAYS", 180.0)
+    monkeypatch.setattr(config, "TELEMETRY_FAILURE_TTL_DAYS", 90.0)
+
+    telemetry_retention.ensure_indexes(runs, failures)
+    assert runs.indexes["created_at"]["expireAfterSeconds"] == 180 * 86_400
+    assert failures.indexes["created_at"]["expireAfterSeconds"] == 90 * 86_400
+
+    monkeypatch.setattr(config, "TELEMETRY_RUN_TTL_DAYS", 30.0)
+    telemetry_retention.ensure_indexes(runs, failures)
+    assert runs.database.commands == [
+        ("collMod", "lesson_runs", {"index": {"name": "created_at", "expireAfterSeconds": 30 * 86_400}})
+    ]
+    assert failures.database.commands == []
+    assert runs.dropped == []
+
+    monkeypatch.setattr(config, "TELEMETRY_RUN_TTL_DAYS", 0.0)
+    telemetry_retention.ensure_indexes(runs, failures)
+    assert runs.dropped == ["created_at"]
+    assert "expireAfterSeconds" not in runs.indexes["created_at"]
+
+
+def test_hint_details_expire_before_summaries(collections, monkeypatch):
+    runs, _failures = collections
+    now = datetime(2024, 6, 1, tzinfo=timezone.utc)
+    detail = {"rule_hints": [{"outcomes": []}], "runtime_hints": [], "mcp_hints": [], "system_observations": []}
+    runs.docs = [
+        {"run_id": "old", "created_at": now - timedelta(days=20), "hint_summary": {"rule_hints": 1}, **detail},
+        {"run_id": "new", "created_at": now - timedelta(days=2), "hint_summary": {"rule_hints": 1}, **detail},
+    ]
+
+    assert telemetry_retention.prune_hint_details(runs, now=now) == 0
+
+    monkeypatch.setattr(config, "TELEMETRY_DETAIL_TTL_DAYS", 14.0)
+    assert telemetry_retention.prune_hint_details(runs, now=now) == 1
+    old, new = runs.docs
+    assert old == {"run_id": "old", "created_at": now - timedelta(days=20), "hint_summary": {"rule_hints": 1}, "details_pruned": True}
+    assert new["rule_hints"] == [{"outcomes": []}]
+    assert telemetry_retention.prune_hint_details(runs, now=now) == 0
+    assert metrics.snapshot()["counters"]["telemetry.details_pruned"] == 1
+
+
+def test_run_retention_swallows_mongo_errors(collections):
+    runs, failures = collections
+    runs.available = False
+
+    telemetry_retention.run_retention(runs, failures)
+
+    assert metrics.snapshot()["counters"]["telemetry.retention_failed"] == 1
+
+
+def test_retention_worker_only_starts_for_mongo(collections, monkeypatch):
+    runs, failures = collections
+    monkeypatch.setattr(mongo, "get_collection", lambda: runs)
+    monkeypatch.setattr(mongo, "get_failure_collection", lambda: failures)
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    mongo.start_retention_worker()
+    assert mongo._retention_worker is None
+
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "mongo")
+    mongo.start_retention_worker()
+    try:
+        assert mongo._retention_worker is not None
+        background_pool.drain()
+        assert "topic_level_created_at" in runs.indexes
+    finally:
+        mongo.stop_retention_worker()
+    assert mongo._retention_worker is None
@@ -0,0 +1,86 @@
+# In-memory telemetry ring buffer tests
+import threading
+
+import pytest
+
+from app.core import config, metrics
+from app.services import mongo
+from app.services.telemetry_ring import CHUNK_SIZE, TelemetryRing, approx_size
+
+pytestmark = pytest.mark.unit
+
+
+def test_count_cap_keeps_newest_records_across_chunks():
+    ring = TelemetryRing()
+
+    for index in range(CHUNK_SIZE * 3 + 5):
+        ring.append({"i": index}, max_records=CHUNK_SIZE + 10)
+
+    records = [doc["i"] for doc in ring]
+    assert len(ring) == CHUNK_SIZE + 10
+    assert records == list(range(CHUNK_SIZE * 2 - 5, CHUNK_SIZE * 3 + 5))
+    assert ring.evicted == CHUNK_SIZE * 2 - 5
+    assert ring.nbytes == sum(approx_size(doc) for doc in ring)
+
+
+def test_byte_budget_evicts_oldest_but_keeps_newest():
+    ring = TelemetryRing()
+    small = {"hints": "x" * 100}
+    budget = approx_size(small) * 3
+
+    for _ in range(5):
+        ring.append(dict(small), max_bytes=budget)
+    assert len(ring) == 3
+    assert ring.nbytes <= budget
+
+    ring.append({"hints": "x" * 10_000}, max_bytes=budget)
+    assert len(ring) == 1
+    assert len(next(iter(ring))["hints"]) == 10_000
+
+
+def test_snapshot_is_stable_while_appending():
+    ring = TelemetryRing()
+    for index in range(10):
+        ring.append({"i": index}, max_records=10)
+
+    snapshot = ring.snapshot()
+    for index in range(10, 10 + CHUNK_SIZE * 2):
+        ring.append({"i": index}, max_records=10)
+
+    assert [doc["i"] for doc in snapshot] == list(range(10))
+    assert [doc["i"] for doc in ring] == list(range(CHUNK_SIZE * 2, CHUNK_SIZE * 2 + 10))
+
+
+def test_concurrent_appends_respect_cap():
+    ring = TelemetryRing()
+
+    def writer(offset: int) -> None:
+        for index in range(500):
+            ring.append({"i": offset + index}, max_records=100)
+
+    threads = [threading.Thread(target=writer, args=(n * 1000,)) for n in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(ring) == 100
+    assert len(list(ring)) == 100
+    assert ring.evicted == 1900
+
+
+def test_memory_backend_uses_count_and_byte_caps(monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    monkeypatch.setattr(config, "TELEMETRY_MEMORY_CAP", 3)
+    monkeypatch.setattr(config, "TELEMETRY_MEMORY_MAX_BYTES", 0)
+    mongo.reset_memory_store()
+    metrics.reset_metrics()
+
+    for index in range(5):
+        mongo.insert_lesson_run({"run_id": str(index)})
+
+    assert [doc["run_id"] for doc in mongo.get_memory_runs()] == ["2", "3", "4"]
+    assert [doc["run_id"] for doc in mongo.iter_memory_runs()] == ["2", "3", "4"]
+    snapshot = metrics.snapshot()
+    assert snapshot["counters"]["telemetry.memory_evicted.runs"] == 2
+    assert snapshot["gauges"]["telemetry.memory_bytes.runs"] > 0
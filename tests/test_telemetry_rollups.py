@@ -0,0 +1,183 @@
+# Incremental telemetry rollup tests
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+from app.core import config, metrics
+from app.main import app
+from app.services import mongo, telemetry_rollups
+from app.services.telemetry_rollups import MongoRollupStore, Rollup
+
+pytestmark = pytest.mark.unit
+
+HOUR = datetime(2024, 6, 1, 10, tzinfo=timezone.utc)
+
+
+def _run(minute: int, *, latency_ms: float = 100.0, attempts: int = 1, codes: dict | None = None) -> dict:
+    return {
+        "run_id": f"r{minute}",
+        "created_at": HOUR + timedelta(minutes=minute),
+        "attempt_count": attempts,
+        "timings": {"response_ms": latency_ms},
+        "rule_summary": {"by_code": codes or {}},
+    }
+
+
+def _failure(minute: int, error_type: str = "TimeoutError") -> dict:
+    return {"run_id": f"f{minute}", "created_at": HOUR + timedelta(minutes=minute), "error_type": error_type}
+
+
+@pytest.fixture
+def memory_backend(monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    monkeypatch.setattr(config, "TELEMETRY_ROLLUP_LAG_SECONDS", 0.0)
+    mongo.reset_memory_store()
+    telemetry_rollups.reset_memory_rollups()
+    metrics.reset_metrics()
+    yield
+    telemetry_rollups.reset_memory_rollups()
+
+
+def test_rollups_aggregate_runs_and_failures(memory_backend):
+    for minute in range(4):
+        mongo.insert_lesson_run(_run(minute, latency_ms=100.0 * (minute + 1), attempts=1 + minute % 2, codes={"unused.var": 2}))
+    mongo.insert_lesson_failure(_failure(5))
+    mongo.insert_lesson_run(_run(70))
+
+    assert telemetry_rollups.run_rollups() == 6
+
+    hours = telemetry_rollups.query_rollups("hour")
+    assert [bucket["bucket_start"] for bucket in hours] == ["2024-06-01T10:00:00+00:00", "2024-06-01T11:00:00+00:00"]
+    first = hours[0]
+    assert first["runs"] == 4
+    assert first["failures"] == 1
+    assert first["failure_rate"] == 0.2
+    assert first["attempts"] == {"1": 2, "2": 2}
+    assert first["errors"] == {"TimeoutError": 1}
+    assert first["codes"] == {"unused_var": 8}
+    assert first["latency_ms"]["p50"] == pytest.approx(200.0, rel=0.02)
+    assert first["latency_ms"]["p99"] == pytest.approx(400.0, rel=0.02)
+
+    (day,) = telemetry_rollups.query_rollups("day")
+    assert day["runs"] == 5
+    assert day["bucket_start"] == "2024-06-01T00:00:00+00:00"
+
+
+def test_only_documents_past_the_watermark_are_folded(memory_backend):
+    mongo.insert_lesson_run(_run(0))
+    assert telemetry_rollups.run_rollups() == 1
+    assert telemetry_rollups.run_rollups() == 0
+
+    # A late record (e.g. replayed from the WAL) still lands in its own hour
+    late = _run(0)
+    late["created_at"] = HOUR - timedelta(hours=3)
+    mongo.insert_lesson_run(late)
+    mongo.insert_lesson_run(_run(1))
+    assert telemetry_rollups.run_rollups() == 2
+
+    runs = {bucket["bucket_start"]: bucket["runs"] for bucket in telemetry_rollups.query_rollups("hour")}
+    assert runs == {"2024-06-01T07:00:00+00:00": 1, "2024-06-01T10:00:00+00:00": 2}
+    assert metrics.snapshot()["counters"]["telemetry.rollup_documents"] == 3
+
+
+def test_lag_holds_back_fresh_documents(memory_backend, monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_ROLLUP_LAG_SECONDS", 60.0)
+    mongo.insert_lesson_run(_run(0))
+
+    assert telemetry_rollups.run_rollups() == 0
+    assert telemetry_rollups.run_rollups(now=datetime.now(timezone.utc) + timedelta(minutes=2)) == 1
+
+
+def test_rollups_merge_like_a_single_pass():
+    runs = [_run(minute, latency_ms=10.0 + minute * 7) for minute in range(60)]
+    whole = telemetry_rollups.fold(runs, [])[("hour", HOUR)]
+    merged = Rollup()
+    for part in (runs[:17], runs[17:40], runs[40:]):
+        merged.merge(telemetry_rollups.fold(part, [])[("hour", HOUR)])
+
+    assert merged.as_dict() == whole.as_dict()
+
+
+def test_rollup_endpoint(memory_backend, monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_ADMIN_TOKEN", "s3cret")
+    mongo.insert_lesson_run(_run(0))
+    telemetry_rollups.run_rollups()
+
+    response = TestClient(app).get(
+        "/telemetry/rollups", params={"granularity": "day"}, headers={"X-Admin-Token": "s3cret"}
+    )
+
+    assert response.status_code == 200
+    assert response.json()["buckets"][0]["runs"] == 1
+
+
+class FakeRollupCollection:
+    """The subset of collection calls the Mongo rollup store makes."""
+
+    def __init__(self):
+        self.docs: dict = {}
+
+    def create_index(self, keys, name):
+        return name
+
+    def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc is not None else None
+
+    def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("duplicate")
+        self.docs[doc["_id"]] = dict(doc)
+
+    def update_one(self, query, update):
+        doc = self.docs.get(query["_id"])
+        matches = doc is not None and doc["value"] == query["value"] and not (
+            "pending" in query and doc.get("pending")
+        )
+        if matches:
+            doc.update(update["$set"])
+        return SimpleNamespace(modified_count=int(matches))
+
+    def bulk_write(self, operations, ordered):
+        errors = []
+        for index, operation in enumerate(operations):
+            query, update = operation._filter, operation._doc
+            doc = self.docs.get(query["_id"])
+            if doc is None:
+                doc = self.docs[query["_id"]] = {"_id": query["_id"]}
+            elif not doc["last_cutoff"] < query["last_cutoff"]["$lt"]:
+                errors.append({"index": index, "code": 11000})
+                continue
+            for path, amount in update["$inc"].items():
+                target = doc
+                *parents, leaf = path.split(".")
+                for parent in parents:
+                    target = target.setdefault(parent, {})
+                target[leaf] = target.get(leaf, 0) + amount
+            doc.update(update["$set"])
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+
+def test_mongo_store_claims_ranges_and_reapplies_idempotently():
+    store = MongoRollupStore(FakeRollupCollection())
+    first_cutoff = HOUR + timedelta(hours=1)
+    rollups = telemetry_rollups.fold([_run(0), _run(1)], [_failure(2)])
+
+    assert store.claim(first_cutoff) == (None, first_cutoff)
+    store.apply(rollups, first_cutoff)
+    # The job died before finishing: the next claim hands back the same range
+    assert store.claim(first_cutoff + timedelta(minutes=5)) == (None, first_cutoff)
+    store.apply(rollups, first_cutoff)
+    store.finish(first_cutoff)
+
+    hour = Rollup.from_document(store.collection.docs[f"hour:{HOUR.isoformat()}"])
+    assert (hour.runs, hour.failures) == (2, 1)
+    assert hour.latency == telemetry_rollups.fold([_run(0), _run(1)], [])[("hour", HOUR)].latency
+
+    assert store.claim(first_cutoff) is None
+    second_cutoff = first_cutoff + timedelta(minutes=5)
+    assert store.claim(second_cutoff) == (first_cutoff, second_cutoff)
@@ -0,0 +1,77 @@
+# Telemetry payload tier tests
+import asyncio
+
+import pytest
+
+from app.core import config, metrics
+from app.mcp import python_code_hints  # noqa: F401
+from app.models.api import LessonRequest
+from app.services import lesson_service, mongo, telemetry_sampling
+from app.services.background import background_pool
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def tiers(monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_INCLUDE_HINT_DETAILS", True)
+    monkeypatch.setattr(config, "TELEMETRY_DETAIL_SAMPLE_RATE", 0.1)
+    monkeypatch.setattr(config, "TELEMETRY_DETAIL_TRIGGERS", "retry,runtime_error")
+    metrics.reset_metrics()
+
+
+def test_triggers_always_keep_details(tiers):
+    assert telemetry_sampling.decide(attempt_count=2, runtime_errors=0, degraded=False) == {
+        "tier": "full",
+        "reason": "retry",
+        "rate": 0.1,
+        "weight": 1.0,
+    }
+    assert telemetry_sampling.decide(attempt_count=1, runtime_errors=3, degraded=False)["reason"] == "runtime_error"
+    # `degraded` is not in the configured triggers, so it is sampled like any other run
+    assert telemetry_sampling.decide(attempt_count=1, runtime_errors=0, degraded=True)["reason"] in {"sampled", "unsampled"}
+
+
+def test_sampled_runs_carry_inverse_probability_weights(tiers, monkeypatch):
+    monkeypatch.setattr(telemetry_sampling.random, "random", lambda: 0.05)
+    assert telemetry_sampling.decide(attempt_count=1, runtime_errors=0, degraded=False) == {
+        "tier": "full",
+        "reason": "sampled",
+        "rate": 0.1,
+        "weight": 10.0,
+    }
+
+    monkeypatch.setattr(telemetry_sampling.random, "random", lambda: 0.5)
+    assert telemetry_sampling.decide(attempt_count=1, runtime_errors=0, degraded=False) == {
+        "tier": "summary",
+        "reason": "unsampled",
+        "rate": 0.1,
+        "weight": 0.0,
+    }
+    counters = metrics.snapshot()["counters"]
+    assert counters["telemetry.detail_tier.full"] == 1
+    assert counters["telemetry.detail_tier.summary"] == 1
+
+
+def test_include_hint_details_false_forces_summary(tiers, monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_INCLUDE_HINT_DETAILS", False)
+
+    decision = telemetry_sampling.decide(attempt_count=3, runtime_errors=1, degraded=True)
+
+    assert decision == {"tier": "summary", "reason": "disabled", "rate": 0.0, "weight": 0.0}
+
+
+def test_summary_tier_runs_drop_hint_arrays(tiers, monkeypatch):
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    monkeypatch.setattr(config, "STATIC_LESSON_MODE", False)
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", False)
+    monkeypatch.setattr(config, "TELEMETRY_DETAIL_SAMPLE_RATE", 0.0)
+    mongo.reset_memory_store()
+
+    asyncio.run(lesson_service.generate_lesson(LessonRequest(topic="python loops", level="beginner")))
+    background_pool.drain()
+
+    run = mongo.get_memory_runs()[-1]
+    assert run["telemetry_sample"] == {"tier": "summary", "reason": "unsampled", "rate": 0.0, "weight": 0.0}
+    assert not {"rule_hints", "runtime_hints", "mcp_hints"} & set(run)
+    assert set(run["hint_summary"]) == {"rule_hints", "runtime_errors", "mcp_explanations"}
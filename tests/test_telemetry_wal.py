@@ -0,0 +1,143 @@
+# Telemetry write-ahead log tests
+import threading
+from datetime import datetime, timezone
+
+import pytest
+from pymongo.errors import BulkWriteError, ServerSelectionTimeoutError
+
+from app.core import config, metrics
+from app.services import mongo
+from app.services.telemetry_wal import TelemetryWAL, read_segment
+
+pytestmark = pytest.mark.unit
+
+
+class FakeCollection:
+    """insert_one/insert_many stand-in that can be switched off."""
+
+    def __init__(self) -> None:
+        self.docs: dict = {}
+        self.available = True
+
+    def insert_one(self, doc):
+        self._check()
+        doc.setdefault("_id", f"auto-{len(self.docs)}")
+        self.docs[doc["_id"]] = doc
+
+    def insert_many(self, docs, ordered=True):
+        self._check()
+        errors = []
+        for index, doc in enumerate(docs):
+            if doc["_id"] in self.docs:
+                errors.append({"index": index, "code": 11000})
+            self.docs[doc["_id"]] = doc
+        if errors:
+            raise BulkWriteError({"writeErrors": errors})
+
+    def _check(self):
+        if not self.available:
+            raise ServerSelectionTimeoutError("mongo down")
+
+
+@pytest.fixture
+def wal_env(monkeypatch, tmp_path):
+    runs, failures = FakeCollection(), FakeCollection()
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "mongo")
+    monkeypatch.setattr(config, "TELEMETRY_WAL_DIR", str(tmp_path / "wal"))
+    monkeypatch.setattr(mongo, "get_collection", lambda: runs)
+    monkeypatch.setattr(mongo, "get_failure_collection", lambda: failures)
+    metrics.reset_metrics()
+    yield runs, failures
+    mongo.stop_wal_replayer()
+    monkeypatch.setattr(mongo, "_wal", None)
+
+
+def _run(index: int) -> dict:
+    return {"run_id": str(index), "created_at": datetime(2024, 1, 1, tzinfo=timezone.utc)}
+
+
+def test_outage_is_logged_then_replayed_without_loss(wal_env):
+    runs, failures = wal_env
+    mongo.insert_lesson_run(_run(0))
+    runs.available = failures.available = False
+
+    for index in range(1, 6):
+        mongo.insert_lesson_run(_run(index))
+    mongo.insert_lesson_failure({"run_id": "f1", "error_type": "boom"})
+
+    assert len(runs.docs) == 1
+    assert mongo.get_wal().pending()
+    assert mongo.replay_wal() == 0
+
+    runs.available = failures.available = True
+    # While the backlog exists new writes queue behind it, keeping order
+    mongo.insert_lesson_run(_run(6))
+    assert len(runs.docs) == 1
+
+    assert mongo.replay_wal() == 7
+    assert sorted(doc["run_id"] for doc in runs.docs.values()) == [str(i) for i in range(7)]
+    assert [doc["run_id"] for doc in failures.docs.values()] == ["f1"]
+    assert runs.docs[next(iter(runs.docs))]["created_at"].year == 2024
+    assert not mongo.get_wal().pending()
+    assert list(mongo.get_wal().directory.glob("wal-*.log")) == []
+    assert metrics.snapshot()["counters"]["telemetry.wal_fallback"] == 1
+
+
+def test_partial_replay_is_retried_idempotently(wal_env, tmp_path):
+    runs, _failures = wal_env
+    wal = TelemetryWAL(tmp_path / "partial")
+    for index in range(4):
+        wal.append("runs", _run(index))
+    wal.seal()
+    first_two = [doc for _name, doc in read_segment(wal.sealed_segments()[0])][:2]
+    runs.insert_many(first_two)
+
+    replayed = wal.replay(lambda name, docs: runs.insert_many(docs, ordered=False))
+
+    assert replayed == 4
+    assert sorted(doc["run_id"] for doc in runs.docs.values()) == ["0", "1", "2", "3"]
+    assert wal.sealed_segments() == []
+
+
+def test_segments_rotate_and_survive_restart(tmp_path):
+    wal = TelemetryWAL(tmp_path, segment_bytes=200)
+    for index in range(10):
+        wal.append("runs", _run(index))
+    wal.close()
+
+    reopened = TelemetryWAL(tmp_path)
+    segments = reopened.sealed_segments()
+    assert len(segments) > 1
+    assert [doc["run_id"] for path in segments for _name, doc in read_segment(path)] == [str(i) for i in range(10)]
+
+
+def test_torn_tail_is_skipped(tmp_path):
+    wal = TelemetryWAL(tmp_path)
+    for index in range(3):
+        wal.append("runs", _run(index))
+    wal.close()
+    path = wal.sealed_segments()[0]
+    path.write_bytes(path.read_bytes()[:-7])
+
+    assert [doc["run_id"] for _name, doc in read_segment(path)] == ["0", "1"]
+
+
+def test_concurrent_appends_share_fsyncs(tmp_path):
+    metrics.reset_metrics()
+    wal = TelemetryWAL(tmp_path)
+
+    def writer(offset: int) -> None:
+        for index in range(50):
+            wal.append("runs", _run(offset + index))
+
+    threads = [threading.Thread(target=writer, args=(n * 100,)) for n in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wal.close()
+
+    counters = metrics.snapshot()["counters"]
+    assert counters["telemetry.wal_appended"] == 400
+    assert counters["telemetry.wal_fsyncs"] <= 400
+    assert sum(1 for path in wal.sealed_segments() for _ in read_segment(path)) == 400
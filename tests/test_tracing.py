@@ -0,0 +1,180 @@
+# Local tracing span tests
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from pydantic_ai import Agent
+from pydantic_ai.models.function import FunctionModel
+
+from app.agents.content_llm import ContentAgentLLM
+from app.core import config, metrics, tracing
+from app.main import app
+from app.mcp import python_code_hints  # noqa: F401
+from app.models.api import LessonRequest
+from app.services import lesson_service, mongo
+from app.services.background import background_pool
+from app.services.llm_limiter import LLMLimiter
+from bench.stub_llm import _lesson_json
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture
+def tracing_config(monkeypatch):
+    monkeypatch.setattr(config, "TRACING_ENABLED", True)
+    monkeypatch.setattr(config, "TRACING_JSONL_PATH", "")
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", False)
+    monkeypatch.setattr(config, "STATIC_LESSON_MODE", False)
+    monkeypatch.setattr(config, "TELEMETRY_BACKEND", "memory")
+    mongo.reset_memory_store()
+    tracing.trace_store.reset()
+
+
+def _generate(topic: str = "pandas groupby") -> list[dict]:
+    asyncio.run(lesson_service.generate_lesson(LessonRequest(topic=topic, level="beginner")))
+    background_pool.drain()
+    summary = tracing.trace_store.traces()[0]
+    return tracing.trace_store.get(summary["trace_id"])
+
+
+def test_request_trace_nests_stages_rule_blocks_and_background_work(tracing_config):
+    spans = _generate()
+    by_name = {span["name"]: span for span in spans}
+    root = by_name["lesson.request"]
+
+    assert root["parent_id"] is None
+    assert root["attributes"]["topic"] == "pandas groupby"
+    assert root["attributes"]["level"] == "beginner"
+    assert root["attributes"]["attempts"] == 1
+    for name in ("stage.plan", "stage.generate", "stage.validate", "stage.render", "stage.mcp_hints"):
+        assert by_name[name]["parent_id"] == root["span_id"]
+    assert by_name["rule_engine.block"]["parent_id"] == by_name["stage.rule_outcomes"]["span_id"]
+    assert by_name["mcp.tool"]["parent_id"] == by_name["stage.mcp_hints"]["span_id"]
+    assert by_name["telemetry.write"]["parent_id"] == by_name["stage.telemetry"]["span_id"]
+    assert {span["trace_id"] for span in spans} == {root["trace_id"]}
+
+
+def test_llm_completion_span_carries_token_counts(monkeypatch, tracing_config):
+    text = asyncio.run(_lesson_json('Topic: "pandas groupby"\nAudience level: "beginner"'))
+
+    async def stream(messages, info):
+        yield text
+
+    agent = ContentAgentLLM.__new__(ContentAgentLLM)
+    agent.agent = Agent(FunctionModel(stream_function=stream))
+    agent._limiter = LLMLimiter()
+    monkeypatch.setattr(config, "USE_LLM_CONTENT", True)
+    monkeypatch.setattr(config, "OVERLOAD_SHEDDING_ENABLED", False)
+    monkeypatch.setattr(config, "LLM_STREAMING_ENABLED", True)
+    monkeypatch.setattr(lesson_service, "content_agent", agent)
+
+    spans = _generate()
+    completion = next(span for span in spans if span["name"] == "llm.completion")
+    root = next(span for span in spans if span["name"] == "lesson.request")
+
+    assert completion["attributes"]["streaming"] is True
+    assert completion["attributes"]["input_tokens"] > 0
+    assert completion["attributes"]["output_tokens"] > 0
+    assert root["attributes"]["output_tokens"] == completion["attributes"]["output_tokens"]
+
+
+def test_failed_span_records_error(tracing_config):
+    with pytest.raises(RuntimeError):
+        with tracing.span("outer"):
+            with tracing.span("inner"):
+                raise RuntimeError("boom")
+
+    spans = tracing.trace_store.get(tracing.trace_store.traces()[0]["trace_id"])
+    assert [span["status"] for span in spans] == ["error", "error"]
+    assert spans[1]["error"] == "RuntimeError: boom"
+
+
+def test_spans_export_to_jsonl(monkeypatch, tmp_path, tracing_config):
+    path = tmp_path / "traces" / "spans.jsonl"
+    monkeypatch.setattr(config, "TRACING_JSONL_PATH", str(path))
+
+    spans = _generate()
+
+    assert tracing.trace_store.flush(timeout=1)
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert {line["span_id"] for line in lines} == {span["span_id"] for span in spans}
+
+
+def test_jsonl_export_is_queued_and_bounded(monkeypatch, tmp_path, tracing_config):
+    path = tmp_path / "spans.jsonl"
+    monkeypatch.setattr(config, "TRACING_JSONL_PATH", str(path))
+    monkeypatch.setattr(config, "TRACING_QUEUE_MAX", 0)
+    writer = tracing.JsonlSpanWriter()
+    opened: list[str] = []
+    real_open = writer._open
+
+    def counting_open(target):
+        if writer._path != target:
+            opened.append(target)
+        return real_open(target)
+
+    monkeypatch.setattr(writer, "_open", counting_open)
+    for index in range(3):
+        writer.write(str(path), {"span_id": str(index)})
+
+    assert writer.flush(timeout=1)
+    assert opened == [str(path)]
+    assert [json.loads(line)["span_id"] for line in path.read_text().splitlines()] == ["0", "1", "2"]
+
+    writer.stop(timeout=1)
+    assert writer._handle is None
+
+    # With the writer stopped, one queued record fills a queue of one
+    monkeypatch.setattr(config, "TRACING_QUEUE_MAX", 1)
+    writer._queue.put_nowait((str(path), {"span_id": "pending"}))
+    metrics.reset_metrics()
+    writer.write(str(path), {"span_id": "dropped"})
+    assert metrics.snapshot()["counters"]["tracing.dropped"] == 1
+
+
+def test_disabled_tracing_records_nothing(monkeypatch, tracing_config):
+    monkeypatch.setattr(config, "TRACING_ENABLED", False)
+
+    asyncio.run(lesson_service.generate_lesson(LessonRequest(topic="pandas", level="beginner")))
+    background_pool.drain()
+
+    assert tracing.trace_store.traces() == []
+
+
+def test_ring_is_bounded(monkeypatch, tracing_config):
+    monkeypatch.setattr(config, "TRACING_RING_SIZE", 2)
+
+    for index in range(3):
+        with tracing.span("request", index=index):
+            pass
+
+    assert [t["attributes"]["index"] for t in tracing.trace_store.traces()] == [2, 1]
+
+
+def test_debug_traces_endpoint_filters_and_fetches(monkeypatch, tracing_config):
+    monkeypatch.setattr(config, "TELEMETRY_ADMIN_TOKEN", "s3cret")
+    client = TestClient(app, headers={"X-Admin-Token": "s3cret"})
+    client.post("/lesson", json={"topic": "pandas groupby", "level": "beginner"})
+    background_pool.drain()
+
+    listing = client.get("/debug/traces").json()
+    assert listing["enabled"] is True
+    trace_id = listing["traces"][0]["trace_id"]
+    assert client.get("/debug/traces", params={"min_ms": 1e9}).json()["traces"] == []
+
+    detail = client.get(f"/debug/traces/{trace_id}").json()
+    assert detail["spans"][0]["name"] == "lesson.request"
+    assert client.get("/debug/traces/unknown").status_code == 404
+
+
+@pytest.mark.parametrize("path", ["/debug/traces", "/debug/traces/some-trace"])
+def test_debug_traces_require_the_admin_token(monkeypatch, tracing_config, path):
+    client = TestClient(app)
+
+    monkeypatch.setattr(config, "TELEMETRY_ADMIN_TOKEN", "")
+    assert client.get(path).status_code == 403
+
+    monkeypatch.setattr(config, "TELEMETRY_ADMIN_TOKEN", "s3cret")
+    assert client.get(path).status_code == 403
+    assert client.get(path, headers={"X-Admin-Token": "wrong"}).status_code == 403